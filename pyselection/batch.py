@@ -0,0 +1,827 @@
+#!/usr/bin/python -tt
+# -*- coding: utf-8 -*-
+"""Classes for running batches of codeml jobs."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from collections import deque
+from hashlib import sha1
+import math
+import os
+import shutil
+import signal
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from pyselection.codeml import PackedJob
+from pyselection.codeml import parse_progress
+from pyselection.codeml import parse_results
+from pyselection.core import str_types
+from pyselection.pio import TextPIO
+from pyselection.pio import TextTail
+from pyselection.schema import TableSchema
+from pyselection.table import BaseTable
+from pyselection.table import ColumnTable
+from pyselection.table import TableLabels
+
+# Initial values of omega and kappa used for multiple starts of a model.
+default_starts = ( 
+  {'omega': 0.2, 'kappa': 1.0}, {'omega': 1.0, 'kappa': 2.0}, 
+  {'omega': 3.0, 'kappa': 4.0}, {'omega': 10.0, 'kappa': 0.5} 
+)
+
+# Columns of the telemetry recorded for each codeml process, with times in
+# seconds and the peak resident set size in bytes.
+telemetry_schema = TableSchema([ ('name', 'str'), ('attempt', 'int'),
+  ('status', 'str'), ('returncode', 'int', True), ('executable', 'str'),
+  ('model', 'str', True), ('ntaxa', 'int', True), ('ncodons', 'int', True),
+  ('wall_time', 'float'), ('user_time', 'float', True),
+  ('system_time', 'float', True), ('max_rss_bytes', 'int', True) ])
+
+# Rough cost of each model relative to M0, per taxon and codon. 
+model_weights = { 
+  ('0', '0'): 1.0, ('0', '1'): 2.0, ('0', '2'): 3.0, ('0', '3'): 4.0, 
+  ('0', '7'): 6.0, ('0', '8'): 8.0, ('1', '0'): 1.5, ('2', '0'): 1.5, 
+  ('2', '2'): 12.0 
+}
+
+def estimate_cost(job):
+    """Estimate the relative cost of a codeml job from its input size and model."""
+
+    ntaxa, ncodons = job.alignment_size
+    model, nssites = job.model
+
+    weight = sum( model_weights.get( (model, x), 4.0 ) for x in nssites )
+
+    return (ntaxa or 1) * (ncodons or 1) * weight
+
+def _pack_name(jobs):
+    """Name a packed job by its members, so that packing again gives the
+    same name whatever the order of the jobs."""
+    names = "\t".join( sorted( job.name for job in jobs ) )
+    return "packed-%s" % sha1( names.encode('utf-8') ).hexdigest()[:16]
+
+def pack_jobs(jobs, budget, workdir, max_datasets=None):
+    """Pack small compatible codeml jobs into multi-data set jobs."""
+
+    groups = dict()
+    packed = list()
+
+    for job in jobs:
+
+        settings = dict(job.settings)
+        for key in ('seqfile', 'outfile', 'treefile'):
+            settings.pop(key, None)
+
+        cost = estimate_cost(job)
+
+        # Jobs can share a run only if all settings but the data set match.
+        if ( cost > budget or settings.pop('ndata', '1') != '1' or 
+          len(job.model[1]) != 1 or 'treefile' not in job.settings ):
+            packed.append(job)
+            continue
+
+        key = (job.executable, job.get_path('treefile'), 
+          tuple( sorted( settings.items() ) ) )
+        groups.setdefault(key, list()).append( (cost, job) )
+
+    for key in sorted(groups):
+
+        group, group_cost = list(), 0
+
+        for cost, job in groups[key] + [ (None, None) ]:
+
+            if job is None or group_cost + cost > budget or (
+              max_datasets is not None and len(group) == max_datasets):
+
+                if len(group) > 1:
+                    packed.append( PackedJob(_pack_name(group), group, workdir) )
+                else:
+                    packed.extend(group)
+
+                group, group_cost = list(), 0
+
+            if job is not None:
+                group.append(job)
+                group_cost += cost
+
+    return packed
+
+def _reap(process, block=False):
+    """Get the return code of a finished process with its resource usage."""
+
+    if process.returncode is not None or not hasattr(os, "wait4"):
+        returncode = process.wait() if block else process.poll()
+        return (returncode, None)
+
+    try:
+        pid, status, rusage = os.wait4(process.pid, 0 if block else os.WNOHANG)
+    except OSError:
+        return (process.poll(), None)
+
+    if pid == 0:
+        return (None, None)
+
+    if os.WIFSIGNALED(status):
+        process.returncode = -os.WTERMSIG(status)
+    else:
+        process.returncode = os.WEXITSTATUS(status)
+
+    return (process.returncode, rusage)
+
+def _terminate(process, timeout=5.0):
+    """Terminate a process, killing it if it does not exit in time."""
+
+    process.terminate()
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        returncode, rusage = _reap(process)
+        if returncode is not None:
+            return (returncode, rusage)
+        time.sleep(0.05)
+
+    process.kill()
+
+    return _reap(process, block=True)
+
+def _max_rss(rusage):
+    """Get the peak resident set size of a process in bytes."""
+    # This is in kilobytes on Linux, bytes on macOS.
+    if sys.platform == 'darwin':
+        return rusage.ru_maxrss
+    return rusage.ru_maxrss * 1024
+
+def _median(values):
+    """Get the median of a non-empty sequence of numbers."""
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2
+
+class BatchJournal(object):
+    """Class for journalling the progress of a batch of codeml jobs."""
+
+    events = ('submitted', 'completed', 'failed')
+
+    @property
+    def file(self):
+        return self._pio.file
+
+    @property
+    def nom(self):
+        return self.__class__.__name__
+
+    def __init__(self, filepath):
+        self._pio = TextPIO(filepath)
+
+    def completed(self):
+
+        return dict( (name, output) for name, (event, output)
+          in self.load().items() if event == 'completed'
+          and os.path.isfile(output) )
+
+    def load(self):
+
+        states = dict()
+
+        if not os.path.isfile(self.file):
+            return states
+
+        for line in self._pio.load():
+
+            fields = line.split('\t')
+
+            # Skip any record left incomplete by an interrupted write.
+            if len(fields) != 4 or fields[1] not in self.events:
+                continue
+
+            timestamp, event, name, output = fields
+            states[name] = (event, output)
+
+        return states
+
+    def record(self, event, name, output=''):
+
+        if event not in self.events:
+            raise ValueError("invalid %s event (%s)" % (self.nom, repr(event) ) )
+
+        self._pio.append([ "%.3f\t%s\t%s\t%s\n" % (time.time(), event, name,
+          output) ])
+
+class RuntimeHistory(object):
+    """Class for recording the wall times of past codeml jobs."""
+
+    data_types = (int, float, str_types[0])
+
+    @property
+    def file(self):
+        return self._file
+
+    @property
+    def table(self):
+        return self._table
+
+    def __init__(self, filepath=None):
+
+        self._file = filepath
+        self._table = BaseTable([], data_types=self.data_types)
+
+        if filepath is not None and os.path.isfile(filepath):
+            self.load()
+
+    def add(self, job, wall_time):
+
+        ntaxa, ncodons = job.alignment_size
+
+        if ntaxa is not None and ncodons is not None:
+            self._table.append([ job.model_name, ntaxa, ncodons,
+              estimate_cost(job), float(wall_time) ])
+
+    def estimate(self, job):
+
+        cost = estimate_cost(job)
+
+        if not self._table:
+            return cost
+
+        rows = self._table.tolist()
+        ntaxa, ncodons = job.alignment_size
+        model_name = job.model_name
+
+        rates = [ wall_time / (n * m) for name, n, m, _, wall_time in rows
+          if name == model_name and n * m > 0 ]
+
+        # Use the recorded times of the same model where possible,
+        # otherwise scale the rough cost by the times of all models.
+        if rates and ntaxa is not None and ncodons is not None:
+            return _median(rates) * ntaxa * ncodons
+        else:
+            return _median([ wall_time / x for _, _, _, x, wall_time in rows
+              if x > 0 ]) * cost
+
+    def load(self):
+
+        rows = list()
+
+        for line in TextPIO(self._file).load():
+            fields = line.split('\t')
+            if len(fields) == 5:
+                rows.append([ fields[0], int(fields[1]), int(fields[2]),
+                  float(fields[3]), float(fields[4]) ])
+
+        self._table = BaseTable(rows, data_types=self.data_types)
+
+    def save(self):
+
+        if self._file is None:
+            raise ValueError("%s has no file" % self.__class__.__name__)
+
+        TextPIO(self._file).save([ "%s\t%d\t%d\t%r\t%.3f\n" % tuple(row)
+          for row in self._table.tolist() ])
+
+class ResourceLimits(object):
+    """Class for limiting the resources used by each codeml job."""
+
+    # Messages that codeml, the C library and Python print when memory runs
+    # out, and the share of the limit that a peak resident set size must
+    # reach to count as running out.
+    memory_errors = ("out of memory", "cannot allocate", "bad_alloc",
+      "memoryerror")
+    memory_share = 0.9
+
+    @property
+    def nom(self):
+        return self.__class__.__name__
+
+    def __init__(self, cpu_time=None, wall_time=None, memory=None):
+
+        if any( x is not None and x <= 0 for x in (cpu_time, wall_time, memory) ):
+            raise ValueError("%s must be positive" % self.nom)
+
+        if resource is None and (cpu_time is not None or memory is not None):
+            raise RuntimeError("%s on CPU time or memory are not supported on "
+              "this platform" % self.nom)
+
+        self.cpu_time = cpu_time
+        self.wall_time = wall_time
+        self.memory = memory
+
+    def apply(self):
+
+        if self.cpu_time is not None:
+            cpu_time = int( math.ceil(self.cpu_time) )
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu_time, cpu_time + 5) )
+
+        if self.memory is not None:
+            memory = int(self.memory)
+            resource.setrlimit(resource.RLIMIT_AS, (memory, memory) )
+
+    def classify(self, returncode, log_file, rusage=None):
+
+        # Only the signal sent at the soft CPU time limit is a timeout; the
+        # hard limit is set above it so that it comes first.
+        if self.cpu_time is not None and returncode == -signal.SIGXCPU:
+            return 'timeout'
+
+        if self.memory is not None:
+
+            if ( rusage is not None and _max_rss(rusage) >=
+              self.memory_share * self.memory ):
+                return 'memory'
+
+            try:
+                log = " ".join( TextPIO(log_file).load() ).lower()
+            except (IOError, OSError, ValueError):
+                log = ''
+
+            if any( x in log for x in self.memory_errors ):
+                return 'memory'
+
+        return 'crash'
+
+class ProgressMonitor(object):
+    """Class for following the optimization progress of running codeml jobs."""
+
+    @property
+    def jobs(self):
+        return [ job for job, _, _ in self._tails.values() ]
+
+    @property
+    def nom(self):
+        return self.__class__.__name__
+
+    def __init__(self, callback=None, stall_time=None, divergence=None):
+
+        if stall_time is not None and stall_time <= 0:
+            raise ValueError("%s stall time must be positive" % self.nom)
+
+        if divergence is not None and divergence <= 0:
+            raise ValueError("%s divergence must be positive" % self.nom)
+
+        self.callback = callback
+        self.stall_time = stall_time
+        self.divergence = divergence
+
+        self._tails = dict()
+        self._states = dict()
+
+    def __iter__(self):
+        return iter( self.poll() )
+
+    def add(self, job):
+
+        for other, _, _ in self._tails.values():
+            if other.rub_file == job.rub_file:
+                raise ValueError("%s jobs %s and %s share a rub file" % (self.nom,
+                  repr(other.name), repr(job.name) ) )
+
+        # Jobs are added before they start, so that their files can be read
+        # from the beginning once anything left by an earlier run is gone.
+        if os.path.isfile(job.rub_file):
+            os.remove(job.rub_file)
+
+        self._tails[job.name] = (job, TextTail(job.rub_file),
+          TextTail(job.log_file) )
+        self._states[job.name] = { 'iteration': None, 'value': None,
+          'best': None, 'updated': time.time() }
+
+    def check(self, job):
+
+        state = self._states[job.name]
+        value, best = state['value'], state['best']
+
+        if value is not None and ( math.isnan(value) or math.isinf(value) ):
+            return 'diverged'
+
+        # Values are of -lnL, which should fall as the optimization goes on.
+        if ( self.divergence is not None and best is not None and
+          value - best > self.divergence ):
+            return 'diverged'
+
+        if ( self.stall_time is not None and
+          time.time() - state['updated'] > self.stall_time ):
+            return 'stalled'
+
+        return None
+
+    def get_progress(self, job):
+        state = self._states[job.name]
+        return (state['iteration'], state['value'])
+
+    def poll(self):
+
+        events = list()
+
+        for name in sorted(self._tails):
+
+            job, rub_tail, log_tail = self._tails[name]
+            state = self._states[name]
+
+            # Follow the rub file, and the screen output only for as long as
+            # codeml has written nothing to the rub file, since it may write
+            # the same iterations to both. The screen is read first, so that
+            # lines written to both between the two reads come from the rub.
+            screen = log_tail.read()
+            progress = parse_progress( rub_tail.read() )
+            if rub_tail.offset == 0:
+                progress = parse_progress(screen)
+
+            for iteration, value in progress:
+
+                if state['best'] is None or value < state['best']:
+                    state['best'] = value
+                    state['updated'] = time.time()
+
+                state['iteration'], state['value'] = iteration, value
+                events.append( (name, iteration, value) )
+
+                if self.callback is not None:
+                    self.callback(job, iteration, value)
+
+        return events
+
+    def remove(self, job):
+        del self._tails[job.name]
+        del self._states[job.name]
+
+class BatchRunner(object):
+    """Class for running a batch of codeml jobs."""
+
+    @property
+    def jobs(self):
+        return self._jobs
+
+    @property
+    def nom(self):
+        return self.__class__.__name__
+
+    @property
+    def telemetry(self):
+        # Jobs can be run more than once, so names are kept as a column.
+        return ColumnTable(self._telemetry, schema=telemetry_schema)
+
+    def __init__(self, jobs, workers=1, journal=None, history=None, 
+      limits=None, retries=0, retry_settings=None, monitor=None, 
+      poll_interval=1.0):
+
+        self._jobs = list(jobs)
+
+        names = self._get_names()
+        if len( set(names) ) != len(names):
+            raise ValueError("%s job names must be unique" % self.nom)
+
+        if workers < 1:
+            raise ValueError("%s requires at least one worker" % self.nom)
+
+        if retries < 0:
+            raise ValueError("%s retries cannot be negative" % self.nom)
+
+        if journal is not None and not isinstance(journal, BatchJournal):
+            journal = BatchJournal(journal)
+
+        if history is not None and not isinstance(history, RuntimeHistory):
+            history = RuntimeHistory(history)
+
+        if limits is not None and not isinstance(limits, ResourceLimits):
+            raise TypeError("%s limits must be of type ResourceLimits" % self.nom)
+
+        if monitor is not None and not isinstance(monitor, ProgressMonitor):
+            raise TypeError("%s monitor must be of type ProgressMonitor" % self.nom)
+
+        if monitor is not None:
+            rub_files = [ job.rub_file for job in self._jobs ]
+            if len( set(rub_files) ) != len(rub_files):
+                raise ValueError("%s jobs must run in separate directories to "
+                  "be monitored" % self.nom)
+
+        self.workers = workers
+        self.journal = journal
+        self.history = history
+        self.limits = limits
+        self.retries = retries
+        self.retry_settings = retry_settings
+        self.monitor = monitor
+        self.poll_interval = poll_interval
+
+        self._telemetry = list()
+
+    def _classify(self, job, returncode, stopped, rusage):
+
+        if stopped is not None:
+            return stopped
+        elif returncode == 0:
+            return 'success'
+        elif self.limits is None:
+            return 'crash'
+
+        return self.limits.classify(returncode, job.log_file, rusage)
+
+    def _finish(self, job, run_job, status, returncode, wall_time, results):
+
+        if self.history is not None and status == 'success':
+            self.history.add(job, wall_time)
+
+        # Keep the output of a successful retry as the output of the job.
+        if status == 'success' and run_job is not job:
+            shutil.copyfile(run_job.output_file, job.output_file)
+
+        # Give each job packed into a multi-data set run its own output.
+        members = job.members if isinstance(job, PackedJob) else ()
+
+        if status == 'success' and members:
+            try:
+                job.split_output()
+            except (IOError, OSError, ValueError):
+                status = 'crash'
+
+        for item in [ job ] + list(members):
+
+            if self.journal is not None:
+                if status == 'success':
+                    self.journal.record('completed', item.name, item.output_file)
+                else:
+                    self.journal.record('failed', item.name)
+
+            results[item.name] = [ status, returncode, item.output_file ]
+
+    def _get_names(self):
+
+        # Packed jobs are followed by the jobs packed into them.
+        names = list()
+
+        for job in self._jobs:
+            names.append(job.name)
+            if isinstance(job, PackedJob):
+                names.extend( x.name for x in job.members )
+
+        return names
+
+    def _load_start(self, job):
+
+        # A start that exits cleanly without a complete output has failed.
+        try:
+            row = parse_results( TextPIO(job.output_file).load() )
+        except (IOError, OSError, ValueError):
+            row = None
+
+        if row is None or row[0] is None:
+            return [ 'failed', None, None, None, None ]
+
+        return [ 'success' ] + row
+
+    def _poll(self, job, process, start_time):
+
+        returncode, rusage = _reap(process)
+        elapsed = time.time() - start_time
+        stopped = None
+
+        # Kill any straggler that has run past its wall time limit, and any
+        # run whose optimization has stalled or diverged.
+        if returncode is None:
+            if ( self.limits is not None and self.limits.wall_time is not None
+              and elapsed > self.limits.wall_time ):
+                stopped = 'timeout'
+            elif self.monitor is not None:
+                stopped = self.monitor.check(job)
+            if stopped is not None:
+                returncode, rusage = _terminate(process)
+
+        if returncode is not None and self.monitor is not None:
+            self.monitor.remove(job)
+
+        return (returncode, rusage, stopped, elapsed)
+
+    def _record(self, job, attempt, status, returncode, wall_time, rusage):
+
+        ntaxa, ncodons = job.alignment_size
+
+        if rusage is not None:
+            usage = [ rusage.ru_utime, rusage.ru_stime, _max_rss(rusage) ]
+        else:
+            usage = [ None, None, None ]
+
+        self._telemetry.append([ job.name, attempt, status, returncode,
+          job.executable, job.model_name, ntaxa, ncodons, 
+          float(wall_time) ] + usage)
+
+    def _resume(self, job, completed, results):
+
+        # Resume a packed job by its data sets, packing again any that are
+        # left to run.
+        members = job.members if isinstance(job, PackedJob) else ()
+        remaining = list()
+
+        for member in members:
+            if member.name in completed:
+                results[member.name] = [ 'skipped', None, completed[member.name] ]
+            else:
+                remaining.append(member)
+
+        if not remaining and (members or job.name in completed):
+            results[job.name] = [ 'skipped', None, completed.get(job.name) ]
+            return None
+        elif len(remaining) == len(members):
+            return job
+        elif len(remaining) == 1:
+            return remaining[0]
+
+        return PackedJob(_pack_name(remaining), remaining,
+          os.path.dirname(job.workdir) )
+
+    def _start(self, job):
+
+        if self.monitor is not None:
+            self.monitor.add(job)
+
+        if self.limits is not None:
+            process = job.start(preexec_fn=self.limits.apply)
+        else:
+            process = job.start()
+
+        if self.journal is not None:
+            self.journal.record('submitted', job.name)
+
+        return process
+
+    def _stop(self, running):
+
+        for job, process in running:
+            if process.returncode is None:
+                _terminate(process)
+            if self.monitor is not None and job in self.monitor.jobs:
+                self.monitor.remove(job)
+
+    def run(self):
+
+        results = dict()
+
+        if self.journal is not None:
+            completed = self.journal.completed()
+        else:
+            completed = dict()
+
+        # Skip jobs that completed in an earlier run of this batch.
+        pending = list()
+        resumed = dict()
+
+        for job in self._jobs:
+            run_job = self._resume(job, completed, results)
+            if run_job is not None:
+                pending.append(run_job)
+                resumed[job.name] = run_job.name
+
+        # Dispatch the longest jobs first, so that none is left running alone.
+        if self.history is not None:
+            estimate = self.history.estimate
+        else:
+            estimate = estimate_cost
+        pending = deque( (job, job, 0) for job in 
+          sorted(pending, key=estimate, reverse=True) )
+
+        running = list()
+
+        try:
+            while pending or running:
+
+                while pending and len(running) < self.workers:
+                    job, run_job, attempt = pending.popleft()
+                    running.append( (job, run_job, attempt, self._start(run_job),
+                      time.time() ) )
+
+                if self.monitor is not None:
+                    self.monitor.poll()
+
+                for entry in list(running):
+
+                    job, run_job, attempt, process, start_time = entry
+                    returncode, rusage, stopped, elapsed = self._poll(run_job,
+                      process, start_time)
+
+                    if returncode is None:
+                        continue
+
+                    running.remove(entry)
+                    status = self._classify(run_job, returncode, stopped, rusage)
+                    self._record(run_job, attempt, status, returncode, elapsed, rusage)
+
+                    if status != 'success' and attempt < self.retries:
+                        attempt += 1
+                        retry_job = job.derive("%s-retry%d" % (job.name, attempt),
+                          os.path.join(job.workdir, "retry%d" % attempt),
+                          self.retry_settings)
+                        pending.append( (job, retry_job, attempt) )
+                        if self.journal is not None:
+                            self.journal.record('failed', run_job.name)
+                    else:
+                        self._finish(job, run_job, status, returncode, elapsed,
+                          results)
+
+                if running:
+                    time.sleep(self.poll_interval)
+        finally:
+            # Leave no codeml process running if the batch is stopped early.
+            self._stop([ (x[1], x[3]) for x in running ])
+            if self.history is not None and self.history.file is not None:
+                self.history.save()
+
+        names = self._get_names()
+
+        return BaseTable([ results[ resumed.get(x, x) ] for x in names ],
+          row_labels=TableLabels(names) )
+
+    def run_multistart(self, job, starts=None, workdir=None, tolerance=0.001,
+      agreement=2):
+
+        if starts is None:
+            starts = default_starts
+
+        if agreement < 1:
+            raise ValueError("%s agreement must be at least one run" % self.nom)
+
+        if workdir is None:
+            workdir = os.path.join(job.workdir, "starts")
+
+        jobs = [ job.derive("%s-start%d" % (job.name, i + 1),
+          os.path.join(workdir, "start%d" % (i + 1) ), x)
+          for i, x in enumerate(starts) ]
+
+        results = dict()
+        pending = deque(jobs)
+        running = list()
+
+        try:
+            while pending or running:
+
+                while pending and len(running) < self.workers:
+                    start_job = pending.popleft()
+                    running.append( (start_job, self._start(start_job), time.time() ) )
+
+                if self.monitor is not None:
+                    self.monitor.poll()
+
+                for entry in list(running):
+
+                    start_job, process, start_time = entry
+                    returncode, rusage, stopped, elapsed = self._poll(start_job,
+                      process, start_time)
+
+                    if returncode is not None:
+                        running.remove(entry)
+                        if stopped is not None:
+                            results[start_job.name] = [ stopped, None, None, None, None ]
+                        elif returncode == 0:
+                            results[start_job.name] = self._load_start(start_job)
+                        else:
+                            results[start_job.name] = [ 'failed', None, None, None, None ]
+                        self._record(start_job, 0, results[start_job.name][0],
+                          returncode, elapsed, rusage)
+
+                lnls = [ x[1] for x in results.values() if x[1] is not None ]
+
+                # Stop the remaining starts once enough agree on the best lnL.
+                if lnls:
+                    best = max(lnls)
+                    if sum( 1 for x in lnls if best - x <= tolerance ) >= agreement:
+                        for start_job, process, start_time in running:
+                            returncode, rusage = _terminate(process)
+                            if self.monitor is not None:
+                                self.monitor.remove(start_job)
+                            self._record(start_job, 0, 'cancelled', returncode,
+                              time.time() - start_time, rusage)
+                        for start_job in [ x[0] for x in running ] + list(pending):
+                            results[start_job.name] = [ 'cancelled', None, None,
+                              None, None ]
+                        running, pending = list(), deque()
+
+                if running:
+                    time.sleep(self.poll_interval)
+        finally:
+            self._stop([ (x[0], x[1]) for x in running ])
+
+        names = [ x.name for x in jobs ]
+        rows = [ results[x] for x in names ]
+
+        lnls = [ x[1] for x in rows if x[1] is not None ]
+        best = max(lnls) if lnls else None
+
+        for row in rows:
+            row.append( best is not None and row[1] == best )
+
+        # Keep the output of the best start as the output of the job itself.
+        if best is not None:
+            best_job = jobs[ [ x[1] for x in rows ].index(best) ]
+            shutil.copyfile(best_job.output_file, job.output_file)
+            if self.journal is not None:
+                self.journal.record('completed', job.name, job.output_file)
+
+        return BaseTable(rows, row_labels=TableLabels(names) )
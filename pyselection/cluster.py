@@ -0,0 +1,457 @@
+#!/usr/bin/python -tt
+# -*- coding: utf-8 -*-
+"""Classes for distributing codeml jobs to workers over TCP.
+
+Workers are expected to share a filesystem with the coordinator, so that
+a job is handed out as the path of its control file. Messages are sent as
+JSON, signed with a key that the coordinator and its workers share.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from base64 import b64decode
+from base64 import b64encode
+from collections import deque
+import hashlib
+import hmac
+import json
+import select
+import socket
+import struct
+import time
+
+from pyselection.codeml import CodemlJob
+from pyselection.codeml import read_results
+from pyselection.codeml import result_columns
+from pyselection.core import str_types
+from pyselection.table import _dtype_names
+from pyselection.table import _dtypes_from_names
+from pyselection.table import _pack_values
+from pyselection.table import _unpack_values
+from pyselection.table import BaseTable
+from pyselection.table import TableLabels
+
+# Header of each message, giving the length of its payload.
+header = struct.Struct(str('!I'))
+
+# Largest message accepted from a peer.
+max_message_size = 64 * 1024 * 1024
+
+class ProtocolError(Exception):
+    """Exception raised for an invalid or unauthenticated message."""
+    pass
+
+def _adapt_authkey(authkey, nom):
+    """Get a key for signing messages as bytes."""
+
+    if isinstance(authkey, str_types[-1]):
+        authkey = authkey.encode('utf-8')
+
+    if not isinstance(authkey, bytes) or not authkey:
+        raise ValueError("%s requires a non-empty authentication key" % nom)
+
+    return authkey
+
+def _encode(message, authkey):
+    """Encode a message with its length and HMAC digest."""
+
+    payload = json.dumps(message, separators=(',', ':') ).encode('utf-8')
+    payload = hmac.new(authkey, payload, hashlib.sha256).digest() + payload
+
+    return header.pack( len(payload) ) + payload
+
+def _decode(payload, authkey):
+    """Decode a message once its HMAC digest is found to be valid."""
+
+    size = hashlib.sha256().digest_size
+    digest, payload = payload[:size], payload[size:]
+
+    if not hmac.compare_digest(digest, hmac.new(authkey, payload,
+      hashlib.sha256).digest() ):
+        raise ProtocolError("message failed authentication")
+
+    try:
+        message = json.loads( payload.decode('utf-8') )
+    except ValueError:
+        raise ProtocolError("message could not be decoded")
+
+    if not isinstance(message, dict) or 'type' not in message:
+        raise ProtocolError("message has no type")
+
+    return message
+
+def _encode_table(table):
+    """Encode a table as columns, packing numbers into base64 text."""
+
+    rows = table.tolist()
+    row_lengths = [ len(x) for x in rows ]
+    columns = list()
+
+    for c in range( max(row_lengths) if row_lengths else 0 ):
+
+        type_name, width, byteorder, data = _pack_values([ row[c] for row in rows
+          if len(row) > c ])
+
+        if type_name is not None:
+            data = b64encode( bytes(data) ).decode('ascii')
+
+        columns.append([ type_name, width, byteorder, data ])
+
+    labels = table.__dict__.get("row_labels")
+    if labels is not None and labels.count_labels():
+        labels = labels.tolist()
+    else:
+        labels = None
+
+    return { 'data_types': _dtype_names(table.data_types),
+      'row_lengths': row_lengths, 'columns': columns, 'labels': labels }
+
+def _decode_table(data):
+    """Decode a table encoded by _encode_table(), validating its values."""
+
+    try:
+        columns = list()
+        for type_name, width, byteorder, values in data['columns']:
+            if type_name is not None:
+                values = b64decode( values.encode('ascii') )
+            columns.append( iter( _unpack_values( (type_name, width, byteorder,
+              values) ) ) )
+
+        rows = [ [ next(columns[c]) for c in range(x) ]
+          for x in data['row_lengths'] ]
+
+        table = BaseTable(rows, data_types=_dtypes_from_names(data['data_types']) )
+
+        if data['labels'] is not None:
+            table.row_labels = TableLabels(data['labels'])
+
+    except (KeyError, IndexError, StopIteration, TypeError, ValueError,
+      AttributeError) as e:
+        raise ProtocolError("table could not be decoded (%s)" % e)
+
+    return table
+
+def _recv_message(sock, authkey):
+    """Receive one message from a blocking socket."""
+
+    payload_size = header.unpack( _recv_exactly(sock, header.size) )[0]
+
+    if payload_size > max_message_size:
+        raise ProtocolError("message of %d bytes is too large" % payload_size)
+
+    return _decode( _recv_exactly(sock, payload_size), authkey)
+
+def _recv_exactly(sock, size):
+    """Receive an exact number of bytes from a blocking socket."""
+
+    chunks = list()
+
+    while size > 0:
+        chunk = sock.recv( min(size, 65536) )
+        if not chunk:
+            raise EOFError("connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+
+    return b"".join(chunks)
+
+class _Connection(object):
+    """Class for the coordinator end of a connection to a worker."""
+
+    def __init__(self, sock, address):
+        self.sock = sock
+        self.address = address
+        self.buffer = b""
+        self.job = None
+        self.seen = time.time()
+
+    def feed(self, data, authkey):
+
+        self.buffer += data
+        self.seen = time.time()
+        messages = list()
+
+        while len(self.buffer) >= header.size:
+
+            payload_size = header.unpack( self.buffer[:header.size] )[0]
+
+            if payload_size > max_message_size:
+                raise ProtocolError("message of %d bytes is too large" %
+                  payload_size)
+
+            end = header.size + payload_size
+            if len(self.buffer) < end:
+                break
+
+            messages.append( _decode(self.buffer[header.size:end], authkey) )
+            self.buffer = self.buffer[end:]
+
+        return messages
+
+class Coordinator(object):
+    """Class for handing out codeml jobs to workers and collecting results."""
+
+    @property
+    def address(self):
+        return self._sock.getsockname()
+
+    @property
+    def jobs(self):
+        return self._jobs
+
+    @property
+    def nom(self):
+        return self.__class__.__name__
+
+    def __init__(self, jobs, authkey, address=('127.0.0.1', 0),
+      lease_time=60.0, max_leases=None, max_attempts=3, callback=None):
+
+        self._jobs = list(jobs)
+        self.authkey = _adapt_authkey(authkey, self.nom)
+
+        names = [ job.name for job in self._jobs ]
+        if len( set(names) ) != len(names):
+            raise ValueError("%s job names must be unique" % self.nom)
+
+        if lease_time <= 0:
+            raise ValueError("%s lease time must be positive" % self.nom)
+
+        if max_leases is not None and max_leases < 1:
+            raise ValueError("%s requires at least one lease" % self.nom)
+
+        if max_attempts < 1:
+            raise ValueError("%s requires at least one attempt" % self.nom)
+
+        self.lease_time = lease_time
+        self.max_leases = max_leases
+        self.max_attempts = max_attempts
+        self.callback = callback
+
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind( tuple(address) )
+        self._sock.listen(16)
+
+        self._connections = dict()
+        self._pending = deque(self._jobs)
+        self._attempts = dict.fromkeys(names, 0)
+        self._results = dict()
+
+    def _assign(self, connection):
+
+        leases = sum( 1 for x in self._connections.values() if x.job is not None )
+
+        # Hold back jobs from workers once the limit of leases is reached.
+        if not self._pending:
+            if leases:
+                return { 'type': 'wait', 'delay': 1.0 }
+            return { 'type': 'done' }
+        elif self.max_leases is not None and leases >= self.max_leases:
+            return { 'type': 'wait', 'delay': 1.0 }
+
+        job = self._pending.popleft()
+        self._attempts[job.name] += 1
+        connection.job = job
+        connection.seen = time.time()
+
+        return { 'type': 'job', 'name': job.name,
+          'control_file': job.control_file, 'executable': job.executable }
+
+    def _close(self, connection):
+
+        del self._connections[ connection.sock.fileno() ]
+
+        try:
+            connection.sock.close()
+        except socket.error:
+            pass
+
+        # Requeue the job of a worker that was lost before it finished.
+        job = connection.job
+        if job is not None:
+            connection.job = None
+            if self._attempts[job.name] < self.max_attempts:
+                self._pending.appendleft(job)
+            else:
+                self._results[job.name] = [ 'lost', None ] + [ None ] * len(result_columns)
+
+    def _handle(self, connection, message):
+
+        if message['type'] == 'request':
+            connection.sock.sendall( _encode(self._assign(connection),
+              self.authkey) )
+
+        elif message['type'] == 'heartbeat':
+            pass
+
+        elif message['type'] == 'result':
+
+            job = connection.job
+            if job is None or message.get('name') != job.name:
+                raise ProtocolError("result for a job not leased (%s)" %
+                  repr( message.get('name') ) )
+
+            connection.job = None
+            table = message.get('table')
+
+            if table is not None:
+                table = _decode_table(table)
+
+            if message.get('returncode') == 0 and table:
+                row = [ 'success', 0 ] + table[0].tolist()
+            else:
+                row = [ 'failed', message.get('returncode') ] + [ None ] * len(result_columns)
+
+            self._results[job.name] = row
+
+            if self.callback is not None:
+                self.callback(job, table)
+
+        else:
+            raise ProtocolError("invalid message type (%s)" %
+              repr(message['type']) )
+
+    def close(self):
+
+        for connection in list( self._connections.values() ):
+            self._close(connection)
+
+        self._sock.close()
+
+    def serve(self, timeout=None, poll_interval=0.5):
+
+        deadline = None if timeout is None else time.time() + timeout
+
+        while len(self._results) < len(self._jobs):
+
+            if deadline is not None and time.time() > deadline:
+                raise RuntimeError("%s timed out with %d jobs unfinished" %
+                  ( self.nom, len(self._jobs) - len(self._results) ) )
+
+            socks = [ self._sock ] + [ x.sock for x in self._connections.values() ]
+            readable, _, _ = select.select(socks, [], [], poll_interval)
+
+            for sock in readable:
+
+                if sock is self._sock:
+                    client, address = self._sock.accept()
+                    self._connections[ client.fileno() ] = _Connection(client, address)
+                    continue
+
+                connection = self._connections[ sock.fileno() ]
+
+                try:
+                    data = sock.recv(65536)
+                    if not data:
+                        raise EOFError("connection closed")
+                    for message in connection.feed(data, self.authkey):
+                        self._handle(connection, message)
+                except (EOFError, ProtocolError, socket.error):
+                    self._close(connection)
+
+            # Treat a worker that has stopped sending heartbeats as lost.
+            now = time.time()
+            for connection in list( self._connections.values() ):
+                if connection.job is not None and now - connection.seen > self.lease_time:
+                    self._close(connection)
+
+        # Let any waiting workers know that there is nothing left to do.
+        for connection in list( self._connections.values() ):
+            try:
+                connection.sock.sendall( _encode({ 'type': 'done' }, self.authkey) )
+            except socket.error:
+                pass
+
+        names = [ job.name for job in self._jobs ]
+
+        return BaseTable([ self._results[x] for x in names ],
+          row_labels=TableLabels(names) )
+
+class Worker(object):
+    """Class for running codeml jobs handed out by a coordinator."""
+
+    @property
+    def nom(self):
+        return self.__class__.__name__
+
+    def __init__(self, address, authkey, executable=None, limits=None,
+      heartbeat=5.0, poll_interval=0.5):
+
+        if heartbeat <= 0:
+            raise ValueError("%s heartbeat must be positive" % self.nom)
+
+        self.address = tuple(address)
+        self.authkey = _adapt_authkey(authkey, self.nom)
+        self.executable = executable
+        self.limits = limits
+        self.heartbeat = heartbeat
+        self.poll_interval = poll_interval
+
+    def _execute(self, sock, message):
+
+        executable = self.executable or message['executable']
+        job = CodemlJob(message['name'], message['control_file'],
+          executable=executable)
+
+        if self.limits is not None:
+            process = job.start(preexec_fn=self.limits.apply)
+        else:
+            process = job.start()
+
+        last_beat = time.time()
+
+        try:
+            while process.poll() is None:
+                time.sleep(self.poll_interval)
+                if time.time() - last_beat >= self.heartbeat:
+                    sock.sendall( _encode({ 'type': 'heartbeat',
+                      'name': job.name }, self.authkey) )
+                    last_beat = time.time()
+        except socket.error:
+            process.kill()
+            process.wait()
+            raise
+
+        if process.returncode == 0:
+            try:
+                table = _encode_table( read_results([ job ]) )
+            except (IOError, OSError, ValueError):
+                table = None
+        else:
+            table = None
+
+        sock.sendall( _encode({ 'type': 'result', 'name': job.name,
+          'returncode': process.returncode, 'table': table }, self.authkey) )
+
+    def run(self):
+
+        sock = socket.create_connection(self.address)
+        done = 0
+
+        try:
+            while True:
+
+                sock.sendall( _encode({ 'type': 'request' }, self.authkey) )
+                message = _recv_message(sock, self.authkey)
+
+                if message['type'] == 'job':
+                    self._execute(sock, message)
+                    done += 1
+                elif message['type'] == 'wait':
+                    time.sleep( message.get('delay', self.poll_interval) )
+                elif message['type'] == 'done':
+                    break
+                else:
+                    raise ProtocolError("invalid message type (%s)" %
+                      repr(message['type']) )
+
+        # Stop once the coordinator has gone away.
+        except (EOFError, socket.error):
+            pass
+        finally:
+            sock.close()
+
+        return done
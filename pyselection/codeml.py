@@ -0,0 +1,426 @@
+#!/usr/bin/python -tt
+# -*- coding: utf-8 -*-
+"""Classes and functions for running codeml."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from io import open
+import os
+import re
+import subprocess
+
+from pyselection.core import str_types
+from pyselection.pio import TextPIO
+from pyselection.table import BaseTable
+from pyselection.table import TableLabels
+
+re_dataset = re.compile(r"^\s*Data set\s+(\d+)\s*$")
+re_lnl = re.compile(r"lnL\(ntime:\s*(\d+)\s+np:\s*(\d+)\):\s*(-?\d+\.\d+)")
+re_kappa = re.compile(r"kappa \(ts/tv\)\s*=\s*(-?\d+\.\d+)")
+re_omega = re.compile(r"omega \(dN/dS\)\s*=\s*(-?\d+\.\d+)")
+re_initial = re.compile(r"^\s*Initial:\s*fx\s*=\s*(\S+)")
+re_model = re.compile(r"^\s*Model\s+\d+:")
+re_posterior_header = re.compile(r"\((NEB|BEB)\) probabilities for (\d+) classes")
+re_posterior = re.compile(r"^\s*(\d+)\s+(\S)\s+((?:\d+\.\d+\s+)+)\(\s*(\d+)\)"
+  r"\s+(-?\d+\.\d+)(?:\s+\+-\s+(\d+\.\d+))?")
+re_ancestral_header = re.compile(r"^\s*Prob of best state at each node, listed by site")
+re_ancestral = re.compile(r"^\s*(\d+)\s+\d+\s+([^:]*):(.*)$")
+re_ancestral_state = re.compile(r"(\S+)\s+(\d\.\d+)(?:\s+\((\S)\s+(\d\.\d+)\))?")
+re_iteration = re.compile(r"^\s*(\d+)\s+h-m-p(?:\s+\S+){3}\s+(?:[+\-CYQ]+\s+)?(\S+)")
+
+result_columns = ('lnL', 'np', 'kappa', 'omega')
+
+def read_alignment_size(filepath):
+    """Read the number of taxa and sites from a PHYLIP alignment header."""
+
+    with open(filepath, mode='r', encoding='utf-8') as handle:
+        for line in handle:
+            fields = line.split()
+            if fields:
+                break
+        else:
+            raise ValueError("alignment file is empty (%s)" % repr(filepath) )
+
+    try:
+        ntaxa, nsites = int(fields[0]), int(fields[1])
+    except (IndexError, ValueError):
+        raise ValueError("invalid PHYLIP alignment header (%s)" % repr(filepath) )
+
+    return (ntaxa, nsites)
+
+def parse_results(lines):
+    """Parse the main results of one data set from codeml output lines."""
+
+    results = dict.fromkeys(result_columns)
+
+    for line in lines:
+
+        m = re_lnl.search(line)
+        if m is not None and results['lnL'] is None:
+            results['np'] = int( m.group(2) )
+            results['lnL'] = float( m.group(3) )
+            continue
+
+        for key, regex in ( ('kappa', re_kappa), ('omega', re_omega) ):
+            m = regex.search(line)
+            if m is not None and results[key] is None:
+                results[key] = float( m.group(1) )
+
+    return [ results[x] for x in result_columns ]
+
+def parse_progress(lines):
+    """Parse the optimization progress of codeml from its rub or screen output.
+
+    Returns a list of iteration numbers and values of -lnL, with the initial 
+    value given as iteration zero.
+    """
+
+    progress = list()
+
+    for line in lines:
+
+        m = re_initial.match(line)
+        if m is not None:
+            iteration, value = 0, m.group(1)
+        else:
+            m = re_iteration.match(line)
+            if m is None:
+                continue
+            iteration, value = int( m.group(1) ), m.group(2)
+
+        try:
+            progress.append( (iteration, float(value) ) )
+        except ValueError:
+            continue
+
+    return progress
+
+def _rst_chunks(context, rows, chunk_size):
+    """Yield full chunks of rows of a section of an rst file as tables."""
+
+    while len(rows) >= chunk_size:
+        yield _rst_table(context, rows[:chunk_size])
+        del rows[:chunk_size]
+
+def _rst_table(context, rows):
+    """Make a table of rows of an rst file, labelled by site."""
+
+    kind, label = context
+
+    return (kind, label, BaseTable([ x[1:] for x in rows ],
+      row_labels=TableLabels([ x[0] for x in rows ]) ) )
+
+def iter_rst(filepath, chunk_size=10000):
+    """Stream site posteriors and ancestral states from a codeml rst file.
+
+    Yields tables of at most chunk size rows, each with the kind of table
+    (NEB, BEB or ancestral), the model or node it belongs to, and the table 
+    itself labelled by site. Rows of posterior tables hold the amino acid, 
+    the posterior of each site class, the most likely class, the posterior 
+    mean of omega and, for BEB, its standard error. Rows of ancestral tables 
+    hold the best state at the node with its probability and, for codons, 
+    the encoded amino acid with its probability.
+    """
+
+    if chunk_size < 1:
+        raise ValueError("rst chunk size must be positive")
+
+    model = ''
+    section = None
+    buffers = dict()
+
+    with open(filepath, mode='r', encoding='utf-8') as handle:
+
+        for line in handle:
+
+            line = line.rstrip()
+
+            if section == 'NEB' or section == 'BEB':
+
+                m = re_posterior.match(line)
+
+                if m is not None:
+                    site, aa, probs, cls, omega, se = m.groups()
+                    row = [ site, aa ] + [ float(x) for x in probs.split() ]
+                    row.extend([ int(cls), float(omega) ])
+                    if section == 'BEB':
+                        row.append( float(se) if se is not None else None )
+                    rows = buffers.setdefault( (section, model), list() )
+                    rows.append(row)
+                    for chunk in _rst_chunks( (section, model), rows, chunk_size):
+                        yield chunk
+                    continue
+
+                # Skip the lines between the header and the first site.
+                if line == '' or line.startswith('(') or not buffers:
+                    if not re_model.match(line):
+                        continue
+
+            elif section == 'ancestral':
+
+                m = re_ancestral.match(line)
+
+                if m is not None:
+                    site, data, states = m.groups()
+                    # Codon data are followed by their amino acids in brackets.
+                    ntaxa = len( data.split('(', 1)[0].split() )
+                    for i, state in enumerate( re_ancestral_state.findall(states) ):
+                        best, prob, aa, aa_prob = state
+                        node = "node #%d" % (ntaxa + i + 1)
+                        rows = buffers.setdefault( ('ancestral', node), list() )
+                        rows.append([ site, best, float(prob), aa or None,
+                          float(aa_prob) if aa_prob else None ])
+                        for chunk in _rst_chunks( ('ancestral', node), rows,
+                          chunk_size):
+                            yield chunk
+                    continue
+
+                if line == '' or not buffers or line.lstrip().startswith('site'):
+                    continue
+
+            # Emit what is left of a section once it has ended.
+            if section is not None:
+                for context in sorted(buffers):
+                    if buffers[context]:
+                        yield _rst_table(context, buffers[context])
+                buffers, section = dict(), None
+
+            m = re_posterior_header.search(line)
+            if m is not None:
+                section = m.group(1)
+            elif re_ancestral_header.match(line):
+                section = 'ancestral'
+            elif re_model.match(line):
+                model = line.strip()
+
+    for context in sorted(buffers):
+        if buffers[context]:
+            yield _rst_table(context, buffers[context])
+
+def read_results(jobs):
+    """Read the main results of codeml jobs into a table labelled by job."""
+
+    rows = [ parse_results( TextPIO(job.output_file).load() ) for job in jobs ]
+
+    return BaseTable(rows, data_types=(int, float),
+      row_labels=TableLabels([ job.name for job in jobs ]) )
+
+def split_output(lines):
+    """Split codeml output lines into one block per data set."""
+
+    blocks = list()
+    header = list()
+
+    for line in lines:
+        if re_dataset.match(line):
+            blocks.append([ line ])
+        elif blocks:
+            blocks[-1].append(line)
+        else:
+            header.append(line)
+
+    if not blocks:
+        return [ header ]
+
+    return [ header + block for block in blocks ]
+
+def read_control_file(filepath):
+    """Read settings from a codeml control file."""
+
+    settings = dict()
+
+    for line in TextPIO(filepath).load():
+
+        # Strip comments, which start with an asterisk.
+        line = line.split('*', 1)[0].strip()
+
+        if line:
+            try:
+                key, value = [ x.strip() for x in line.split('=', 1) ]
+            except ValueError:
+                raise ValueError("invalid codeml control file line (%s)" % repr(line) )
+            settings[key] = value
+
+    return settings
+
+def write_control_file(filepath, settings):
+    """Write settings to a codeml control file."""
+
+    output = [ "%14s = %s\n" % (key, settings[key]) for key in sorted(settings) ]
+    TextPIO(filepath).save(output)
+
+class CodemlJob(object):
+    """Class for a single codeml run."""
+
+    @property
+    def alignment_size(self):
+
+        try:
+            ntaxa, nsites = read_alignment_size( os.path.join(self.workdir,
+              self.settings['seqfile']) )
+        except (KeyError, IOError, OSError, ValueError):
+            return (None, None)
+
+        if self.settings.get('seqtype', '1') == '1':
+            nsites //= 3
+
+        return (ntaxa, nsites)
+
+    @property
+    def control_file(self):
+        return self._control_file
+
+    @property
+    def executable(self):
+        return self._executable
+
+    @property
+    def log_file(self):
+        return os.path.join(self.workdir, "%s.log" % self._name)
+
+    @property
+    def rub_file(self):
+        return os.path.join(self.workdir, "rub")
+
+    @property
+    def model(self):
+        return (self.settings.get('model', '0'),
+          tuple( self.settings.get('NSsites', '0').split() ) )
+
+    @property
+    def model_name(self):
+
+        model, nssites = self.model
+
+        if model == '0':
+            return " ".join( "M%s" % x for x in nssites )
+        elif nssites == ('0',):
+            return "branch (model = %s)" % model
+        elif model == '2' and nssites == ('2',):
+            return "branch-site"
+        else:
+            return "model = %s, NSsites = %s" % (model, " ".join(nssites) )
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def nom(self):
+        return self.__class__.__name__
+
+    @property
+    def output_file(self):
+        return os.path.join( self.workdir, self.settings.get('outfile', 'mlc') )
+
+    @property
+    def workdir(self):
+        return os.path.dirname(self._control_file)
+
+    def __init__(self, name, control_file, executable='codeml'):
+
+        if not isinstance(name, str_types) or name == '':
+            raise TypeError("%s name must be a non-empty string" % self.nom)
+
+        self._name = name
+        self._control_file = os.path.abspath(control_file)
+        self._executable = executable
+
+        self.settings = read_control_file(self._control_file)
+
+    def derive(self, name, workdir, settings=None):
+
+        if not os.path.isdir(workdir):
+            os.makedirs(workdir)
+
+        derived = dict(self.settings)
+
+        for key in ('seqfile', 'treefile'):
+            if key in derived:
+                derived[key] = self.get_path(key)
+
+        if settings is not None:
+            derived.update( (key, "%s" % value) for key, value in settings.items() )
+
+        control_file = os.path.join( workdir, os.path.basename(self._control_file) )
+        write_control_file(control_file, derived)
+
+        return CodemlJob(name, control_file, executable=self._executable)
+
+    def get_path(self, key):
+        return os.path.normpath( os.path.join(self.workdir, self.settings[key]) )
+
+    def start(self, preexec_fn=None):
+
+        with open(self.log_file, mode='wb') as handle:
+            process = subprocess.Popen([ self._executable,
+              os.path.basename(self._control_file) ], cwd=self.workdir,
+              stdout=handle, stderr=subprocess.STDOUT, preexec_fn=preexec_fn)
+
+        return process
+
+class PackedJob(CodemlJob):
+    """Class for a codeml run over the data sets of several jobs."""
+
+    @property
+    def alignment_size(self):
+
+        sizes = [ job.alignment_size for job in self._members ]
+
+        if any( None in x for x in sizes ):
+            return (None, None)
+
+        return ( max( x[0] for x in sizes ), sum( x[1] for x in sizes ) )
+
+    @property
+    def members(self):
+        return self._members
+
+    def __init__(self, name, members, workdir):
+
+        members = list(members)
+
+        if len(members) < 2:
+            raise ValueError("%s takes two or more jobs" % self.nom)
+
+        workdir = os.path.join(workdir, name)
+        if not os.path.isdir(workdir):
+            os.makedirs(workdir)
+
+        # Write data sets one after another, in the order of the jobs.
+        alignments = list()
+        for job in members:
+            alignments.extend( "%s\n" % x for x in
+              TextPIO( job.get_path('seqfile') ).load() )
+            alignments.append("\n")
+        TextPIO( os.path.join(workdir, "seqfile.txt") ).save(alignments)
+
+        settings = dict(members[0].settings)
+        settings['seqfile'] = "seqfile.txt"
+        settings['treefile'] = members[0].get_path('treefile')
+        settings['outfile'] = "mlc"
+        settings['ndata'] = str( len(members) )
+
+        control_file = os.path.join(workdir, "codeml.ctl")
+        write_control_file(control_file, settings)
+
+        super(PackedJob, self).__init__(name, control_file,
+          executable=members[0].executable)
+
+        self._members = members
+
+    def split_output(self):
+
+        blocks = split_output( TextPIO(self.output_file).load() )
+
+        if len(blocks) != len(self._members):
+            raise ValueError("%s output has %d data sets, expected %d" %
+              ( self.nom, len(blocks), len(self._members) ) )
+
+        for job, block in zip(self._members, blocks):
+            TextPIO(job.output_file).save([ "%s\n" % x for x in block ])
+
+        return read_results(self._members)
@@ -1,9 +1,22 @@
 #!/usr/bin/python -tt
 # -*- coding: utf-8 -*-
 
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
 from io import open
+import os
+import re
 import sys
 
+def _as_text(line):
+    """Get a line to write to a text file as unicode."""
+    if isinstance(line, bytes):
+        return line.decode('utf-8')
+    return line
+
 class TextPIO(object):
     """Class for handling basic text input/output."""
     
@@ -26,11 +39,57 @@ class TextPIO(object):
         try:
             with open(self.file, mode='w', encoding='utf-8') as handle:
                 for line in output:
-                    self.re_eol.sub("\n", line)
+                    line = self.re_eol.sub("\n", _as_text(line), count=1)
                     handle.write(line)
         except (IOError, OSError, ValueError) as e:
             raise e
 
+    def append(self, output):
+        try:
+            with open(self.file, mode='a', encoding='utf-8') as handle:
+                for line in output:
+                    line = self.re_eol.sub("\n", _as_text(line), count=1)
+                    handle.write(line)
+                handle.flush()
+                os.fsync( handle.fileno() )
+        except (IOError, OSError, ValueError) as e:
+            raise e
+
+class TextTail(object):
+    """Class for reading text appended to a file since the last read."""
+
+    def __init__(self, filepath, offset=0):
+        self.file = filepath
+        self.offset = offset
+        self._head = None
+
+    def read(self):
+        lines = list()
+        try:
+            if not os.path.isfile(self.file):
+                return lines
+            with open(self.file, mode='rb') as handle:
+                # Start again from the beginning of a file that was truncated,
+                # or rewritten since the last read.
+                head = handle.read(256)
+                if ( os.fstat( handle.fileno() ).st_size < self.offset or
+                  (self._head is not None and head[:len(self._head)] != self._head) ):
+                    self.offset = 0
+                self._head = head
+                handle.seek(self.offset)
+                data = handle.read()
+        except (IOError, OSError, ValueError) as e:
+            raise e
+        # Leave any incomplete last line to be read once it is finished.
+        end = data.rfind(b"\n") + 1
+        self.offset += end
+        for line in data[:end].splitlines():
+            lines.append( line.decode('utf-8', 'replace').rstrip() )
+        return lines
+
+    def __iter__(self):
+        return iter( self.read() )
+
 class TextInput(object):
     """Iterator class for processing text input."""
     
@@ -0,0 +1,421 @@
+#!/usr/bin/python -tt
+# -*- coding: utf-8 -*-
+"""Classes for lazy queries over tables, text files and result stores."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from io import open
+import operator
+
+from pyselection.core import int_types
+from pyselection.core import str_types
+from pyselection.table import BaseTable
+from pyselection.table import TableLabels
+
+comparisons = { '<': operator.lt, '<=': operator.le, '>': operator.gt,
+  '>=': operator.ge, '==': operator.eq, '!=': operator.ne }
+
+aggregations = { 'count': len, 'sum': sum, 'min': min, 'max': max,
+  'mean': lambda x: sum(x) / len(x) if x else None,
+  'first': lambda x: x[0] if x else None, 'list': list }
+
+def _convert_field(field):
+    """Convert a text field to an integer, float or None where possible."""
+
+    if field == '' or field == 'NA':
+        return None
+
+    for data_type in (int, float):
+        try:
+            return data_type(field)
+        except ValueError:
+            pass
+
+    return field
+
+def _compare(value, op, other):
+    """Compare a value as in SQL, where a missing value matches nothing."""
+    return value is not None and comparisons[op](value, other)
+
+class TableSource(object):
+    """Class for scanning the rows of a table."""
+
+    @property
+    def columns(self):
+        return None
+
+    def __init__(self, table):
+        self.table = table
+
+    def describe(self):
+        return "table of %d rows" % len(self.table)
+
+    def scan(self, filters, columns):
+
+        table = self.table
+        labels = table.__dict__.get("row_labels")
+
+        if labels is not None and not labels.count_labels():
+            labels = None
+
+        # Start from the rows that an indexed column allows, if any, and
+        # otherwise check every row once.
+        rows = None
+        indexes = table.__dict__.get("_indexes", dict())
+
+        for i, (column, op, value) in enumerate(filters):
+            if value is None:
+                continue
+            if column in indexes and op != '!=':
+                rows = indexes[column].range(
+                  value if op in ('>', '>=', '==') else None,
+                  value if op in ('<', '<=', '==') else None,
+                  low_inclusive=(op != '>'), high_inclusive=(op != '<') )
+                filters = filters[:i] + filters[i + 1:]
+                break
+
+        if rows is None:
+            rows = range( len(table._list) )
+
+        for r in rows:
+
+            row = table._list[r]
+            width = len(row)
+
+            if any( column >= width or not _compare(row[column], op, value)
+              for column, op, value in filters ):
+                continue
+
+            if columns is not None:
+                row = [ row[c] if c < width else None for c in columns ]
+            else:
+                row = list(row)
+
+            yield (labels[r] if labels is not None else '', row)
+
+class TextSource(object):
+    """Class for streaming the rows of a delimited text file."""
+
+    @property
+    def columns(self):
+        return self._columns
+
+    def __init__(self, filepath, sep='\t', header=True, converter=None):
+
+        self.file = filepath
+        self.sep = sep
+        self.header = header
+        self.converter = converter if converter is not None else _convert_field
+
+        self._columns = None
+
+        if header:
+            with open(filepath, mode='r', encoding='utf-8') as handle:
+                line = handle.readline().rstrip('\r\n')
+            self._columns = line.split(sep) if line else list()
+
+    def describe(self):
+        return "text file %s" % self.file
+
+    def scan(self, filters, columns):
+
+        convert = self.converter
+
+        with open(self.file, mode='r', encoding='utf-8') as handle:
+
+            if self.header:
+                handle.readline()
+
+            for line in handle:
+
+                fields = line.rstrip('\r\n').split(self.sep)
+                width = len(fields)
+
+                # Convert only the fields that filters and results need.
+                if any( column >= width or not _compare( convert(fields[column]),
+                  op, value) for column, op, value in filters ):
+                    continue
+
+                if columns is not None:
+                    row = [ convert(fields[c]) if c < width else None for c in columns ]
+                else:
+                    row = [ convert(x) for x in fields ]
+
+                yield ('', row)
+
+class StoreSource(object):
+    """Class for querying the rows of a table in a result store."""
+
+    @property
+    def columns(self):
+        return self._columns
+
+    def __init__(self, store, name, chunk_size=10000):
+
+        self.store = store
+        self.name = store._validate_identifier(name)
+        self.chunk_size = chunk_size
+
+        self._columns = store.get_columns(name)
+
+    def _get_sql(self, filters, columns):
+
+        names = self._columns
+
+        if columns is not None:
+            sql = "SELECT %s FROM %s" % (", ".join( names[c] for c in columns ),
+              self.name)
+        else:
+            sql = "SELECT * FROM %s" % self.name
+
+        if filters:
+            sql += " WHERE %s" % " AND ".join( "%s %s ?" % ( names[column],
+              '=' if op == '==' else op) for column, op, _ in filters )
+
+        return sql
+
+    def describe(self):
+        return "store table %s" % self.name
+
+    def scan(self, filters, columns):
+
+        sql = self._get_sql(filters, columns)
+        parameters = [ value for _, _, value in filters ]
+
+        for chunk in self.store.query(sql, parameters, chunk_size=self.chunk_size):
+            for row in chunk.tolist():
+                yield ('', row)
+
+class LazyTable(object):
+    """Class for a query plan over a source of rows, run only when collected."""
+
+    @classmethod
+    def from_store(this, store, name, chunk_size=10000):
+        return this( StoreSource(store, name, chunk_size=chunk_size) )
+
+    @classmethod
+    def from_table(this, table):
+        return this( TableSource(table) )
+
+    @classmethod
+    def from_text(this, filepath, sep='\t', header=True, converter=None):
+        return this( TextSource(filepath, sep=sep, header=header,
+          converter=converter) )
+
+    @property
+    def columns(self):
+        return self._columns
+
+    @property
+    def nom(self):
+        return self.__class__.__name__
+
+    def __init__(self, source, plan=(), columns=None):
+
+        self._source = source
+        self._plan = tuple(plan)
+
+        if plan:
+            self._columns = columns
+        else:
+            self._columns = source.columns
+
+    def __iter__(self):
+        for _, row in self._run():
+            yield row
+
+    def _add(self, step, columns):
+        return self.__class__(self._source, self._plan + (step,), columns=columns)
+
+    def _plan_scan(self):
+
+        # Hand the filters on columns and selections at the start of the
+        # plan to the source, keeping track of source columns as they go.
+        mapping = None
+        filters = list()
+
+        for i, step in enumerate(self._plan):
+
+            if step[0] == 'compare':
+                _, column, op, value = step
+                filters.append( (mapping[column] if mapping is not None
+                  else column, op, value) )
+            elif step[0] == 'select':
+                mapping = [ mapping[c] if mapping is not None else c
+                  for c in step[1] ]
+            else:
+                return (filters, mapping, self._plan[i:])
+
+        return (filters, mapping, ())
+
+    def _resolve(self, column):
+
+        if isinstance(column, int_types) and column >= 0:
+            return column
+
+        if isinstance(column, str_types) and self._columns is not None:
+            try:
+                return self._columns.index(column)
+            except ValueError:
+                pass
+
+        raise ValueError("%s has no column %s" % (self.nom, repr(column) ) )
+
+    def _run(self):
+
+        filters, columns, steps = self._plan_scan()
+        rows = self._source.scan(filters, columns)
+
+        for step in steps:
+            rows = getattr(self, "_run_%s" % step[0])(rows, *step[1:])
+
+        return rows
+
+    def _run_compare(self, rows, column, op, value):
+        for label, row in rows:
+            if column < len(row) and _compare(row[column], op, value):
+                yield (label, row)
+
+    def _run_filter(self, rows, predicate):
+        for label, row in rows:
+            if predicate(row):
+                yield (label, row)
+
+    def _run_groupby(self, rows, keys, functions):
+
+        groups = dict()
+        order = list()
+
+        for _, row in rows:
+            key = tuple( row[c] for c in keys )
+            if key not in groups:
+                groups[key] = [ list() for _ in functions ]
+                order.append(key)
+            values = groups[key]
+            for i, (column, _) in enumerate(functions):
+                if column is None:
+                    values[i].append(row)
+                elif row[column] is not None:
+                    values[i].append(row[column])
+
+        for key in order:
+            yield ('', list(key) + [ function(x) for (_, function), x in
+              zip(functions, groups[key]) ])
+
+    def _run_head(self, rows, n):
+        for i, item in enumerate(rows):
+            if i >= n:
+                break
+            yield item
+
+    def _run_map(self, rows, function):
+        for label, row in rows:
+            yield (label, list( function(row) ) )
+
+    def _run_select(self, rows, columns):
+        for label, row in rows:
+            width = len(row)
+            yield (label, [ row[c] if c < width else None for c in columns ])
+
+    def collect(self, data_types=None):
+
+        labels, rows = list(), list()
+
+        for label, row in self._run():
+            labels.append(label)
+            rows.append(row)
+
+        table = BaseTable(rows, data_types=data_types)
+
+        if any( x != '' for x in labels ):
+            table.row_labels = TableLabels(labels)
+
+        return table
+
+    def explain(self):
+
+        filters, columns, steps = self._plan_scan()
+        lines = [ "scan %s" % self._source.describe() ]
+
+        if filters:
+            lines.append("  filter at source: %s" % ", ".join( "%s %s %r" % x
+              for x in filters ) )
+        if columns is not None:
+            lines.append("  select at source: %s" % ", ".join( "%s" % x
+              for x in columns ) )
+
+        for step in steps:
+            lines.append( "%s %s" % ( step[0], ", ".join( repr(x)
+              for x in step[1:] ) ) )
+
+        return lines
+
+    def filter(self, predicate, op=None, value=None):
+
+        # A comparison on a column can be run by the source itself.
+        if op is not None:
+            if op not in comparisons:
+                raise ValueError("invalid %s comparison (%s)" % (self.nom, repr(op) ) )
+            return self._add( ('compare', self._resolve(predicate), op, value),
+              self._columns)
+
+        if not callable(predicate):
+            raise TypeError("%s filter takes a function or a comparison" % self.nom)
+
+        return self._add( ('filter', predicate), self._columns)
+
+    def groupby(self, keys, functions):
+
+        if isinstance(keys, (int_types, str_types) ):
+            keys = [ keys ]
+
+        keys = [ self._resolve(x) for x in keys ]
+        names = [ self._columns[x] for x in keys ] if self._columns else None
+        resolved = list()
+
+        for item in functions:
+
+            column, function = item[:2]
+
+            if column is not None:
+                column = self._resolve(column)
+
+            if not callable(function):
+                try:
+                    function = aggregations[function]
+                except (KeyError, TypeError):
+                    raise ValueError("invalid %s aggregation (%s)" %
+                      (self.nom, repr(function) ) )
+
+            resolved.append( (column, function) )
+
+            if names is not None:
+                names.append(item[2] if len(item) > 2 else "%s_%s" %
+                  (self._columns[column] if column is not None else 'rows',
+                  item[1] if not callable(item[1]) else item[1].__name__) )
+
+        return self._add( ('groupby', keys, resolved), names)
+
+    def head(self, n):
+
+        if not isinstance(n, int_types) or n < 0:
+            raise ValueError("%s head takes a non-negative integer" % self.nom)
+
+        return self._add( ('head', n), self._columns)
+
+    def map(self, function, columns=None):
+        return self._add( ('map', function), list(columns) if columns else None)
+
+    def select(self, *columns):
+
+        columns = [ self._resolve(x) for x in columns ]
+
+        if self._columns is not None:
+            names = [ self._columns[x] for x in columns ]
+        else:
+            names = None
+
+        return self._add( ('select', columns), names)
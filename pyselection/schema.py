@@ -0,0 +1,344 @@
+#!/usr/bin/python -tt
+# -*- coding: utf-8 -*-
+"""Classes for declaring and inferring the column types of a table."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from io import open
+from types import NoneType
+
+from pyselection import core
+from pyselection.core import int_types
+from pyselection.core import str_types
+
+# Column types, from the tightest to the loosest, and categories of strings
+# stored as integer codes.
+column_types = ('bool', 'int', 'float', 'str', 'category')
+
+# Text fields read as missing values.
+null_fields = ('', 'NA')
+
+bool_fields = { 'True': True, 'true': True, 'False': False, 'false': False }
+
+def _field_type(field):
+    """Get the tightest column type of a text field."""
+
+    if field in bool_fields:
+        return 'bool'
+
+    for column_type, data_type in (('int', int), ('float', float)):
+        try:
+            data_type(field)
+            return column_type
+        except ValueError:
+            pass
+
+    return 'str'
+
+def _value_type(value):
+    """Get the tightest column type of a value."""
+
+    if isinstance(value, bool):
+        return 'bool'
+    elif isinstance(value, int_types):
+        return 'int'
+    elif isinstance(value, float):
+        return 'float'
+    elif isinstance(value, str_types):
+        return 'str'
+
+    raise TypeError("no column type for values of type %s" %
+      repr(type(value).__name__) )
+
+def _widest_type(column_types_seen, text=False):
+    """Get the tightest column type that holds every type seen."""
+
+    seen = set(column_types_seen)
+
+    if not seen:
+        return 'str'
+    elif len(seen) == 1:
+        return seen.pop()
+    elif text and 'bool' in seen:
+        # Boolean fields cannot be read as numbers, only as strings.
+        return 'str'
+    elif seen <= set(['bool', 'int']):
+        return 'int'
+    elif seen <= set(['bool', 'int', 'float']):
+        return 'float'
+    elif text:
+        # Any text field can be read as a string.
+        return 'str'
+
+    raise TypeError("cannot infer column type from types (%s)" %
+      ", ".join( sorted(seen) ) )
+
+class ColumnSpec(object):
+    """Class for the name, type and nullability of a table column."""
+
+    @property
+    def data_type(self):
+        return self._data_type
+
+    @property
+    def data_types(self):
+        return self._data_types
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def nom(self):
+        return self.__class__.__name__
+
+    @property
+    def nullable(self):
+        return self._nullable
+
+    @property
+    def typecode(self):
+        return { 'bool': str('b'), 'int': str('l'), 'float': str('d') }.get(
+          self._data_type)
+
+    def __init__(self, name, data_type='str', nullable=False):
+
+        if not isinstance(name, str_types):
+            raise TypeError("%s name must be a string" % self.nom)
+        if data_type not in column_types:
+            raise ValueError("%s data type (%s) must be one of %s" % (self.nom,
+              repr(data_type), ", ".join(column_types) ) )
+
+        self._name = name
+        self._data_type = data_type
+        self._nullable = bool(nullable)
+
+        data_types = { 'bool': (bool,), 'int': int_types,
+          'float': (float,) + int_types, 'str': str_types,
+          'category': str_types }[data_type]
+
+        if self._nullable:
+            data_types += (NoneType,)
+
+        self._data_types = data_types
+
+    def __eq__(self, other):
+        try:
+            return (self._name, self._data_type, self._nullable) == (other.name,
+              other.data_type, other.nullable)
+        except AttributeError:
+            return False
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __reduce__(self):
+        return (self.__class__, (self._name, self._data_type, self._nullable) )
+
+    def adapt_values(self, values):
+
+        data_types = self._data_types
+
+        # Booleans are integers, so they are checked by type, not instance.
+        if self._data_type == 'bool':
+            valid = all( type(x) is bool or (x is None and self._nullable)
+              for x in values )
+        else:
+            valid = all( isinstance(x, data_types) for x in values )
+
+        if not valid:
+            raise TypeError("%s %s values must be of type %s%s" % (self.nom,
+              repr(self._name), self._data_type, " or None" if self._nullable
+              else "") )
+
+        if self._data_type == 'float':
+            values = [ float(x) if x is not None else None for x in values ]
+
+        return values
+
+    def parse(self, field):
+
+        if field in null_fields:
+            if not self._nullable:
+                raise ValueError("%s %s cannot be empty" % (self.nom,
+                  repr(self._name) ) )
+            return None
+
+        if self._data_type == 'bool':
+            try:
+                return bool_fields[field]
+            except KeyError:
+                raise ValueError("%s %s value (%s) is not a boolean" % (self.nom,
+                  repr(self._name), repr(field) ) )
+        elif self._data_type == 'int':
+            return int(field)
+        elif self._data_type == 'float':
+            return float(field)
+
+        return field
+
+class TableSchema(object):
+    """Class for the column specifications of a table."""
+
+    @classmethod
+    def from_text(this, filepath, sep='\t', header=True, sample_size=1000,
+      max_categories=None):
+
+        with open(filepath, mode='r', encoding='utf-8') as handle:
+
+            names = handle.readline().rstrip('\r\n').split(sep) if header else None
+            samples = list()
+
+            for line in handle:
+                if len(samples) >= sample_size:
+                    break
+                samples.append( line.rstrip('\r\n').split(sep) )
+
+        return this.infer_fields(samples, names=names,
+          max_categories=max_categories)
+
+    @classmethod
+    def infer(this, rows, names=None, sample_size=None, max_categories=None):
+
+        # Infer from the first rows, which may be read from a stream.
+        samples = list()
+
+        for row in rows:
+            if sample_size is not None and len(samples) >= sample_size:
+                break
+            samples.append( list(row) )
+
+        width = this._get_width(samples, names)
+        columns = list()
+
+        for c in range(width):
+            values = [ row[c] for row in samples if row[c] is not None ]
+            columns.append( this._get_spec( this._get_name(names, c),
+              _widest_type( _value_type(x) for x in values ), values,
+              len(values) < len(samples), max_categories) )
+
+        return this(columns)
+
+    @classmethod
+    def infer_fields(this, rows, names=None, max_categories=None):
+
+        samples = [ list(x) for x in rows ]
+        width = this._get_width(samples, names)
+        columns = list()
+
+        for c in range(width):
+            fields = [ row[c] for row in samples if row[c] not in null_fields ]
+            columns.append( this._get_spec( this._get_name(names, c),
+              _widest_type( (_field_type(x) for x in fields), text=True),
+              fields, len(fields) < len(samples), max_categories) )
+
+        return this(columns)
+
+    @classmethod
+    def _get_name(this, names, index):
+        return names[index] if names is not None else "column%d" % index
+
+    @classmethod
+    def _get_spec(this, name, data_type, values, nullable, max_categories):
+
+        # Strings with few distinct values are stored as categories.
+        if ( data_type == 'str' and max_categories is not None and values and
+          len( set(values) ) <= max_categories ):
+            data_type = 'category'
+
+        return ColumnSpec(name, data_type, nullable=nullable)
+
+    @classmethod
+    def _get_width(this, rows, names):
+
+        widths = set( len(x) for x in rows )
+
+        if names is not None:
+            widths.add( len(names) )
+
+        if len(widths) > 1:
+            raise ValueError("%s rows must all have the same length" % this.__name__)
+
+        return widths.pop() if widths else 0
+
+    @property
+    def columns(self):
+        return tuple(self._columns)
+
+    @property
+    def data_types(self):
+        data_types = set( x for column in self._columns for x in column.data_types )
+        return tuple( x for x in core.table_data_types if x in data_types )
+
+    @property
+    def names(self):
+        return tuple( x.name for x in self._columns )
+
+    @property
+    def nom(self):
+        return self.__class__.__name__
+
+    def __init__(self, columns):
+
+        specs = list()
+
+        for column in columns:
+            if isinstance(column, ColumnSpec):
+                specs.append(column)
+            elif isinstance(column, str_types):
+                specs.append( ColumnSpec(column) )
+            else:
+                specs.append( ColumnSpec(*column) )
+
+        names = [ x.name for x in specs ]
+        if len( set(names) ) != len(names):
+            raise ValueError("%s column names must be unique" % self.nom)
+
+        self._columns = specs
+
+    def __bool__(self):
+        return len(self._columns) != 0
+
+    def __eq__(self, other):
+        try:
+            return list(self._columns) == list(other.columns)
+        except AttributeError:
+            return False
+
+    def __getitem__(self, key):
+
+        if isinstance(key, str_types):
+            return self._columns[ self.index(key) ]
+
+        return self._columns[key]
+
+    def __iter__(self):
+        return iter(self._columns)
+
+    def __len__(self):
+        return len(self._columns)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __nonzero__(self):
+        return self.__bool__()
+
+    def index(self, name):
+
+        for i, column in enumerate(self._columns):
+            if column.name == name:
+                return i
+
+        raise ValueError("%s has no column %s" % (self.nom, repr(name) ) )
+
+    def parse(self, fields):
+
+        if len(fields) != len(self._columns):
+            raise ValueError("%s expected %d fields, not %d" % (self.nom,
+              len(self._columns), len(fields) ) )
+
+        return [ column.parse(x) for column, x in zip(self._columns, fields) ]
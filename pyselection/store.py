@@ -0,0 +1,249 @@
+#!/usr/bin/python -tt
+# -*- coding: utf-8 -*-
+"""Classes for storing codeml results in an SQLite database."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import re
+import sqlite3
+
+from pyselection.core import str_types
+from pyselection.table import BaseTable
+from pyselection.table import TableLabels
+
+re_identifier = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# Columns indexed in each table that has them.
+indexed_columns = ('gene', 'model', 'branch', 'site')
+
+def _column_type(values):
+    """Get the SQLite type of a column from its values."""
+
+    for value in values:
+        if value is None:
+            continue
+        elif isinstance(value, bool):
+            return 'INTEGER'
+        elif isinstance(value, float):
+            return 'REAL'
+        elif isinstance(value, str_types):
+            return 'TEXT'
+        try:
+            int(value)
+            return 'INTEGER'
+        except (TypeError, ValueError):
+            return ''
+
+    return ''
+
+class ResultStore(object):
+    """Class for an indexed SQLite store of result tables."""
+
+    @property
+    def file(self):
+        return self._file
+
+    @property
+    def nom(self):
+        return self.__class__.__name__
+
+    def __init__(self, filepath):
+
+        self._file = filepath
+
+        # Transactions are managed explicitly, so that a load and its
+        # indexes are committed together.
+        self._connection = sqlite3.connect(filepath, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.execute("PRAGMA synchronous = NORMAL")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _validate_identifier(self, name):
+
+        if not isinstance(name, str_types) or not re_identifier.match(name):
+            raise ValueError("invalid %s identifier (%s)" % (self.nom, repr(name) ) )
+
+        return name
+
+    def close(self):
+        self._connection.close()
+
+    def get_columns(self, name):
+
+        cursor = self._connection.execute("PRAGMA table_info(%s)" %
+          self._validate_identifier(name) )
+
+        return [ row[1] for row in cursor ]
+
+    def get_tables(self):
+
+        cursor = self._connection.execute("SELECT name FROM sqlite_master "
+          "WHERE type = 'table' ORDER BY name")
+
+        return [ row[0] for row in cursor ]
+
+    def ingest(self, name, table, columns, label_column=None):
+
+        if not isinstance(table, BaseTable):
+            raise TypeError("%s can only ingest a BaseTable" % self.nom)
+
+        name = self._validate_identifier(name)
+        columns = [ self._validate_identifier(x) for x in columns ]
+
+        if label_column is not None:
+            columns.insert(0, self._validate_identifier(label_column) )
+            try:
+                labels = table.row_labels
+            except AttributeError:
+                raise ValueError("%s cannot ingest labels of unlabelled table" % self.nom)
+
+        if len( set(columns) ) != len(columns):
+            raise ValueError("%s column names must be unique" % self.nom)
+
+        if label_column is not None:
+            rows = ( [ label ] + list(row) for label, row in zip(labels, table) )
+        else:
+            rows = ( list(row) for row in table )
+
+        width = len(columns)
+        rows = [ tuple(row) for row in rows ]
+
+        if any( len(row) != width for row in rows ):
+            raise ValueError("%s table rows must have one value per column" % self.nom)
+
+        existing = self.get_columns(name)
+
+        if existing and existing != columns:
+            raise ValueError("%s table %s has columns (%s)" % (self.nom, name,
+              ", ".join(existing) ) )
+
+        cursor = self._connection.cursor()
+
+        try:
+            cursor.execute("BEGIN")
+
+            if not existing:
+                cursor.execute("CREATE TABLE %s (%s)" % (name, ", ".join(
+                  ( "%s %s" % (x, _column_type( row[i] for row in rows ) ) ).strip()
+                  for i, x in enumerate(columns) ) ) )
+                nrows = 0
+            else:
+                nrows = cursor.execute("SELECT COUNT(*) FROM %s" % name).fetchone()[0]
+
+            index_names = [ ("idx_%s_%s" % (name, x), x) for x in columns
+              if x in indexed_columns ]
+
+            # Drop the indexes of a table before a load of comparable size,
+            # so that they are built once after the load and not row by row.
+            if len(rows) >= nrows:
+                for index_name, _ in index_names:
+                    cursor.execute("DROP INDEX IF EXISTS %s" % index_name)
+
+            cursor.executemany("INSERT INTO %s VALUES (%s)" % (name,
+              ", ".join("?" * width) ), rows)
+
+            for index_name, column in index_names:
+                cursor.execute("CREATE INDEX IF NOT EXISTS %s ON %s (%s)" %
+                  (index_name, name, column) )
+
+            cursor.execute("COMMIT")
+
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+
+        finally:
+            cursor.close()
+
+        return len(rows)
+
+    def _check_labels(self, sql, parameters, label_column):
+
+        column = '"%s"' % label_column.replace('"', '""')
+        row = self._connection.execute("SELECT %s FROM (%s) GROUP BY %s "
+          "HAVING COUNT(*) > 1 LIMIT 1" % (column, sql.rstrip().rstrip(';'),
+          column), parameters).fetchone()
+
+        if row is not None:
+            raise ValueError("%s query labels must be unique, but column %s "
+              "repeats %s" % (self.nom, repr(label_column), repr("%s" % row[0]) ) )
+
+    def _iter_chunks(self, cursor, chunk_size, label_index):
+
+        try:
+            while True:
+
+                rows = cursor.fetchmany(chunk_size)
+
+                if not rows:
+                    break
+
+                if label_index is not None:
+                    labels = TableLabels([ "%s" % row[label_index] for row in rows ])
+                    rows = [ row[:label_index] + row[label_index + 1:] for row in rows ]
+                else:
+                    labels = None
+
+                yield BaseTable([ list(row) for row in rows ], row_labels=labels)
+
+        finally:
+            cursor.close()
+
+    def query(self, sql, parameters=(), chunk_size=10000, label_column=None):
+        """Run a query, returning an iterator over tables of its results.
+
+        Rows can be labelled by a column of the results, whose values must 
+        then be unique across all the results, not only within each table.
+        """
+
+        if chunk_size < 1:
+            raise ValueError("%s chunk size must be positive" % self.nom)
+
+        cursor = self._connection.execute(sql, parameters)
+        label_index = None
+
+        # Check the query here, and not once the results are first read.
+        try:
+            if label_column is not None:
+
+                columns = [ x[0] for x in cursor.description ]
+
+                try:
+                    label_index = columns.index(label_column)
+                except ValueError:
+                    raise ValueError("%s query has no column %s" % (self.nom,
+                      repr(label_column) ) )
+
+                self._check_labels(sql, parameters, label_column)
+
+        except Exception:
+            cursor.close()
+            raise
+
+        return self._iter_chunks(cursor, chunk_size, label_index)
+
+    def select(self, name, where=None, parameters=(), columns=None,
+      chunk_size=10000, label_column=None):
+
+        name = self._validate_identifier(name)
+
+        if columns is not None:
+            columns = ", ".join( self._validate_identifier(x) for x in columns )
+        else:
+            columns = "*"
+
+        sql = "SELECT %s FROM %s" % (columns, name)
+
+        if where is not None:
+            sql += " WHERE %s" % where
+
+        return self.query(sql, parameters, chunk_size=chunk_size,
+          label_column=label_column)
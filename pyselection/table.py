@@ -7,18 +7,380 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
+from array import array
+from bisect import bisect_left, bisect_right
 from collections import MutableSequence
 from copy import copy, deepcopy
+from itertools import compress
+from hashlib import sha1
+from io import open
 from types import NoneType
+import struct
+import sys
+
+try:
+    from pickle import PickleBuffer
+except ImportError:
+    PickleBuffer = None
 
 from pyselection import core
 from pyselection.core import int_types
 from pyselection.core import str_types
 from pyselection.core import is_sized_iterable
 from pyselection.core import range
+from pyselection.schema import ColumnSpec
+from pyselection.schema import TableSchema
+
+# Aggregations of the values of a column, skipping missing values.
+column_aggregations = { 'count': len, 'sum': sum, 
+  'min': lambda x: min(x) if x else None, 'max': lambda x: max(x) if x else None, 
+  'mean': lambda x: sum(x) / len(x) if x else None }
+
+def _apply_chunk(args):
+    """Apply a function to each row of a chunk of a table."""
+
+    function, chunk = args
+    results = list()
+
+    for row in chunk._list:
+        result = function( list(row) )
+        if not is_sized_iterable(result) or isinstance(result, str_types):
+            result = [ result ]
+        results.append( list(result) )
+
+    return _wrap_rows(BaseTable, chunk._dtypes, chunk._rtype, results)
+
+def _wrap_rows(cls, data_types, row_type, rows):
+    """Wrap rows in a table without validating their elements."""
+
+    table = cls.__new__(cls)
+    table._dtypes = data_types
+    table._rtype = row_type
+    table._list = rows
+
+    return table
+
+def _dtype_names(data_types):
+    """Get picklable names of table data types."""
+    return tuple(x.__name__ for x in data_types)
+
+def _dtypes_from_names(names):
+    """Get table data types from their names."""
+    name2dtype = dict( (x.__name__, x) for x in core.table_data_types )
+    return tuple(name2dtype[x] for x in names)
+
+def _int64_typecode():
+    """Get the typecode of 64-bit integer buffers, if the platform has one."""
+
+    for typecode in ('q', 'l'):
+        try:
+            if array( str(typecode) ).itemsize == 8:
+                return str(typecode)
+        except ValueError:
+            pass
+
+    return None
+
+_int64 = _int64_typecode()
+
+# Types of numbers kept in the array buffers of a TableBuilder, by typecode.
+_buffer_types = { str('d'): float, _int64: int }
+
+# Types of packed values by name, so that Python 2 longs stay longs.
+_packed_types = dict( (x.__name__, x) for x in (float,) + int_types )
+
+def _column_buffer(value):
+    """Get an empty buffer for a column starting with a value."""
+
+    if type(value) is float:
+        return array( str('d') )
+    elif type(value) is int and _int64 is not None:
+        return array(_int64)
+
+    return list()
+
+def _pack_values(values, protocol=2):
+    """Pack a sequence of values into a little-endian 64-bit buffer where possible."""
+
+    value_types = set( type(x) for x in values )
+    value_type = value_types.pop() if len(value_types) == 1 else None
+
+    if value_type is float:
+        typecode = str('d')
+    elif value_type in int_types:
+        typecode = _int64
+    else:
+        return (None, None, None, list(values))
+
+    # Values are always packed as 8 bytes, whatever the width of a C long.
+    try:
+        if typecode is not None:
+            buffer = array(typecode, values)
+            if sys.byteorder != 'little':
+                buffer.byteswap()
+        else:
+            buffer = None
+            data = struct.pack( str('<%dq') % len(values), *values)
+    except (OverflowError, struct.error):
+        return (None, None, None, list(values))
+
+    if buffer is not None:
+        if protocol >= 5 and PickleBuffer is not None:
+            data = PickleBuffer(buffer)
+        elif hasattr(buffer, "tobytes"):
+            data = buffer.tobytes()
+        else:
+            data = buffer.tostring()
+
+    return (value_type.__name__, 8, 'little', data)
+
+def _unpack_values(packed):
+    """Unpack a sequence of values packed by _pack_values()."""
+
+    type_name, width, byteorder, data = packed
+
+    if type_name is None:
+        return data
+
+    value_type = _packed_types.get(type_name, int)
+    typecode = str('d') if value_type is float else _int64
+
+    if typecode is not None and array(typecode).itemsize == width:
+
+        buffer = array(typecode)
+
+        if hasattr(buffer, "frombytes"):
+            buffer.frombytes( bytes(data) )
+        else:
+            buffer.fromstring( bytes(data) )
+
+        if byteorder != sys.byteorder:
+            buffer.byteswap()
+
+        values = buffer.tolist()
+
+    else:
+        values = list( struct.unpack( str('%s%d%s') % ('<' if byteorder == 'little' 
+          else '>', len(data) // width, 'd' if value_type is float else 'q'), 
+          bytes(data) ) )
+
+    if value_type is not float and value_type is not int:
+        values = [ value_type(x) for x in values ]
+
+    return values
+
+def _value_key(value):
+    """Get a stable byte string identifying a single table value."""
+
+    if value is None:
+        key = b'N'
+    elif isinstance(value, bytes):
+        key = b'S' + value
+    elif isinstance(value, str_types):
+        key = b'S' + value.encode('utf-8')
+    elif isinstance(value, bool):
+        key = b'B1' if value else b'B0'
+    elif isinstance(value, int_types):
+        key = ( 'I%d' % value ).encode('ascii')
+    else:
+        key = ( '%s%r' % (type(value).__name__, value) ).encode('ascii')
+
+    return ( '%d:' % len(key) ).encode('ascii') + key
+
+def _digest_values(values):
+    """Get a digest of a sequence of values from their packed buffer."""
+
+    type_name, _, _, data = _pack_values(values)
+    hasher = sha1()
+
+    # Packed buffers are little-endian, so digests match across platforms.
+    if type_name is not None:
+        hasher.update( type_name.encode('ascii') )
+        hasher.update(data)
+    else:
+        for value in data:
+            hasher.update( _value_key(value) )
+
+    return hasher.digest()
+
+def _import_pyarrow():
+    """Import pyarrow, which is only needed for Arrow and Parquet support."""
+
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("Arrow and Parquet support requires pyarrow")
+
+    return pyarrow
+
+def _to_arrow_array(pyarrow, values):
+    """Make an Arrow array of a column, reusing its packed buffer if any."""
+
+    type_name, _, _, data = _pack_values(values)
+
+    if type_name is None:
+        return pyarrow.array(list(values) )
+
+    # Packed buffers are little-endian 64-bit values, as Arrow's are.
+    if type_name == 'float':
+        arrow_type = pyarrow.float64()
+    else:
+        arrow_type = pyarrow.int64()
+
+    return pyarrow.Array.from_buffers(arrow_type, len(values), 
+      [ None, pyarrow.py_buffer(data) ])
+
+def _from_arrow_array(pyarrow, column):
+    """Get the values of an Arrow column, unpacking numeric buffers whole."""
+
+    chunks = getattr(column, "chunks", [ column ])
+    values = list()
+
+    for chunk in chunks:
+
+        arrow_type = chunk.type
+
+        if arrow_type == pyarrow.float64():
+            typecode = str('d')
+        elif arrow_type == pyarrow.int64() and array( str('l') ).itemsize == 8:
+            typecode = str('l')
+        elif arrow_type == pyarrow.int32() and array( str('i') ).itemsize == 4:
+            typecode = str('i')
+        else:
+            typecode = None
+
+        if typecode is None or chunk.null_count or sys.byteorder != 'little':
+            values.extend( chunk.to_pylist() )
+            continue
+
+        buffer = array(typecode)
+        start = chunk.offset * buffer.itemsize
+        stop = start + len(chunk) * buffer.itemsize
+        data = chunk.buffers()[1].to_pybytes()[start:stop]
+
+        if hasattr(buffer, "frombytes"):
+            buffer.frombytes(data)
+        else:
+            buffer.fromstring(data)
+
+        values.extend( buffer.tolist() )
+
+    return values
+
+def _restore_list(cls, dtype_names, packed):
+    """Restore a pickled BaseList without validating its elements."""
+    return cls._from_list(_unpack_values(packed),
+      _dtypes_from_names(dtype_names))
+
+def _rows_from_columns(row_lengths, columns):
+    """Make rows of the given lengths from columns holding the values of
+    the rows that are long enough to have them."""
+
+    if len( set(row_lengths) ) == 1 and columns:
+        return [ list(x) for x in zip(*columns) ]
+
+    rows = [ list() for _ in row_lengths ]
+
+    for c, column in enumerate(columns):
+        values = iter(column)
+        for row, row_length in zip(rows, row_lengths):
+            if row_length > c:
+                row.append( next(values) )
+
+    return rows
+
+def _restore_table(cls, dtype_names, row_type, row_lengths, columns, labels):
+    """Restore a pickled BaseTable without validating its elements."""
+
+    data_types = _dtypes_from_names(dtype_names)
+    rows = _rows_from_columns( _unpack_values(row_lengths),
+      [ _unpack_values(x) for x in columns ] )
+
+    table = cls.__new__(cls)
+    table._dtypes = data_types
+    table._rtype = row_type
+    table._list = rows
+
+    if labels is not None:
+        table.row_labels = labels
+
+    return table
+
+def _restore_ragged(cls, dtype_names, row_type, offsets, values, labels):
+    """Restore a pickled RaggedTable without validating its elements."""
+
+    table = cls.__new__(cls)
+    table._dtypes = _dtypes_from_names(dtype_names)
+    table._rtype = row_type
+    table._list = RaggedRows._from_buffers(_unpack_values(values), 
+      array( str('l'), _unpack_values(offsets) ) )
+
+    if labels is not None:
+        table.row_labels = labels
+
+    return table
+
+def _restore_categorical(categories, codes):
+    """Restore a pickled CategoricalColumn without encoding its values."""
+    return CategoricalColumn._from_buffers(list(categories), 
+      array( str('l'), _unpack_values(codes) ) )
+
+def _restore_masked(typecode, values, valid):
+    """Restore a pickled MaskedColumn without checking its values."""
+    return MaskedColumn._from_buffers( array( typecode, _unpack_values(values) ), 
+      bytearray(valid) )
+
+def _restore_columns(cls, schema, row_type, columns, length, labels):
+    """Restore a pickled ColumnTable without validating its elements."""
+
+    table = cls.__new__(cls)
+    table._dtypes = cls.validate_data_types(schema.data_types)
+    table._rtype = row_type
+    table._list = ColumnRows._from_buffers(schema, [ x 
+      if isinstance(x, (CategoricalColumn, MaskedColumn) ) 
+      else ColumnRows._new_column(spec, 
+      _unpack_values(x) ) for spec, x in zip(schema, columns) ], length)
+
+    if labels is not None:
+        table.row_labels = labels
+
+    return table
+
+def _index_labels(labels):
+    """Map each label that is set to its index."""
+    
+    if isinstance(labels, PackedLabels):
+        return labels.index
+    elif isinstance(labels, SparseLabels):
+        return dict( (x, i) for i, x in labels.items() )
+    else:
+        return dict( (x, i) for i, x in enumerate(labels) if x != '' )
+
+def _restore_labels(cls, labels):
+    """Restore pickled TableLabels without validating them."""
+
+    obj = cls.__new__(cls)
+    obj._labels = labels
+    obj._label2index = _index_labels(labels)
+    return obj
+
+def _restore_packed_labels(data, offsets):
+    """Restore pickled PackedLabels, rebuilding their hash index."""
+    return PackedLabels._from_buffers(data, array( str('l'), 
+      _unpack_values(offsets) ) )
+
+# Placeholder for values missing from a column index.
+_missing = object()
+
+class _OwnedRow(list):
+    """Class for a table row copied on write, marked with the token of its table."""
+    
+    __slots__ = ('_owner',)
 
 class BaseList(MutableSequence):
     
+    __slots__ = ('_dtypes', '_list', '_digest', '_sorted')
+    
     @classmethod
     def validate_data_types(this, data_types):
         if not isinstance(data_types, tuple):
@@ -30,12 +392,23 @@ class BaseList(MutableSequence):
                   (this.__name__, str( tuple(x.__name__ 
                   for x in core.table_data_types) ) ) )
         data_types.add(NoneType)
-        return tuple( sorted( list(data_types) ) )
+        return tuple( x for x in core.table_data_types if x in data_types )
+
+    @classmethod
+    def _from_list(this, values, data_types):
+        obj = this.__new__(this)
+        obj._dtypes = data_types
+        obj._list = values
+        return obj
 
     @property
     def data_types(self):
         return self._dtypes
     
+    @property
+    def is_sorted(self):
+        return getattr(self, "_sorted", False)
+    
     @property
     def nom(self):
         return repr(self.__class__.__name__)
@@ -70,13 +443,22 @@ class BaseList(MutableSequence):
         return len(self._list) != 0
 
     def __contains__(self, value):
+        
+        if self.is_sorted:
+            try:
+                i = bisect_left(self._list, value)
+                return i < len(self._list) and self._list[i] == value
+            except TypeError:
+                pass
+        
         return value in self._list
 
     def __copy__(self):
-        return self.__class__(copy(self._list), data_types=self._dtypes) 
+        return self.__class__._from_list(list(self._list), self._dtypes) 
 
     def __deepcopy__(self, memo=dict() ):
-        return self.__class__(deepcopy(self._list, memo), data_types=self._dtypes)
+        # Elements are immutable, so a deep copy need not copy them.
+        return self.__copy__()
 
     def __delitem__(self, key):
         
@@ -92,6 +474,9 @@ class BaseList(MutableSequence):
             
         else:
             raise TypeError("invalid %s key (%s)" % (self.nom, repr(key)))
+        
+        self._digest = None
+        self._sorted = False
 
     def __eq__(self, other):
     
@@ -167,6 +552,10 @@ class BaseList(MutableSequence):
         else:
             return other.__add__(self)
 
+    def __reduce_ex__(self, protocol):
+        return (_restore_list, (self.__class__, _dtype_names(self._dtypes), 
+          _pack_values(self._list, protocol) ) )
+
     def __reversed__(self):
 
         for x in reversed(self._list):
@@ -221,7 +610,7 @@ class BaseList(MutableSequence):
  
         if slc.start is not None:
             start = slc.start
-            if start < -length or start >= length:
+            if start < -length or start > length:
                 raise IndexError("%s slice start (%d) out of range" % (self.nom, start) )
             if start < 0:
                 start += length
@@ -286,10 +675,66 @@ class BaseList(MutableSequence):
         i = len(self._list)
         self[i:i] = [ value ]
 
+    def _adapt_range(self, start, stop):
+        
+        length = len(self._list)
+    
+        if start is not None:
+            if not isinstance(start, int_types):
+                raise IndexError("%s start index (%s) must be an integer" % 
+                  (self.nom, repr(start) ) )
+            if start < -length or start >= length:
+                raise IndexError("%s start index (%d) out of range" % 
+                  (self.nom, start) )
+            if start < 0:
+                start += length
+        else:
+            start = 0
+            
+        if stop is not None:
+            if not isinstance(stop, int_types):
+                raise IndexError("%s stop index (%s) must be an integer" % 
+                  (self.nom, repr(stop) ) )
+            if stop < -length or stop > length:
+                raise IndexError("%s stop index (%d) out of range" % 
+                  (self.nom, stop) )
+            if stop < 0:
+                stop += length
+        else:
+            stop = length          
+            
+        if start >= stop:
+            raise IndexError("%s iteration range has length zero" % self.nom)
+        
+        return (start, stop)
+    
+    def _bisect_range(self, value, start, stop):
+        
+        # Find where a value lies in a sorted list, or None if it cannot.
+        if not self.is_sorted:
+            return None
+        
+        try:
+            return ( bisect_left(self._list, value, start, stop), 
+              bisect_right(self._list, value, start, stop) )
+        except TypeError:
+            return None
+
     def count(self, value, start=None, stop=None):
 
-        indices = self.iter_indices(start=start, stop=stop)
-        return sum( 1 if self._list[i] == value else 0 for i in indices )
+        start, stop = self._adapt_range(start, stop)
+        
+        found = self._bisect_range(value, start, stop)
+        if found is not None:
+            return found[1] - found[0]
+        
+        if not isinstance(self._list, list):
+            return sum( 1 if self._list[i] == value else 0 
+              for i in range(start, stop) )
+        elif start == 0 and stop == len(self._list):
+            return self._list.count(value)
+        else:
+            return self._list[start:stop].count(value)
     
     def extend(self, values):
     
@@ -298,8 +743,41 @@ class BaseList(MutableSequence):
     
     def findall(self, value, start=None, stop=None):
 
-        indices = self.iter_indices(start=start, stop=stop)
-        return tuple( i for i in indices if self._list[i] == value )
+        start, stop = self._adapt_range(start, stop)
+        
+        found = self._bisect_range(value, start, stop)
+        if found is not None:
+            return tuple( range(*found) )
+        
+        if not isinstance(self._list, list):
+            return tuple( i for i in range(start, stop) if self._list[i] == value )
+        
+        # Let list.index() scan from one match to the next.
+        indices = list()
+        try:
+            i = self._list.index(value, start, stop)
+            while True:
+                indices.append(i)
+                i = self._list.index(value, i + 1, stop)
+        except ValueError:
+            pass
+        
+        return tuple(indices)
+
+    def fingerprint(self):
+        
+        digest = getattr(self, "_digest", None)
+        
+        if digest is None:
+            hasher = sha1( ( "%s|%d|" % ( ",".join( _dtype_names(self._dtypes) ), 
+              len(self._list) ) ).encode('ascii') )
+            hasher.update( _digest_values(self._list) )
+            digest = hasher.hexdigest()
+            # A table row can change through its table, so is not cached.
+            if not isinstance(self._list, RowView):
+                self._digest = digest
+        
+        return digest
 
     def get_element(self, index):
     
@@ -313,10 +791,22 @@ class BaseList(MutableSequence):
 
     def index(self, value, start=None, stop=None):
 
-        indices = self.iter_indices(start=start, stop=stop)
-        for i in indices:
-            if self._list[i] == value:
-                return i
+        start, stop = self._adapt_range(start, stop)
+        
+        found = self._bisect_range(value, start, stop)
+        if found is not None:
+            if found[0] < found[1]:
+                return found[0]
+        elif isinstance(self._list, list):
+            try:
+                return self._list.index(value, start, stop)
+            except ValueError:
+                pass
+        else:
+            for i in range(start, stop):
+                if self._list[i] == value:
+                    return i
+        
         raise ValueError("value (%s) not found" % repr(value) )
 
     def insert(self, index, value):
@@ -325,34 +815,7 @@ class BaseList(MutableSequence):
 
     def iter_indices(self, start=None, stop=None, reverse=False):
         
-        length = len(self._list)
-    
-        if start is not None:
-            if not isinstance(start, int_types):
-                raise IndexError("%s start index (%s) must be an integer" % 
-                  (self.nom, repr(start) ) )
-            if start < -length or start >= length:
-                raise IndexError("%s start index (%d) out of range" % 
-                  (self.nom, start) )
-            if start < 0:
-                start += length
-        else:
-            start = 0
-            
-        if stop is not None:
-            if not isinstance(stop, int_types):
-                raise IndexError("%s stop index (%s) must be an integer" % 
-                  (self.nom, repr(stop) ) )
-            if stop < -length or stop > length:
-                raise IndexError("%s stop index (%d) out of range" % 
-                  (self.nom, stop) )
-            if stop < 0:
-                stop += length
-        else:
-            stop = length          
-            
-        if start >= stop:
-            raise IndexError("%s iteration range has length zero" % self.nom)
+        start, stop = self._adapt_range(start, stop)
     
         if not reverse:
             for i in range(start, stop):
@@ -363,25 +826,52 @@ class BaseList(MutableSequence):
 
     def pop(self):
 
+        self._digest = None
+        self._sorted = False
         return self._list.pop()
 
     def reverse(self):
 
+        self._digest = None
+        self._sorted = False
         self._list.reverse()
 
+    def mark_sorted(self):
+        
+        if self._list != sorted(self._list):
+            raise ValueError("%s is not sorted" % self.nom)
+        
+        self._sorted = True
+
     def rindex(self, value, start=None, stop=None):
 
-        indices = self.iter_indices(start=start, stop=stop, reverse=True)
-        for i in indices:
-            if self._list[i] == value:
-                return i
+        start, stop = self._adapt_range(start, stop)
+        
+        found = self._bisect_range(value, start, stop)
+        if found is not None:
+            if found[0] < found[1]:
+                return found[1] - 1
+        elif isinstance(self._list, list):
+            values = self._list[start:stop]
+            values.reverse()
+            try:
+                return stop - 1 - values.index(value)
+            except ValueError:
+                pass
+        else:
+            for i in reversed( range(start, stop) ):
+                if self._list[i] == value:
+                    return i
+        
         raise ValueError("value (%s) not found" % repr(value) )
 
     def set_element(self, index, value):
         
-        index = self._adapt_index(key)
+        index = self._adapt_index(index)
         self.validate_element(value)
         self._list[index] = value
+        self._digest = None
+        self._sorted = False
 
     def set_slice(self, key, value): 
     
@@ -402,7 +892,15 @@ class BaseList(MutableSequence):
         self.validate_list(value)
         
         self._list[slc] = value
+        self._digest = None
+        self._sorted = False
   
+    def sort(self, key=None, reverse=False):
+        
+        self._list.sort(key=key, reverse=reverse)
+        self._digest = None
+        self._sorted = key is None and not reverse
+
     def tolist(self):
 
         return [ x for x in self._list ]
@@ -434,6 +932,95 @@ class BaseTable(BaseList):
         if not issubclass(row_type, BaseList) or issubclass(row_type, BaseTable):
             raise TypeError("BaseTable row type must be a BaseList but not BaseTable")
 
+    @classmethod
+    def concat(this, tables, data_types=None, row_type=None, labels='unique', 
+      prefixes=None):
+        """Concatenate tables or sequences of rows into one table.
+        
+        Row labels are handled by the given policy: 'unique' keeps them, and 
+        raises a ValueError if two rows share a label; 'drop' leaves the 
+        table unlabelled; 'prefix' puts a prefix before the labels of each 
+        table, by default its position followed by a colon, so that tables 
+        can share labels. Unlabelled rows are left unlabelled.
+        """
+        
+        tables = list(tables)
+        
+        if labels not in ('unique', 'drop', 'prefix'):
+            raise ValueError("%s concat labels (%s) must be 'unique', 'drop' or "
+              "'prefix'" % (this.__name__, repr(labels) ) )
+        
+        if prefixes is not None:
+            prefixes = list(prefixes)
+            if labels != 'prefix':
+                raise ValueError("%s concat prefixes need labels='prefix'" % 
+                  this.__name__)
+            if len(prefixes) != len(tables) or not all( isinstance(x, str_types) 
+              for x in prefixes ):
+                raise ValueError("%s concat needs one string prefix per table" % 
+                  this.__name__)
+        elif labels == 'prefix':
+            prefixes = [ "%d:" % i for i in range( len(tables) ) ]
+        
+        first = next( (x for x in tables if isinstance(x, BaseTable) ), None)
+        
+        if first is not None:
+            if data_types is None:
+                data_types = first._dtypes
+            if row_type is None:
+                row_type = first._rtype
+        
+        table = this([], data_types=data_types, row_type=row_type)
+        
+        for item in tables:
+            table.validate_table(item)
+            if isinstance(item, BaseTable) and item._rtype != table._rtype:
+                raise ValueError("cannot combine %s and %s (row type mismatch)" % 
+                  (table.nom, item.nom) )
+        
+        # Copy the rows of every table into one list allocated up front.
+        sizes = [ len(x) for x in tables ]
+        rows = [ None ] * sum(sizes)
+        row_labels = None
+        i = 0
+        
+        for k, (item, size) in enumerate( zip(tables, sizes) ):
+            
+            if isinstance(item, BaseTable):
+                rows[i:i+size] = [ list(x) for x in item._list ]
+                item_labels = item.__dict__.get("row_labels")
+            else:
+                rows[i:i+size] = [ list(x) for x in item ]
+                item_labels = None
+            
+            if ( labels != 'drop' and item_labels is not None and 
+              item_labels.count_labels() ):
+                if row_labels is None:
+                    row_labels = [''] * len(rows)
+                item_labels = list(item_labels)
+                if labels == 'prefix':
+                    item_labels = [ prefixes[k] + x if x != '' else '' 
+                      for x in item_labels ]
+                row_labels[i:i+size] = item_labels
+            
+            i += size
+        
+        if row_labels is not None:
+            seen = set()
+            for label in row_labels:
+                if label != '' and label in seen:
+                    raise ValueError("%s cannot concatenate tables sharing label "
+                      "%s, unless labels are dropped or prefixed" % (this.__name__, 
+                      repr(label) ) )
+                seen.add(label)
+        
+        table._set_rows(rows)
+        
+        if row_labels is not None:
+            table.row_labels = TableLabels(row_labels)
+        
+        return table
+    
     @property
     def data_types(self):
 
@@ -464,8 +1051,7 @@ class BaseTable(BaseList):
         else:
             self._rtype = BaseList
             
-        self._list = [ self._rtype(row, data_types=self._dtypes) 
-          for row in contents ]
+        self._list = self._adapt_rows(contents)
         
         if row_labels is not None:
             self.row_labels = row_labels
@@ -482,12 +1068,10 @@ class BaseTable(BaseList):
             raise TypeError("cannot catenate objects of type %s and %s" % 
                   (self.nom, repr(type(other).__name__) ) )
         
-        if type(other) == type(self):
-            item = deepcopy(self)
-            item.extend(other)
-            return item
-        else:
+        if type(other) != type(self) and issubclass(type(other), type(self)):
             return other.__radd__(self)
+        else:
+            return self.__class__.concat([self, other])
 
     def __contains__(self, value): 
         if isinstance(value, self._dtypes):
@@ -497,37 +1081,43 @@ class BaseTable(BaseList):
 
     def __copy__(self):
 
-        if hasattr(self, "row_labels"):
-            row_labels = copy(self.row_labels)
-        else:
-            row_labels = None
-            
-        return self.__class__(copy(self._list), data_types=self._dtypes, 
-          row_type=self._rtype, row_labels=row_labels) 
- 
-    def __deepcopy__(self, memo=dict() ):
+        row_labels = self.__dict__.get("row_labels")
+        if row_labels is not None:
+            row_labels = copy(row_labels)
         
-        if hasattr(self, "row_labels"):
-            row_labels = deepcopy(self.row_labels)
-        else:
-            row_labels = None
+        # Share rows with the copy until one of them writes to a row.
+        item = _wrap_rows(self.__class__, self._dtypes, self._rtype, 
+          self._share_rows() )
         
-        return self.__class__([ deepcopy(x, memo) for x in self._list ], 
-          data_types=deepcopy(self._dtypes, memo), 
-          row_type=deepcopy(self._rtype, memo),
-          row_labels=row_labels )
+        if "_row_token" in self.__dict__:
+            item.__dict__["_row_token"] = object()
+        
+        if row_labels is not None:
+            item.row_labels = row_labels
+        
+        return item
+ 
+    def __deepcopy__(self, memo=dict() ):
+        # Elements are immutable, so a deep copy need not copy them.
+        return self.__copy__()
 
     def __delitem__(self, key):
     
-        if isinstance(key, int_types):
+        if isinstance(key, (int_types, slice)):
             
-            index = self._adapt_index(key)
-            del self._list[index]
+            if isinstance(key, slice):
+                index = self._adapt_slice(key)
+                slc = index
+            else:
+                index = self._adapt_index(key)
+                slc = slice(index, index + 1, 1)
             
-        elif isinstance(key, slice):
+            row_labels = self.__dict__.get("row_labels")
+            if row_labels is not None:
+                row_labels._splice(slc, [])
             
-            slc = self._adapt_slice(key)
-            del self._list[slc]
+            del self._list[index]
+            self._splice_row_digests(index)
               
         elif isinstance(key, tuple):
             
@@ -539,7 +1129,9 @@ class BaseTable(BaseList):
             slicer = TableSlicer(self, row_key, col_key)
             
             for r in slicer.iter_rows_decreasing():
-                del self._list[r][ slicer.col_slice ]
+                del self._get_writable_row(r)[ slicer.col_slice ]
+            
+            self._clear_row_digests( slicer.iter_rows() )
             
         else:
             raise TypeError("invalid %s index/key (%s)" % (self.nom, repr(key) ) )
@@ -556,7 +1148,7 @@ class BaseTable(BaseList):
         except TypeError:
             return False
         
-        if type(other) != type(self) and issubclass(type(other), BaseTable):
+        if type(other) != type(self) and issubclass(type(other), type(self)):
             return other.__eq__(self)
         else:
             if self._dtypes != other._dtypes:
@@ -568,10 +1160,12 @@ class BaseTable(BaseList):
             if self._list != other._list:
                 return False
             
-            self_labels = self.row_labels if hasattr(self, "row_labels") else None
-            other_labels = other.row_labels if hasattr(other, "row_labels") else None
+            self_labels = self.__dict__.get("row_labels")
+            other_labels = other.__dict__.get("row_labels")
             
-            if self_labels != other_labels:
+            # Tables without labels match those whose labels are all unset.
+            if any( x is not None and x.count_labels() for x in 
+              (self_labels, other_labels) ) and self_labels != other_labels:
                 return False
                 
             return True
@@ -640,6 +1234,11 @@ class BaseTable(BaseList):
         self.extend(other)
         return self
 
+    def __iter__(self):
+        
+        for r in range( len(self._list) ):
+            yield self._rtype._from_list( RowView(self, r), self._dtypes)
+
     def __ne__(self, other):
     
         return not self == other
@@ -656,12 +1255,31 @@ class BaseTable(BaseList):
             raise TypeError("cannot catenate objects of type %s and %s" % 
               (repr(type(other).__name__) ), self.nom)
         
-        if type(other) == type(self):
-            item = deepcopy(other)
-            item.extend(self)
-            return item
-        else:
+        if type(other) != type(self) and issubclass(type(other), type(self)):
             return other.__add__(self)
+        else:
+            return self.__class__.concat([other, self])
+
+    def __reversed__(self):
+        
+        for r in reversed( range( len(self._list) ) ):
+            yield self._rtype._from_list( RowView(self, r), self._dtypes)
+
+    def __reduce_ex__(self, protocol):
+        
+        row_lengths = [ len(x) for x in self._list ]
+        
+        if len( set(row_lengths) ) == 1:
+            columns = zip(*self._list)
+        else:
+            columns = [ [ row[c] for row in self._list if len(row) > c ] 
+              for c in range( max(row_lengths) if row_lengths else 0 ) ]
+        
+        columns = [ _pack_values(x, protocol) for x in columns ]
+        
+        return (_restore_table, (self.__class__, _dtype_names(self._dtypes), 
+          self._rtype, _pack_values(row_lengths, protocol), columns, 
+          self.__dict__.get("row_labels") ) )
 
     def __setattr__(self, attr, value):
         
@@ -672,7 +1290,7 @@ class BaseTable(BaseList):
                 elif len(value) != len(self._list):
                     raise ValueError("number of %s row labels must match number of rows" % self.nom)
 
-        self.__dict__[attr] = value
+        super(BaseTable, self).__setattr__(attr, value)
      
     def __setitem__(self, key, value):
         
@@ -704,7 +1322,7 @@ class BaseTable(BaseList):
 
     def __str__(self):
 
-        contents = "(\n  %s\n)" % ",\n  ".join( str(x) for x in self._list)
+        contents = "(\n  %s\n)" % ",\n  ".join( str(x) for x in self )
         return "%s(\n  %s\n)" % (self.nom, contents)
 
     def _adapt_index2(self, index):
@@ -811,6 +1429,33 @@ class BaseTable(BaseList):
         
         return slice(start, stop, step)
 
+    def _adapt_rows(self, rows):
+        
+        self.validate_table(rows)
+        
+        if isinstance(rows, BaseTable):
+            rows = rows._list
+        
+        return [ list(x) for x in rows ]
+
+    def _clear_row_digests(self, rows=None):
+        
+        self._digest = None
+        
+        if rows is not None:
+            rows = list(rows)
+        else:
+            self._mark_rows_moved()
+        
+        for index in self.__dict__.get("_indexes", dict()).values():
+            index._update(rows)
+        
+        if rows is None:
+            self.__dict__.pop("_row_digests", None)
+        elif "_row_digests" in self.__dict__:
+            for r in rows:
+                self._row_digests[r] = None
+
     def _clear_row_lengths(self):
     
         try:
@@ -820,6 +1465,127 @@ class BaseTable(BaseList):
         except AttributeError:
             pass
 
+    def _row_ranges(self, start, stop):
+
+        table_length = len(self._list)
+        row_lengths = self._row_lengths
+
+        if start is not None:
+            
+            try:
+                start_row, start_col = start
+                assert all( isinstance(x, int_types) for x in start )
+            except (AssertionError, ValueError):
+                raise TypeError("%s start argument must be a tuple of two integers" % self.nom)
+            
+            if start_row < -table_length or start_row >= table_length:
+                raise IndexError("%s start row index (%d) out of range" % (self.nom, start_row) )
+            if start_row < 0:
+                start_row += table_length
+            
+            start_row_length = row_lengths[start_row]
+            if start_col < -start_row_length or start_col >= start_row_length:
+                raise IndexError("%s start column index (%d) out of range" % (self.nom, start_col) )
+            if start_col < 0:
+                start_col += start_row_length
+        else:
+            start_row, start_col = (0, 0)
+
+        if stop is not None:
+        
+            try:
+                stop_row, stop_col = stop
+                assert all( isinstance(x, int_types) for x in stop )
+            except (AssertionError, ValueError):
+                raise TypeError("%s stop argument must be a tuple of two integers" % self.nom)
+    
+            if stop_row < -table_length or stop_row > table_length:
+                raise IndexError("%s stop row index (%d) out of range" % (self.nom, stop_row) )
+            if stop_row < 0:
+                stop_row += table_length
+        
+            last_row_length = row_lengths[stop_row - 1]
+            if stop_col < -last_row_length or stop_col > last_row_length:
+                raise IndexError("%s stop column index (%d) out of range" % (self.nom, stop_col) )
+            if stop_col < 0:
+                stop_col += last_row_length
+        else:
+            stop_row, stop_col = (table_length, row_lengths[-1])
+        
+        last_row = stop_row - 1
+
+        if stop_col == 0:
+            stop_row, last_row = stop_row - 1, last_row - 1
+            stop_col = row_lengths[last_row]
+
+        if start_row > last_row or (start_row == last_row and 
+          start_col >= stop_col):
+            raise ValueError("%s has range zero" % self.nom)
+        
+        # Generate column ranges row by row, so cells need no checks.
+        row_ranges = [ (i, 0, row_lengths[i]) for i in 
+          range(start_row, last_row + 1) ]
+        row_ranges[0] = (start_row, start_col, row_ranges[0][2])
+        row_ranges[-1] = (last_row, row_ranges[-1][1], stop_col)
+        
+        return row_ranges
+
+    def _get_arrow_arrays(self, pyarrow):
+        return [ _to_arrow_array(pyarrow, x) for x in zip(*self._list) ]
+
+    def _get_row(self, row_index):
+        
+        row = self._list[row_index]
+        return row if isinstance(row, list) else row.tolist()
+
+    def _get_writable_row(self, row_index):
+        
+        row = self._list[row_index]
+        token = self.__dict__.get("_row_token")
+        
+        # Copy a row shared with another table before writing to it, and mark 
+        # the copy as owned by this table.
+        if token is not None and getattr(row, "_owner", None) is not token:
+            row = self._list[row_index] = _OwnedRow(row)
+            row._owner = token
+        
+        return row
+
+    def _mark_rows_moved(self):
+        
+        # Row views taken before rows moved or were replaced are stale.
+        self.__dict__["_row_moves"] = self.__dict__.get("_row_moves", 0) + 1
+
+    def _set_rows(self, rows):
+        
+        self._list = rows
+        self._clear_row_lengths()
+        self._clear_row_digests()
+        
+    def _share_rows(self):
+        
+        # Rows are only shared by copies, so a new token at each copy leaves 
+        # this table owning none of its rows.
+        self.__dict__["_row_token"] = object()
+        return list(self._list)
+        
+    def _splice_row_digests(self, key, size=None):
+        
+        self._digest = None
+        
+        # Rows added at the end leave every other row where it was.
+        if size is None or key.start != key.stop or key.stop + size != len(self._list):
+            self._mark_rows_moved()
+        
+        for index in self.__dict__.get("_indexes", dict()).values():
+            index._splice(key, size)
+        
+        if "_row_digests" in self.__dict__:
+            if size is None:
+                del self._row_digests[key]
+            else:
+                self._row_digests[key] = [None] * size
+
     def _update_row_lengths(self):
         
         self._row_lengths = tuple( len(x) for x in self._list )
@@ -852,48 +1618,185 @@ class BaseTable(BaseList):
     def append(self, value):
 
         i = len(self._list)
-        self[i:i] = [ self._rtype(value, data_types=self._dtypes) ]
+        self[i:i] = [ value ]
+        
+    def apply(self, function, workers=1, chunk_size=None, threads=False,
+      data_types=None):
+
+        if not callable(function):
+            raise TypeError("%s apply function must be callable" % self.nom)
+        
+        if not isinstance(workers, int_types) or workers < 1:
+            raise ValueError("%s apply requires at least one worker" % self.nom)
+        
+        nrows = len(self._list)
+        
+        if chunk_size is None:
+            chunk_size = max(1, -(-nrows // (workers * 4) ) )
+        elif not isinstance(chunk_size, int_types) or chunk_size < 1:
+            raise ValueError("%s apply chunk size must be positive" % self.nom)
         
+        # Chunks are sent to worker processes as tables, which are pickled 
+        # column by column into typed buffers where possible.
+        chunks = [ (function, _wrap_rows(BaseTable, self._dtypes, self._rtype, 
+          [ self._get_row(r) for r in range(i, min(i + chunk_size, nrows) ) ]) ) 
+          for i in range(0, nrows, chunk_size) ]
+        
+        if workers == 1 or len(chunks) < 2:
+            results = [ _apply_chunk(x) for x in chunks ]
+        else:
+            if threads:
+                from multiprocessing.pool import ThreadPool as Pool
+            else:
+                from multiprocessing import Pool
+            pool = Pool( min(workers, len(chunks) ) )
+            try:
+                results = pool.map(_apply_chunk, chunks, 1)
+            finally:
+                pool.close()
+                pool.join()
+        
+        row_labels = self.__dict__.get("row_labels")
+        if row_labels is not None:
+            row_labels = copy(row_labels)
+        
+        return self.__class__([ row for chunk in results for row in chunk._list ], 
+          data_types=data_types, row_type=self._rtype, row_labels=row_labels)
+
     def count(self, value, start=None, stop=None):
 
         if isinstance(value, self._dtypes):
-            indices = self.iter_indices(start=start, stop=stop)
-            return sum( 1 if self._list[r][c] == value else 0 
-              for r, c in indices )
+            return sum( self._get_row(r)[first:end].count(value)
+              for r, first, end in self._row_ranges(start, stop) )
         else:
             return super(BaseTable, self).count(value, start=start, stop=stop)
     
+    def create_index(self, column):
+        
+        index = ColumnIndex(self, column)
+        self.__dict__.setdefault("_indexes", dict())[column] = index
+        
+        return index
+
+    def drop_index(self, column):
+        
+        try:
+            del self.__dict__.get("_indexes", dict())[column]
+        except KeyError:
+            raise KeyError("%s has no index of column %s" % (self.nom, repr(column) ) )
+    
     def extend(self, values):
     
         i = len(self._list)
         self[i:i] = self.__class__(values, data_types=self._dtypes)
     
+    def find_range(self, column, low=None, high=None, low_inclusive=True, 
+      high_inclusive=True):
+        
+        index = self.__dict__.get("_indexes", dict()).get(column)
+        
+        if index is not None:
+            return index.range(low, high, low_inclusive=low_inclusive, 
+              high_inclusive=high_inclusive)
+        
+        # Without an index, check the value of each row in turn.
+        rows = list()
+        
+        for r, row in enumerate(self._list):
+            
+            if len(row) <= column or row[column] is None:
+                continue
+            
+            value = row[column]
+            
+            if low is not None and ( value < low or (value == low and 
+              not low_inclusive) ):
+                continue
+            if high is not None and ( value > high or (value == high and 
+              not high_inclusive) ):
+                continue
+            
+            rows.append(r)
+        
+        return tuple(rows)
+    
     def findall(self, value, start=None, stop=None):
 
         if isinstance(value, self._dtypes):
-            indices = self.iter_indices(start=start, stop=stop)
-            return tuple( (r, c) for r, c in indices 
-              if self._list[r][c] == value )
+            indices = list()
+            for r, first, end in self._row_ranges(start, stop):
+                row = self._get_row(r)
+                try:
+                    c = row.index(value, first, end)
+                    while True:
+                        indices.append( (r, c) )
+                        c = row.index(value, c + 1, end)
+                except ValueError:
+                    pass
+            return tuple(indices)
         else:
             return super(BaseTable, self).findall(value, start=start, stop=stop)
     
+    def fingerprint(self):
+        
+        labels = self.__dict__.get("row_labels")
+        
+        if labels is not None and labels.count_labels():
+            label_digest = labels.fingerprint()
+        else:
+            label_digest = ''
+        
+        digest = getattr(self, "_digest", None)
+        
+        if digest is not None and digest[0] == label_digest:
+            return digest[1]
+        
+        if "_row_digests" not in self.__dict__:
+            self._row_digests = [None] * len(self._list)
+        
+        # Only rows edited since the last call need to be digested again.
+        row_digests = self._row_digests
+        for r, row_digest in enumerate(row_digests):
+            if row_digest is None:
+                row_digests[r] = _digest_values( list(self._list[r]) )
+        
+        hasher = sha1( ( "%s|%s|%d|" % ( ",".join( _dtype_names(self._dtypes) ), 
+          self._rtype.__name__, len(self._list) ) ).encode('ascii') )
+        hasher.update( b''.join(row_digests) )
+        hasher.update( label_digest.encode('ascii') )
+        
+        self._digest = (label_digest, hasher.hexdigest() )
+        
+        return self._digest[1]
+
     def get_element(self, row_index):
 
         r = self._adapt_index(row_index)
-        return self._rtype(self._list[r], data_types=self._dtypes)
+        return self._rtype._from_list( RowView(self, r), self._dtypes)
+            
+    def get_index(self, column):
+        
+        try:
+            return self.__dict__.get("_indexes", dict())[column]
+        except KeyError:
+            raise KeyError("%s has no index of column %s" % (self.nom, repr(column) ) )
             
     def get_slice(self, row_key):
 
         slc = self._adapt_slice(row_key)
         
-        if hasattr(self, "row_labels") and any(x for x in self.row_labels[slc]):
-            row_labels = self.row_labels[slc]
+        row_labels = self.__dict__.get("row_labels")
+        
+        if row_labels is not None and row_labels.count_labels():
+            row_labels = TableLabels(row_labels[slc])
         else:
             row_labels = None
         
         item = self.__class__(self._list[slc], data_types=self._dtypes, 
           row_type=self._rtype, row_labels=row_labels)
         
+        return item
+
     def get_table_element(self, row_index, col_index):
 
         
@@ -922,7 +1825,7 @@ class BaseTable(BaseList):
                 
                 try:
                     x = self._list[r][c]
-                except TypeError:
+                except IndexError:
                     x = None
                 
                 row.append(x)
@@ -939,10 +1842,11 @@ class BaseTable(BaseList):
     def index(self, value, start=None, stop=None):
 
         if isinstance(value, self._dtypes):
-            indices = self.iter_indices(start=start, stop=stop)
-            for r, c in indices:
-                if self._list[r][c] == value:
-                    return (r, c)
+            for r, first, end in self._row_ranges(start, stop):
+                try:
+                    return (r, self._get_row(r).index(value, first, end) )
+                except ValueError:
+                    pass
         else:
             return super(BaseTable, self).index(value, start=start, stop=stop)
             
@@ -950,105 +1854,60 @@ class BaseTable(BaseList):
 
     def insert(self, index, value):
 
-        self[index:index] = self._rtype(value, data_types=self._dtypes)
+        self[index:index] = [ value ]
 
     def iter_indices(self, start=None, stop=None, reverse=False):
-
-        table_length = len(self._list)
-        row_lengths = self._row_lengths
-
-        if start is not None:
-            
-            try:
-                start_row, start_col = start
-                assert all( isinstance(x, int_types) for x in start )
-            except (AssertionError, ValueError):
-                raise TypeError("%s start argument must be a tuple of two integers" % self.nom)
-            
-            if start_row < -table_length or start_row >= table_length:
-                raise IndexError("%s start row index (%d) out of range" % (self.nom, start_row) )
-            if start_row < 0:
-                start_row += table_length
-            
-            start_row_length = row_lengths[start_row]
-            if start_col < -start_row_length or start_col >= start_row_length:
-                raise IndexError("%s start column index (%d) out of range" % (self.nom, start_col) )
-            if start_col < 0:
-                start_col += start_row_length
-        else:
-            start_row, start_col = (0, 0)
-
-        if stop is not None:
-        
-            try:
-                stop_row, stop_col = stop
-                assert all( isinstance(x, int_types) for x in stop )
-            except (AssertionError, ValueError):
-                raise TypeError("%s stop argument must be a tuple of two integers" % self.nom)
-    
-            if stop_row < -table_length or stop_row > table_length:
-                raise IndexError("%s stop row index (%d) out of range" % (self.nom, stop_row) )
-            if stop_row < 0:
-                stop_row += table_length
-        
-            last_row_length = row_lengths[stop_row - 1]
-            if stop_col < -last_row_length or stop_col > last_row_length:
-                raise IndexError("%s stop column index (%d) out of range" % (self.nom, stop_col) )
-            if stop_col < 0:
-                stop_col += last_row_length
-        else:
-            stop_row, stop_col = (table_length, row_lengths[-1])
         
-        last_row = stop_row - 1
-
-        if stop_col == 0:
-            stop_row, last_row = stop_row - 1, last_row - 1
-            stop_col = row_lengths[last_row]
-
-        if start_row > last_row or (start_row == last_row and 
-          start_col >= stop_col):
-            raise ValueError("%s has range zero" % self.nom)
+        row_ranges = self._row_ranges(start, stop)
         
         if not reverse:
-            
-            i, j = start_row, start_col
-            while i < last_row or ( i == last_row and j < stop_col ):
-                if j < row_lengths[i]:
+            for i, first, end in row_ranges:
+                for j in range(first, end):
                     yield (i, j)
-                    j += 1
-                else:
-                    i, j = (i+1, 0)
         else:
-            
-            i, j = last_row, stop_col - 1
-            while i > start_row or ( i == start_row and j >= start_col ):
-                if j >= 0:
+            for i, first, end in reversed(row_ranges):
+                for j in reversed( range(first, end) ):
                     yield (i, j)
-                    j -= 1
-                else:
-                    i, j = (i-1, row_lengths[i-1] - 1)
-   
+
+    def lazy(self):
+        from pyselection.query import LazyTable
+        return LazyTable.from_table(self)
+
     def pop(self):
     
-        if hasattr(self, "row_labels"):
-            self.row_labels = TableLabels( self.row_labels[:-1] )
+        row_labels = self.__dict__.get("row_labels")
+        if row_labels is not None and self._list:
+            row_labels._splice(slice(len(self._list) - 1, len(self._list), 1), [])
+        row = self._list.pop()
+        # Rows that may be shared with a copy are unshared as they leave.
+        if "_row_token" in self.__dict__:
+            row = list(row)
         self._clear_row_lengths()
-        return self._list.pop()
+        self._splice_row_digests(-1)
+        return self._rtype._from_list(row, self._dtypes)
 
     def reverse(self):
 
-        if hasattr(self, "row_labels"):
-            self.row_labels = TableLabels([x for x in reversed(self.row_labels)])
+        row_labels = self.__dict__.get("row_labels")
+        if row_labels is not None:
+            row_labels._reverse()
         self._clear_row_lengths()
+        self._clear_row_digests()
         self._list.reverse()
         
+    def mark_sorted(self):
+        raise TypeError("%s rows cannot be marked as sorted" % self.nom)
+
     def rindex(self, value, start=None, stop=None):
 
         if isinstance(value, self._dtypes):
-            rindices = self.iter_indices(start=start, stop=stop, reverse=True)
-            for r, c in rindices:
-                if self._list[r][c] == value:
-                    return (i, j)
+            for r, first, end in reversed( self._row_ranges(start, stop) ):
+                values = self._get_row(r)[first:end]
+                values.reverse()
+                try:
+                    return (r, end - 1 - values.index(value) )
+                except ValueError:
+                    pass
         else:
             return super(BaseTable, self).rindex(value, start=start, stop=stop)
 
@@ -1057,8 +1916,10 @@ class BaseTable(BaseList):
     def set_element(self, row_index, value):
     
         r = self._adapt_index(row_index)
-        self._list[r] = self._rtype(value, data_types=self._dtypes)
+        self._list[r] = self._adapt_rows([ value ])[0]
         self._clear_row_lengths()
+        self._clear_row_digests([r])
+        self._mark_rows_moved()
         
     def set_slice(self, row_key, value):   
         
@@ -1076,22 +1937,26 @@ class BaseTable(BaseList):
                 raise ValueError("cannot assign %d rows to extended slice "
                   "of size %d" % (value_length, slc_info['size']) )
         
-        self._list[slc] = [ self._rtype(x, data_types=self._dtypes) 
-           for x in value ]
+        rows = self._adapt_rows(value)
         
-        if any( hasattr(x, "row_labels") for x in (self, value) ):
-            
-            tlabels = list(self.row_labels)
-            
-            try:
-                vlabels = list(value.row_labels)
-            except AttributeError:
-                vlabels = [''] * value_length
-            
-            tlabels[slc] = vlabels
-            self.row_labels = TableLabels(tlabels)
+        row_labels = self.__dict__.get("row_labels")
+        
+        if isinstance(value, BaseTable):
+            value_labels = value.__dict__.get("row_labels")
+        else:
+            value_labels = None
+        
+        if value_labels is not None and value_labels.count_labels():
+            if row_labels is None:
+                row_labels = self.row_labels
+            row_labels._splice(slc, value_labels)
+        elif row_labels is not None:
+            row_labels._splice(slc, [''] * value_length)
+        
+        self._list[slc] = rows
         
         self._clear_row_lengths()
+        self._splice_row_digests(slc, len(rows) )
         
     def set_table_element(self, row_index, col_index, value):
         
@@ -1101,9 +1966,11 @@ class BaseTable(BaseList):
         self.validate_element(value)
         
         try:
-            self._list[r][c] = value
+            self._get_writable_row(r)[c] = value
         except TypeError: # if column index is None
             raise IndexError("%s index (%d, %d) out of range" % (self.nom, r, c) )
+        
+        self._clear_row_digests([r])
 
     def set_table_slice(self, row_key, col_key, value):
 
@@ -1140,526 +2007,2708 @@ class BaseTable(BaseList):
                 elif slicer.min[1] > row_length:
                     raise ValueError("cannot assign to disjoint slice")
                 
-                self._list[r].extend([None] * (slicer.max[1] + 1 - row_length) )
+                self._get_writable_row(r).extend([None] * (slicer.max[1] + 1 - row_length) )
         
-            self._list[r][ slicer.col_slice ] = value[i]
+            self._get_writable_row(r)[ slicer.col_slice ] = value._list[i]
         
         self._clear_row_lengths()
+        self._clear_row_digests( slicer.iter_rows() )
    
-    def tolist(self, flatten=False):
+    def sort(self, key=None, reverse=False):
+        raise TypeError("%s rows cannot be sorted in place" % self.nom)
 
-        if flatten:
-            return [ x for row in self._list for x in row ] 
-        else:
-            return [ list(x) for x in self._list ]
+    def to_arrow(self, column_names=None, index_name="label"):
 
-    def validate_table(self, table):
-    
-        if isinstance(table, BaseTable):
-            if all( x in self._dtypes for row in table for x in row._dtypes ):
-                return
-        elif not is_sized_iterable(table) or isinstance(table, str_types):
-            raise TypeError("%s table must be a sized non-string iterable" % self.nom)
-        
-        for row in table:
-            
-            if isinstance(row, BaseList):
-                if all( x in self._dtypes for x in row._dtypes ):
-                    continue
-            elif not is_sized_iterable(row) or isinstance(row, str_types):
-                raise TypeError("%s row must be a sized non-string iterable" % self.nom)            
-            
-            if not all( isinstance(value, self._dtypes) for value in row ):
-                dtype_names = str( tuple(x.__name__ for x in self._dtypes) ) 
-                raise TypeError("%s element data types must be one or more of %s" % 
-                  (self.nom, dtype_names) )
+        pyarrow = _import_pyarrow()
 
-class TableLabels(MutableSequence):
-    
-    @classmethod
-    def from_length(this, length):
-        try:
-            return this([''] * length)
-        except TypeError:
-            raise TypeError("%s length (%s) must be an integer" % (self.nom, length) )
+        if self.min_row_length != self.max_row_length:
+            raise ValueError("%s must have rows of equal length for Arrow" % self.nom)
 
-    @property
-    def nom(self):
-        return self.__class__.__name__
+        ncols = self.max_row_length if self._list else 0
 
-    def __init__(self, labels):
-        
-        try:
-            assert len(labels) > 0
-            assert not isinstance(labels, str_types)
-            assert all( isinstance(x, str_types) for x in labels )
-            
-        except (AssertionError, TypeError):
-            raise TypeError("%s() takes a sized iterable of strings" % self.nom)
-       
-        self._labels = labels
-        
-        self._label2index = dict()
-        
-        for index, label in enumerate(labels):
-            
-            if label != '':
-                
-                if label in self._label2index:
-                    raise ValueError("%s cannot contain duplicate labels" % self.nom)
-            
-                self._label2index[label] = index
+        if column_names is None:
+            column_names = [ "c%d" % i for i in range(ncols) ]
+        elif len(column_names) != ncols:
+            raise ValueError("%s needs one Arrow column name per column" % self.nom)
 
-    def __bool__(self):
-        return len(self._labels) != 0  
-  
-    def __contains__(self, value):
-        return value in self._labels
-  
-    def __copy__(self):
-        return self.__class__( copy(self._labels) ) 
-  
-    def __deepcopy__(self, memo=dict() ):
-        return self.__class__( deepcopy(self._labels, memo) )  
-  
-    def __delitem__(self, key, value):       
-        raise TypeError("%s cannot be resized" % self.nom)
-        
-    def __eq__(self, other):
-        if isinstance(other, TableLabels):
-            return self._labels == other._labels
-        try:
-            return self._labels == TableLabels(other)._labels
-        except (TypeError, ValueError):
-            return False
-        
-    def __getitem__(self, key, value):        
-    
-        if isinstance(key, int_types):
-            
-            if key < -len(self._labels) or key >= len(self._labels):
-                raise IndexError("%s index (%d) out of range" % (self.nom, key) )
-            item = self._labels[key]
-        
-        elif isinstance(key, str_types):
-        
-            try:
-                item = self._label2index[key]
-            except KeyError:
-                raise KeyError("%s label (%s) not found" % (self.nom, repr(key) ) )
-            
-        elif isinstance(key, slice):
-            
-            slc = self._adapt_slice(key)
-            item = tuple( self._labels[slc] )
-            
-        else:
-            raise TypeError("invalid %s key (%s)" % (self.nom, repr(key)) )
-    
-        return item
-    
-    def __iadd__(self, other):
-        raise TypeError("%s cannot be resized" % self.nom)
-    
-    def __add__(self, other):
-        if not issubclass(type(other), TableLabels):
-            other = self.__class__(other)
-        return self.__class__(self._labels + other._labels)        
-        
-    def __iter__(self):
-        for x in self._labels:
-            yield x
+        column_names = list(column_names)
+        arrays = self._get_arrow_arrays(pyarrow)
 
-    def __radd__(self, other):
-        if not issubclass(type(other), TableLabels):
-            other = self.__class__(other)
-        return self.__class__(other._labels + self._labels)    
+        if not self._list:
+            arrays = [ pyarrow.array([]) for _ in column_names ]
 
-    def __len__(self):
-        return len(self._labels)
+        # Keep the row labels as a column, marked as such in the schema.
+        metadata = None
+        row_labels = self.__dict__.get("row_labels")
+        if row_labels is not None and row_labels.count_labels():
+            if index_name in column_names:
+                raise ValueError("%s index name (%s) clashes with a column" %
+                  (self.nom, repr(index_name) ) )
+            arrays.insert(0, pyarrow.array( row_labels.tolist() ) )
+            column_names.insert(0, index_name)
+            metadata = { b"pyselection.index": index_name.encode('utf-8') }
 
-    def __ne__(self, other):
-        if isinstance(other, TableLabels):
-            return self._labels != other._labels
-        try:
-            return self._labels != TableLabels(other)._labels
-        except (TypeError, ValueError):
-            return True
+        return pyarrow.Table.from_arrays(arrays, names=column_names,
+          metadata=metadata)
 
-    def __nonzero__(self):
-        return type(self).__bool__(self)
+    @classmethod
+    def from_arrow(this, arrow_table, data_types=None, index_name=None):
 
-    def __reversed__(self):
-        for x in reversed(self._labels):
-            yield x 
-    
-    def __setitem__(self, key, value):
-        
-        if isinstance(key, int_types):
-            
-            self.set_label(key, value)
-              
-        elif isinstance(key, str_types):
-            
-            self.set_label(value, key)
-            
-        elif isinstance(key, slice):
-            
-            if not is_sized_iterable(labels) or isinstance(labels, str_types):
-                raise TypeError("%s method takes a sized iterable of strings" % self.nom)
+        pyarrow = _import_pyarrow()
 
-            slc = self._adapt_slice(key)
-            
-            slice_indices = [ i for i in range(slc.start, slc.stop, slc.step) ]
-            
-            if len(value) != len(slice_indices):
-                raise TypeError("%s cannot be resized" % self.nom)
-         
-            for index, label in zip(slice_indices, value):
-                self.set_label(index, label)
-        else:
-            raise TypeError("invalid %s key (%s)" % (self.nom, repr(key) ) )   
-    
-    def __str__(self):
-        contents = "(%s)" % ", ".join( repr(x) for x in self._labels )
-        return "%s%s" % (self.nom, contents)
-  
-    def _adapt_slice(self, slc):
-        try:
-            if not all( isinstance(x, tuple([int_types] + [NoneType]) ) 
-                for x in (slc.start, slc.stop, slc.step) ):
-                    raise TypeError("%s slice indices must be integer or None" % self.nom)
-        except AttributeError:
-            raise TypeError("%s _adapt_slice() takes a slice object" % self.nom)
-    
-        length = len(self._labels)
-    
-        if slc.step is None:
-            step = 1
-        elif slc.step != 0:
-            step = slc.step
-        else:
-            raise ValueError("%s slice step cannot be zero" % self.nom)
- 
-        if slc.start is not None:
-            start = slc.start
-            if start < -length or start >= length:
-                raise IndexError("%s slice start (%d) out of range" % (self.nom, start) )
-            if start < 0:
-                start += length
+        names = list(arrow_table.schema.names)
+        metadata = arrow_table.schema.metadata or dict()
+
+        if index_name is None and b"pyselection.index" in metadata:
+            index_name = metadata[b"pyselection.index"].decode('utf-8')
+
+        if index_name is not None and index_name not in names:
+            index_name = None
+
+        columns = [ _from_arrow_array(pyarrow, arrow_table.column(i) ) 
+          for i in range( len(names) ) ]
+
+        if index_name is not None:
+            labels = TableLabels([ "%s" % x for x in 
+              columns.pop( names.index(index_name) ) ])
         else:
-            start = 0 if step > 0 else length - 1
+            labels = None
 
-        if slc.stop is not None:
-            stop = slc.stop
-            if stop < -length or stop >= length:
-                raise IndexError("%s slice stop (%d) out of range" % (self.nom, stop) )
-            if stop < 0:
-                stop += length
-             
-            if step == 1:
-                if start > stop:
-                    stop = start
-            elif (step > 1 and start >= stop) or (step < 0 and start <= stop):
-                raise ValueError("%s extended slice is of size 0" % self.nom)
+        if data_types is not None:
+            data_types = this.validate_data_types(data_types)
         else:
-            stop = length if step > 0 else -1
+            data_types = core.table_data_types
 
-        return slice(start, stop, step)
-  
-    def append(self, value):
-        raise TypeError("%s cannot be resized" % self.nom)
-  
-    def clear(self, key):
-        
-        if isinstance(key, int_types):
-            
-            if key < -len(self._labels) or key >= len(self._labels):
-                raise IndexError("%s index (%d) out of range" % (self.nom, key) )
-            
-            self._labels[key] = ''
-            del self._label2index[ self._labels[key] ]
-              
-        elif isinstance(key, str_types):
-            
-            if key not in self._label2index:
-                raise KeyError("%s label (%s) not found" % (self.nom, repr(key)) )
-            
-            self._labels[ self._label2index[key] ] = ''
-            del self._label2index[key]
+        for column in columns:
+            if not all( isinstance(x, data_types) for x in column ):
+                dtype_names = str( tuple(x.__name__ for x in data_types) ) 
+                raise TypeError("%s element data types must be one or more of %s" % 
+                  (this.__name__, dtype_names) )
 
+        if columns:
+            rows = [ list(x) for x in zip(*columns) ]
         else:
-            raise TypeError("invalid %s key (%s)" % (self.nom, repr(key) ) )
+            rows = [ list() for _ in range(arrow_table.num_rows) ]
 
-    def count(self, label):
-        return 1 if label in self._label2index else 0 
-  
-    def extend(self, values):
-        raise TypeError("%s cannot be resized" % self.nom)    
- 
-    def index(self, label):
-        if label in self._label2index:
-            return self._label2index[label]
-        raise ValueError("%s label (%s) not found" % (self.nom, repr(key) ) )
- 
-    def insert(self, index, value):       
-        raise TypeError("%s cannot be resized" % self.nom)  
+        # Skip validating each row again, since every column was checked.
+        table = this([], data_types=data_types)
+        table._set_rows(rows)
 
-    def pop(self):
-        raise TypeError("%s cannot be resized" % self.nom)    
+        if labels is not None:
+            table.row_labels = labels
 
-    def remove(self, label):
-        raise TypeError("%s cannot be resized" % self.nom)
+        return table
 
-    def reverse(self):
-        raise TypeError("%s cannot be reordered" % self.nom)
+    @classmethod
+    def iter_parquet(this, filepath, columns=None, row_groups=None, 
+      data_types=None, index_name=None):
 
-    def set_label(self, index, label):
-        
-        if not isinstance(index, int_types):
-            raise TypeError("%s index (%s) must be an integer" % (self.nom, repr(index) ) )
-        if index < -len(self._labels) or index >= len(self._labels):
-            raise IndexError("%s index (%d) out of range" % (self.nom, index) )
-        if index < 0:
-            index += len(self._labels)
-        if not isinstance(label, str_types) or label == '':
-            raise TypeError("invalid %s label (%s)" % (self.nom, repr(label) ) )
-        if label in self._label2index and index != self._label2index[label]:
-            raise ValueError("%s cannot contain duplicate labels" % self.nom)
-        
-        if self._labels[index] in self._label2index:
-            del self._label2index[ self._labels[index] ]
-        
-        self._labels[index] = label
-        
-        self._label2index[label] = index
+        pyarrow = _import_pyarrow()
+        import pyarrow.parquet
 
-    def tolist(self):
-        return [ x for x in self._labels ]
+        parquet_file = pyarrow.parquet.ParquetFile(filepath)
 
-class ListSlicer(object):
+        if row_groups is None:
+            row_groups = range(parquet_file.num_row_groups)
 
-    @property
-    def last(self):
-        return self._last 
+        columns = this._parquet_columns(parquet_file, columns, index_name)
 
-    @property
-    def max(self):
-        return self._max
- 
-    @property
-    def min(self):
-        return self._min
-    
-    @property
-    def nom(self):
-        return self.__class__.__name__
-      
-    @property
-    def size(self):
-        return self._size
+        # Read one row group at a time, so that only it is held in memory.
+        for i in row_groups:
+            yield this.from_arrow( parquet_file.read_row_group(i, 
+              columns=columns), data_types=data_types, index_name=index_name)
 
-    @property
-    def slice(self):
-        return slice(self._start, self._stop, self._step)
+    @classmethod
+    def read_parquet(this, filepath, columns=None, row_groups=None, 
+      data_types=None, index_name=None):
 
-    @property
-    def span(self):
-        return self._span
+        pyarrow = _import_pyarrow()
+        import pyarrow.parquet
 
-    @property
-    def start(self):
-        return self._start
+        parquet_file = pyarrow.parquet.ParquetFile(filepath)
+        columns = this._parquet_columns(parquet_file, columns, index_name)
 
-    @property
-    def step(self):
-        return self._step
+        if row_groups is not None:
+            arrow_table = parquet_file.read_row_groups(row_groups, columns=columns)
+        else:
+            arrow_table = parquet_file.read(columns=columns)
 
-    @property
-    def stop(self):
-        return self._stop
+        return this.from_arrow(arrow_table, data_types=data_types, 
+          index_name=index_name)
 
-    def __init__(self, obj, key):
+    @classmethod
+    def _parquet_columns(this, parquet_file, columns, index_name):
+
+        if columns is None:
+            return None
+
+        schema = parquet_file.schema.to_arrow_schema()
+        metadata = schema.metadata or dict()
+
+        if index_name is None and b"pyselection.index" in metadata:
+            index_name = metadata[b"pyselection.index"].decode('utf-8')
+
+        # Read the index column along with any subset of columns.
+        columns = list(columns)
+        if index_name is not None and index_name not in columns:
+            if index_name in schema.names:
+                columns.insert(0, index_name)
+
+        return columns
+
+    def write_parquet(self, filepath, column_names=None, index_name="label",
+      row_group_size=None, compression='snappy'):
+
+        pyarrow = _import_pyarrow()
+        import pyarrow.parquet
+
+        pyarrow.parquet.write_table(self.to_arrow(column_names=column_names,
+          index_name=index_name), filepath, row_group_size=row_group_size,
+          compression=compression)
+
+    def tolist(self, flatten=False):
+
+        if flatten:
+            return [ x for row in self._list for x in row ] 
+        else:
+            return [ list(x) for x in self._list ]
+
+    def validate_table(self, table):
+    
+        if isinstance(table, BaseTable):
+            if all( x in self._dtypes for x in table._dtypes ):
+                return
+        elif not is_sized_iterable(table) or isinstance(table, str_types):
+            raise TypeError("%s table must be a sized non-string iterable" % self.nom)
         
-        if not isinstance(obj, BaseList):
-            raise TypeError("%s() takes a BaseList object" % self.nom)
- 
-        if isinstance(key, int_types):
-            
-            index = obj._adapt_index(key)
-            
-            self._start = self._last = self._max = self._min = index
-            self._stop = index + 1
-            self._step = self._size = self._span = 1
-            
-        elif isinstance(key, slice):
-            
-            slc_info = dict()
-            
-            slc = obj._adapt_slice(key, slc_info)
-            
-            self._start = slc.start
-            self._stop = slc.stop
-            self._step = slc.step
-            
-            self._last = slc_info['last']
-            self._max = slc_info['max'] 
-            self._min = slc_info['min']
-            self._size = slc_info['size']
-            self._span = slc_info['span']
+        for row in table:
             
-            self._rng = dict()
+            if isinstance(row, BaseList):
+                if all( x in self._dtypes for x in row._dtypes ):
+                    continue
+            elif not is_sized_iterable(row) or isinstance(row, str_types):
+                raise TypeError("%s row must be a sized non-string iterable" % self.nom)            
             
+            if not all( isinstance(value, self._dtypes) for value in row ):
+                dtype_names = str( tuple(x.__name__ for x in self._dtypes) ) 
+                raise TypeError("%s element data types must be one or more of %s" % 
+                  (self.nom, dtype_names) )
+
+class RaggedTable(BaseTable):
+    
+    def __init__(self, contents, data_types=None, row_type=None, row_labels=None):
+        
+        super(RaggedTable, self).__init__([], data_types=data_types, 
+          row_type=row_type)
+        
+        self.validate_table(contents)
+        
+        if isinstance(contents, BaseTable):
+            contents = contents._list
+        
+        # Rows are appended to the flat buffers as they are read, without 
+        # building a list of rows first.
+        self._list = RaggedRows(contents)
+        
+        if row_labels is not None:
+            self.row_labels = row_labels
+
+    def __contains__(self, value): 
+        if isinstance(value, self._dtypes):
+            return value in self._list.values
         else:
-            raise TypeError("invalid %s index/key (%s)" % (obj.nom, repr(key) ) )
+            return value in self._list
 
-    def iter_decreasing(self):
-        self._rng.setdefault('decreasing', tuple( 
-          x for x in range(self._max, self._min - 1, -abs(self._step) ) ) )
-        return self._rng['decreasing']
+    def __reduce_ex__(self, protocol):
+        return (_restore_ragged, (self.__class__, _dtype_names(self._dtypes), 
+          self._rtype, _pack_values(self._list.offsets, protocol), 
+          _pack_values(self._list.values, protocol), 
+          self.__dict__.get("row_labels") ) )
 
-    def iter_increasing(self):
-        self._rng.setdefault('increasing', tuple( 
-          x for x in range(self._min, self._max + 1, abs(self._step) ) ) )
-        return self._rng['increasing']
+    def _set_rows(self, rows):
+        super(RaggedTable, self)._set_rows( RaggedRows(rows) )
 
-    def iter_indices(self):
-        self._rng.setdefault('iter', tuple( 
-          x for x in range(self._start, self._stop, self._step) ) )
-        return self._rng['iter']
+    def _share_rows(self):
+        return copy(self._list)
 
-class TableSlicer(ListSlicer):
+    def _update_row_lengths(self):
+        
+        # Lengths are read from the row offsets, and their range from counts 
+        # kept as rows change, so no edit needs a pass over every row.
+        self._row_lengths = self._list.row_lengths()
+        self._min_row_length, self._max_row_length = self._list.length_range()
 
-    @property
-    def col_slice(self):
-        return slice(self._start[1], self._stop[1], self._step[1])
+    def get_table_element(self, row_index, col_index):
         
-    @property
-    def row_slice(self):
-        return slice(self._start[0], self._stop[0], self._step[0])
+        r = self._adapt_index(row_index)
+        c = self._adapt_index2(col_index)
+        
+        offsets = self._list.offsets
+        
+        if c >= offsets[r+1] - offsets[r]:
+            raise IndexError("%s index (%d, %d) out of range" % (self.nom, r, c) )
+        
+        return self._list.values[ offsets[r] + c ]
 
     @property
-    def slice(self):
-        raise NotImplementedError("%s has no property 'slice'" % self.nom)
+    def row_lengths(self):
+        return tuple(self._row_lengths)
 
-    def __init__(self, table, row_key, col_key):
+    def get_table_slice(self, row_key, col_key):
         
-        if not isinstance(table, BaseTable):
-            raise TypeError("%s() takes a BaseTable object" % self.nom)
+        slicer = TableSlicer(self, row_key, col_key)
         
-        adapt_index = (table._adapt_index, table._adapt_index2)
-        adapt_slice = (table._adapt_slice, table._adapt_slice2)
+        if slicer.step[1] < 0:
+            return super(RaggedTable, self).get_table_slice(row_key, col_key)
         
-        start, step, stop, last, xmax, xmin, size, span,  = ( 
-          [None] * 2 for _ in range(8) )
+        values, offsets = self._list.values, self._list.offsets
+        col_slice = slicer.col_slice
+        width = slicer.size[1]
         
-        for i, key in enumerate([row_key, col_key]):
+        rows = list()
+        
+        for r in slicer.iter_rows():
             
-            if isinstance(key, int_types):
-                
-                index = adapt_index[i](key)
-                
-                start[i] = last[i] = xmax[i] = xmin[i] = index
-                stop[i] = index + 1
-                step[i] = size[i] = span[i] = 1
-                
-            elif isinstance(key, slice):
+            # Take whole columns from each row's span of the value buffer.
+            row = values[ offsets[r]:offsets[r+1] ][col_slice]
             
-                slc_info = dict()
-                
-                slc = adapt_slice[i](key, slc_info)
-                    
-                start[i] = slc.start
-                stop[i] = slc.stop
-                step[i] = slc.step
+            if len(row) < width:
+                row.extend( [None] * (width - len(row)) )
             
-                last[i] = slc_info['last']
-                xmax[i] = slc_info['max'] 
-                xmin[i] = slc_info['min']
-                size[i] = slc_info['size']
-                span[i] = slc_info['span']
-                
-            else:
-                raise TypeError("invalid %s index/key (%s)" % (table.nom, repr(key) ) )
+            rows.append(row)
         
-        self._last = tuple(last)
-        self._min = tuple(xmin)
-        self._max = tuple(xmax)
-        self._size = tuple(size)
-        self._span = tuple(span)
-        self._start = tuple(start)
-        self._step = tuple(step)
-        self._stop = tuple(stop)
+        if slicer.size[0] > 1:
+            item = self.__class__(rows, data_types=self._dtypes, row_type=self._rtype)
+        else:
+            item = self._rtype(rows[0], data_types=self._dtypes)
         
-        self._rng = ({}, {})
+        return item
+
+    def tolist(self, flatten=False):
         
-        self._row_lengths = dict()
+        if flatten:
+            return list(self._list.values)
+        else:
+            return [ x for x in self._list ]
+
+class ColumnTable(BaseTable):
+    """Class for a table with a typed column for each column of its schema."""
+    
+    @classmethod
+    def concat(this, tables, schema=None, labels='unique', prefixes=None):
         
-        row_lengths = table.row_lengths
+        tables = list(tables)
         
-        if xmax[1] > table.min_row_length:
-            for r in range(self._start[0], self._stop[0], self._step[0]):
-                if row_lengths[r] <= self._max[1]:
-                    self._row_lengths[r] = row_lengths[r]
+        if schema is None:
+            schema = next( (x.schema for x in tables 
+              if isinstance(x, ColumnTable) ), None)
+        
+        table = BaseTable.concat(tables, labels=labels, prefixes=prefixes)
+        
+        return this(table, schema=schema, row_type=table._rtype, 
+          row_labels=table.__dict__.get("row_labels") )
     
-    def iter_cols(self):
-        self._rng[1].setdefault('iter', tuple( x for x in 
-          range(self._start[1], self._stop[1], self._step[1]) ) )
-        return self._rng[1]['iter']
-
-    def iter_cols_decreasing(self):
-        self._rng[1].setdefault('decreasing', tuple( x for x in 
-          range(self._max[1], self._min[1] - 1, -abs(self._step[1]) ) ) )
-        return self._rng[1]['decreasing']
-
-    def iter_cols_increasing(self):
-        self._rng[1].setdefault('increasing', tuple( x for x in 
-          range(self._min[1], self._max[1] + 1, abs(self._step[1]) ) ) )
-        return self._rng[1]['increasing']
-
-    def iter_decreasing(self):
-        for r in self.iter_rows_decreasing():
+    @classmethod
+    def read_text(this, filepath, schema=None, sep='\t', header=True, 
+      sample_size=1000, max_categories=None):
         
-            for c in self.iter_cols_decreasing():
-            
-                if r in self._row_lengths and c >= self._row_lengths[r]:
-                    yield None
-                else:
-                    yield (r, c)        
-
-    def iter_increasing(self):
-        for r in self.iter_rows_increasing():
+        if schema is None:
+            schema = TableSchema.from_text(filepath, sep=sep, header=header, 
+              sample_size=sample_size, max_categories=max_categories)
+        elif not isinstance(schema, TableSchema):
+            schema = TableSchema(schema)
         
-            for c in self.iter_cols_increasing():
+        with open(filepath, mode='r', encoding='utf-8') as handle:
             
-                if r in self._row_lengths and c >= self._row_lengths[r]:
-                    yield None
-                else:
-                    yield (r, c)  
-
-    def iter_indices(self):
-        for r in self.iter_rows():
+            if header:
+                handle.readline()
+            
+            rows = [ schema.parse( line.rstrip('\r\n').split(sep) ) 
+              for line in handle ]
         
-            for c in self.iter_cols():
+        return this(rows, schema=schema)
+    
+    @classmethod
+    def from_arrow(this, arrow_table, data_types=None, index_name=None, 
+      schema=None):
+        
+        pyarrow = _import_pyarrow()
+        
+        table = BaseTable.from_arrow(arrow_table, data_types=data_types, 
+          index_name=index_name)
+        row_labels = table.__dict__.get("row_labels")
+        
+        if schema is None:
             
-                if r in self._row_lengths and c >= self._row_lengths[r]:
-                    yield None
-                else:
-                    yield (r, c)
-
-    def iter_rows(self):
-        self._rng[0].setdefault('iter', tuple( x for x in 
-          range(self._start[0], self._stop[0], self._step[0]) ) )
-        return self._rng[0]['iter']
-
-    def iter_rows_decreasing(self):
-        self._rng[0].setdefault('decreasing', tuple( x for x in 
-          range(self._max[0], self._min[0] - 1, -abs(self._step[0]) ) ) )
-        return self._rng[0]['decreasing']
-
-    def iter_rows_increasing(self):
-        self._rng[0].setdefault('increasing', tuple( x for x in 
-          range(self._min[0], self._max[0] + 1, abs(self._step[0]) ) ) )
-        return self._rng[0]['increasing']
+            fields = list(arrow_table.schema)
+            
+            if row_labels is not None:
+                if index_name is None:
+                    index_name = arrow_table.schema.metadata[
+                      b"pyselection.index"].decode('utf-8')
+                fields = [ x for x in fields if x.name != index_name ]
+            
+            schema = TableSchema.infer(table._list, names=[ x.name for x in fields ])
+            
+            # Dictionary-encoded Arrow columns are read as categories.
+            schema = TableSchema([ ColumnSpec(spec.name, 'category', spec.nullable) 
+              if pyarrow.types.is_dictionary(field.type) and spec.data_type == 'str' 
+              else spec for spec, field in zip(schema, fields) ])
+        
+        return this(table, schema=schema, data_types=data_types, 
+          row_type=table._rtype, row_labels=row_labels)
+    
+    @property
+    def schema(self):
+        return self._list.schema
+    
+    def __init__(self, contents, schema=None, data_types=None, row_type=None, 
+      row_labels=None):
+        
+        if isinstance(contents, BaseTable):
+            if schema is None and isinstance(contents, ColumnTable):
+                schema = contents.schema
+            rows = contents._list
+        else:
+            rows = contents
+        
+        if schema is None:
+            rows = [ x for x in rows ]
+            schema = TableSchema.infer(rows)
+        elif not isinstance(schema, TableSchema):
+            schema = TableSchema(schema)
+        
+        self._dtypes = self.__class__.validate_data_types(schema.data_types)
+        
+        if data_types is not None:
+            data_types = self.__class__.validate_data_types(data_types)
+            if any( x not in data_types for x in self._dtypes ):
+                raise TypeError("%s schema has data types outside of %s" % 
+                  (self.nom, str( tuple(x.__name__ for x in data_types) ) ) )
+        
+        if row_type is not None:
+            self.__class__.validate_row_type(row_type)
+            self._rtype = row_type
+        else:
+            self._rtype = BaseList
+        
+        self._list = ColumnRows(schema, rows)
+        
+        if row_labels is not None:
+            self.row_labels = row_labels
+    
+    def __reduce_ex__(self, protocol):
+        return (_restore_columns, (self.__class__, self.schema, self._rtype, 
+          [ x if isinstance(x, (CategoricalColumn, MaskedColumn) ) 
+          else _pack_values(list(x), protocol) for x in self._list.columns ], 
+          len(self._list), self.__dict__.get("row_labels") ) )
+    
+    def _adapt_rows(self, rows):
+        
+        if isinstance(rows, BaseTable):
+            rows = rows._list
+        
+        # Check rows against the schema before any labels are changed.
+        return ColumnRows(self.schema, rows).tolist()
+    
+    def _get_arrow_arrays(self, pyarrow):
+        
+        arrays = list()
+        
+        for c, column in enumerate(self._list.columns):
+            if isinstance(column, CategoricalColumn):
+                indices = pyarrow.array([ x if x >= 0 else None 
+                  for x in column.codes ], type=pyarrow.int32() )
+                arrays.append( pyarrow.DictionaryArray.from_arrays(indices, 
+                  pyarrow.array( list(column.categories), type=pyarrow.string() ) ) )
+            else:
+                arrays.append( _to_arrow_array(pyarrow, 
+                  self._list._get_column(c, 0, len(self) ) ) )
+        
+        return arrays
+    
+    def _set_rows(self, rows):
+        
+        schema = self.schema
+        
+        if not schema and rows:
+            schema = TableSchema.infer(rows)
+            self._dtypes = self.__class__.validate_data_types(schema.data_types)
+        
+        super(ColumnTable, self)._set_rows( ColumnRows(schema, rows) )
+    
+    def _share_rows(self):
+        return copy(self._list)
+    
+    def _update_row_lengths(self):
+        
+        self._row_lengths = self._list.row_lengths()
+        
+        if self._row_lengths:
+            self._min_row_length = self._max_row_length = len(self.schema)
+        else:
+            self._min_row_length, self._max_row_length = None, None
+    
+    def aggregate(self, column, function='sum'):
+        
+        c = self._adapt_index2(column)
+        
+        if not callable(function):
+            try:
+                function = column_aggregations[function]
+            except (KeyError, TypeError):
+                raise ValueError("invalid %s aggregation (%s)" % (self.nom, 
+                  repr(function) ) )
+        
+        return function( self._list.get_valid_values(c) )
+    
+    def count(self, value, start=None, stop=None):
+        
+        # Count whole columns at once, comparing codes for categories.
+        if isinstance(value, self._dtypes) and start is None and stop is None:
+            return sum( self._list.count(c, value) 
+              for c in range( len(self.schema) ) )
+        
+        return super(ColumnTable, self).count(value, start=start, stop=stop)
+    
+    def dropna(self, columns=None):
+        
+        if columns is None:
+            columns = range( len(self.schema) )
+        
+        # Keep the rows that are valid in every column.
+        keep = bytearray(b'\x01') * len(self)
+        
+        for c in columns:
+            valid = self._list.get_valid( self._adapt_index2(c) )
+            keep = bytearray( x and y for x, y in zip(keep, valid) )
+        
+        indices = list( compress( range( len(self) ), keep) )
+        
+        row_labels = self.__dict__.get("row_labels")
+        
+        if row_labels is not None and row_labels.count_labels():
+            row_labels = TableLabels([ row_labels[i] for i in indices ])
+        else:
+            row_labels = None
+        
+        table = _wrap_rows(self.__class__, self._dtypes, self._rtype, 
+          self._list.take(indices) )
+        
+        if row_labels is not None:
+            table.row_labels = row_labels
+        
+        return table
+    
+    def fillna(self, value, columns=None):
+        
+        if columns is None:
+            columns = [ c for c, spec in enumerate(self.schema) if spec.nullable ]
+        
+        table = copy(self)
+        
+        for c in columns:
+            table._list.fill_nulls(table._adapt_index2(c), value)
+        
+        return table
+    
+    def find_range(self, column, low=None, high=None, low_inclusive=True, 
+      high_inclusive=True):
+        
+        if ( low is not None and low == high and low_inclusive and high_inclusive 
+          and column not in self.__dict__.get("_indexes", dict() ) ):
+            return tuple( self._list.find(column, low) )
+        
+        return super(ColumnTable, self).find_range(column, low=low, high=high, 
+          low_inclusive=low_inclusive, high_inclusive=high_inclusive)
+    
+    def findall(self, value, start=None, stop=None):
+        
+        if isinstance(value, self._dtypes) and start is None and stop is None:
+            return tuple( sorted( (r, c) for c in range( len(self.schema) ) 
+              for r in self._list.find(c, value) ) )
+        
+        return super(ColumnTable, self).findall(value, start=start, stop=stop)
+    
+    def get_slice(self, row_key):
+        
+        slc = self._adapt_slice(row_key)
+        
+        row_labels = self.__dict__.get("row_labels")
+        
+        if row_labels is not None and row_labels.count_labels():
+            row_labels = TableLabels(row_labels[slc])
+        else:
+            row_labels = None
+        
+        return self.__class__(self._list[slc], schema=self.schema, 
+          row_type=self._rtype, row_labels=row_labels)
+    
+    def group_rows(self, column):
+        
+        column = self._adapt_index2(column)
+        values = self._list.columns[column]
+        
+        # Group categories by their codes, without comparing strings.
+        if isinstance(values, CategoricalColumn):
+            return [ (x, tuple(rows) ) for x, rows in values.group() ]
+        
+        groups = dict()
+        order = list()
+        
+        for r, value in enumerate( self._list._get_column(column, 0, len(self) ) ):
+            if value not in groups:
+                groups[value] = list()
+                order.append(value)
+            groups[value].append(r)
+        
+        return [ (x, tuple(groups[x]) ) for x in order ]
+    
+    def isnull(self, column):
+        return tuple( not x for x in self._list.get_valid( self._adapt_index2(column) ) )
+    
+    def set_table_element(self, row_index, col_index, value):
+        
+        r = self._adapt_index(row_index)
+        c = self._adapt_index2(col_index)
+        
+        # Values are checked against the type of their column.
+        self._list.set_value(r, c, value)
+        
+        self._clear_row_digests([r])
+    
+    def to_arrow(self, column_names=None, index_name="label"):
+        
+        if column_names is None:
+            column_names = self.schema.names
+        
+        return super(ColumnTable, self).to_arrow(column_names=column_names, 
+          index_name=index_name)
+    
+    def tolist(self, flatten=False):
+        
+        rows = self._list.tolist()
+        
+        if flatten:
+            return [ x for row in rows for x in row ]
+        else:
+            return rows
+
+class TableLabels(MutableSequence):
+    
+    __slots__ = ('_labels', '_label2index', '_digest')
+    
+    @classmethod
+    def from_length(this, length):
+        
+        if not isinstance(length, int_types) or length < 0:
+            raise TypeError("%s length (%s) must be an integer" % (this.__name__, 
+              repr(length) ) )
+        
+        # Store no labels until they are set, since most are never set.
+        return _restore_labels(this, SparseLabels(length) )
+
+    @property
+    def compact(self):
+        return isinstance(self._labels, PackedLabels)
+
+    @property
+    def nom(self):
+        return self.__class__.__name__
+
+    def __init__(self, labels, compact=False):
+        
+        try:
+            assert not isinstance(labels, str_types)
+            assert all( isinstance(x, str_types) for x in labels )
+            
+        except (AssertionError, TypeError):
+            raise TypeError("%s() takes a sized iterable of strings" % self.nom)
+       
+        if compact:
+            self._labels = PackedLabels(labels)
+            self._label2index = self._labels.index
+            return
+       
+        self._labels = list(labels)
+        
+        self._label2index = dict()
+        
+        for index, label in enumerate(labels):
+            
+            if label != '':
+                
+                if label in self._label2index:
+                    raise ValueError("%s cannot contain duplicate labels" % self.nom)
+            
+                self._label2index[label] = index
+
+    def __bool__(self):
+        return len(self._labels) != 0  
+  
+    def __contains__(self, value):
+        if value == '':
+            return len(self._label2index) < len(self._labels)
+        return value in self._label2index
+  
+    def __copy__(self):
+        return _restore_labels( self.__class__, copy(self._labels) ) 
+  
+    def __deepcopy__(self, memo=dict() ):
+        return _restore_labels( self.__class__, copy(self._labels) )  
+  
+    def __delitem__(self, key):       
+        raise TypeError("%s cannot be resized" % self.nom)
+        
+    def __eq__(self, other):
+        if isinstance(other, TableLabels):
+            return self.tolist() == other.tolist()
+        try:
+            return self.tolist() == TableLabels(other).tolist()
+        except (TypeError, ValueError):
+            return False
+        
+    def __getitem__(self, key):        
+    
+        if isinstance(key, int_types):
+            
+            if key < -len(self._labels) or key >= len(self._labels):
+                raise IndexError("%s index (%d) out of range" % (self.nom, key) )
+            item = self._labels[key]
+        
+        elif isinstance(key, str_types):
+        
+            try:
+                item = self._label2index[key]
+            except KeyError:
+                raise KeyError("%s label (%s) not found" % (self.nom, repr(key) ) )
+            
+        elif isinstance(key, slice):
+            
+            slc = self._adapt_slice(key)
+            item = tuple( self._labels[slc] )
+            
+        else:
+            raise TypeError("invalid %s key (%s)" % (self.nom, repr(key)) )
+    
+        return item
+    
+    def __iadd__(self, other):
+        raise TypeError("%s cannot be resized" % self.nom)
+    
+    def __add__(self, other):
+        if not issubclass(type(other), TableLabels):
+            other = self.__class__(other)
+        return self.__class__(self.tolist() + other.tolist())        
+        
+    def __iter__(self):
+        for x in self._labels:
+            yield x
+
+    def __radd__(self, other):
+        if not issubclass(type(other), TableLabels):
+            other = self.__class__(other)
+        return self.__class__(other.tolist() + self.tolist())    
+
+    def __reduce_ex__(self, protocol):
+        if isinstance(self._labels, list):
+            return (_restore_labels, (self.__class__, list(self._labels) ) )
+        return (_restore_labels, (self.__class__, self._labels) )
+
+    def __len__(self):
+        return len(self._labels)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __nonzero__(self):
+        return type(self).__bool__(self)
+
+    def __reversed__(self):
+        for x in reversed(self._labels):
+            yield x 
+    
+    def __setitem__(self, key, value):
+        
+        if isinstance(key, int_types):
+            
+            self.set_label(key, value)
+              
+        elif isinstance(key, str_types):
+            
+            self.set_label(value, key)
+            
+        elif isinstance(key, slice):
+            
+            if not is_sized_iterable(value) or isinstance(value, str_types):
+                raise TypeError("%s method takes a sized iterable of strings" % self.nom)
+
+            slc = self._adapt_slice(key)
+            
+            slice_indices = [ i for i in range(slc.start, slc.stop, slc.step) ]
+            
+            if len(value) != len(slice_indices):
+                raise TypeError("%s cannot be resized" % self.nom)
+         
+            for index, label in zip(slice_indices, value):
+                self.set_label(index, label)
+        else:
+            raise TypeError("invalid %s key (%s)" % (self.nom, repr(key) ) )   
+    
+    def __str__(self):
+        contents = "(%s)" % ", ".join( repr(x) for x in self._labels )
+        return "%s%s" % (self.nom, contents)
+  
+    def _adapt_slice(self, slc):
+        try:
+            if not all( isinstance(x, tuple([int_types] + [NoneType]) ) 
+                for x in (slc.start, slc.stop, slc.step) ):
+                    raise TypeError("%s slice indices must be integer or None" % self.nom)
+        except AttributeError:
+            raise TypeError("%s _adapt_slice() takes a slice object" % self.nom)
+    
+        length = len(self._labels)
+    
+        if slc.step is None:
+            step = 1
+        elif slc.step != 0:
+            step = slc.step
+        else:
+            raise ValueError("%s slice step cannot be zero" % self.nom)
+ 
+        if slc.start is not None:
+            start = slc.start
+            if start < -length or start >= length:
+                raise IndexError("%s slice start (%d) out of range" % (self.nom, start) )
+            if start < 0:
+                start += length
+        else:
+            start = 0 if step > 0 else length - 1
+
+        if slc.stop is not None:
+            stop = slc.stop
+            if stop < -length or stop > length:
+                raise IndexError("%s slice stop (%d) out of range" % (self.nom, stop) )
+            if stop < 0:
+                stop += length
+             
+            if step == 1:
+                if start > stop:
+                    stop = start
+            elif (step > 1 and start >= stop) or (step < 0 and start <= stop):
+                raise ValueError("%s extended slice is of size 0" % self.nom)
+        else:
+            stop = length if step > 0 else -1
+
+        return slice(start, stop, step)
+
+    def _reverse(self):
+        
+        if isinstance(self._labels, SparseLabels):
+            last = len(self._labels) - 1
+            self._labels = SparseLabels( len(self._labels), dict( (last - i, x) 
+              for i, x in self._labels.items() ) )
+        else:
+            self._labels = [ x for x in reversed(self._labels) ]
+        
+        self._label2index = _index_labels(self._labels)
+        self._digest = None
+
+    def _splice(self, slc, labels):
+        
+        if not all( isinstance(x, str_types) for x in labels ):
+            raise TypeError("%s() takes a sized iterable of strings" % self.nom)
+        
+        labels = list(labels)
+        
+        # Change only the labels from the start of a simple slice onwards, 
+        # which for sparse labels are only those that have been set.
+        if slc.step == 1 and not isinstance(self._labels, PackedLabels):
+            
+            start, stop = slc.start, max(slc.start, slc.stop)
+            shift = len(labels) - (stop - start)
+            
+            if isinstance(self._labels, SparseLabels):
+                index2label = dict( (i if i < start else i + shift, x) 
+                  for i, x in self._labels.items() if i < start or i >= stop )
+                index2label.update( (start + i, x) for i, x in enumerate(labels) 
+                  if x != '' )
+                storage = SparseLabels(len(self._labels) + shift, index2label)
+                label2index = _index_labels(storage)
+                if len(label2index) != len(index2label):
+                    raise ValueError("%s cannot contain duplicate labels" % self.nom)
+                self._labels, self._label2index = storage, label2index
+            
+            else:
+                removed = set( x for x in self._labels[start:stop] if x != '' )
+                added = [ x for x in labels if x != '' ]
+                if len( set(added) ) != len(added) or any( x in self._label2index 
+                  and x not in removed for x in added ):
+                    raise ValueError("%s cannot contain duplicate labels" % self.nom)
+                for x in removed:
+                    del self._label2index[x]
+                self._labels[start:stop] = labels
+                for i in range(start, len(self._labels) ):
+                    if self._labels[i] != '':
+                        self._label2index[ self._labels[i] ] = i
+        
+        else:
+            
+            storage = list(self._labels)
+            if labels:
+                storage[slc] = labels
+            else:
+                del storage[slc]
+            
+            if isinstance(self._labels, SparseLabels):
+                storage = SparseLabels( len(storage), dict( (i, x) for i, x 
+                  in enumerate(storage) if x != '' ) )
+            
+            label2index = _index_labels(storage)
+            if len(label2index) != sum( 1 for x in storage if x != '' ):
+                raise ValueError("%s cannot contain duplicate labels" % self.nom)
+            self._labels, self._label2index = storage, label2index
+        
+        self._digest = None
+        
+    def _unpack(self):
+        
+        # Unpack compact labels into a list before they are changed.
+        if isinstance(self._labels, PackedLabels):
+            self._labels = list(self._labels)
+            self._label2index = _index_labels(self._labels)
+  
+    def append(self, value):
+        raise TypeError("%s cannot be resized" % self.nom)
+  
+    def clear(self, key):
+        
+        self._unpack()
+        
+        if isinstance(key, int_types):
+            
+            if key < -len(self._labels) or key >= len(self._labels):
+                raise IndexError("%s index (%d) out of range" % (self.nom, key) )
+            
+            self._label2index.pop(self._labels[key], None)
+            self._labels[key] = ''
+              
+        elif isinstance(key, str_types):
+            
+            if key not in self._label2index:
+                raise KeyError("%s label (%s) not found" % (self.nom, repr(key)) )
+            
+            self._labels[ self._label2index[key] ] = ''
+            del self._label2index[key]
+
+        else:
+            raise TypeError("invalid %s key (%s)" % (self.nom, repr(key) ) )
+        
+        self._digest = None
+
+    def count(self, label):
+        return 1 if label in self._label2index else 0 
+  
+    def count_labels(self):
+        return len(self._label2index)
+  
+    def extend(self, values):
+        raise TypeError("%s cannot be resized" % self.nom)    
+
+    def fingerprint(self):
+        
+        digest = getattr(self, "_digest", None)
+        
+        if digest is None:
+            hasher = sha1()
+            for label in self._labels:
+                hasher.update( _value_key(label) )
+            digest = self._digest = hasher.hexdigest()
+        
+        return digest
+ 
+    def index(self, label):
+        if label in self._label2index:
+            return self._label2index[label]
+        raise ValueError("%s label (%s) not found" % (self.nom, repr(label) ) )
+ 
+    def insert(self, index, value):       
+        raise TypeError("%s cannot be resized" % self.nom)  
+
+    def pop(self):
+        raise TypeError("%s cannot be resized" % self.nom)    
+
+    def remove(self, label):
+        raise TypeError("%s cannot be resized" % self.nom)
+
+    def reverse(self):
+        raise TypeError("%s cannot be reordered" % self.nom)
+
+    def set_label(self, index, label):
+        
+        self._unpack()
+        
+        if not isinstance(index, int_types):
+            raise TypeError("%s index (%s) must be an integer" % (self.nom, repr(index) ) )
+        if index < -len(self._labels) or index >= len(self._labels):
+            raise IndexError("%s index (%d) out of range" % (self.nom, index) )
+        if index < 0:
+            index += len(self._labels)
+        if not isinstance(label, str_types) or label == '':
+            raise TypeError("invalid %s label (%s)" % (self.nom, repr(label) ) )
+        if label in self._label2index and index != self._label2index[label]:
+            raise ValueError("%s cannot contain duplicate labels" % self.nom)
+        
+        if self._labels[index] in self._label2index:
+            del self._label2index[ self._labels[index] ]
+        
+        self._labels[index] = label
+        
+        self._label2index[label] = index
+        
+        self._digest = None
+
+    def tolist(self):
+        return [ x for x in self._labels ]
+
+class TableBuilder(object):
+    """Class for accumulating rows in column buffers and building a table."""
+    
+    @property
+    def nom(self):
+        return self.__class__.__name__
+    
+    def __init__(self, data_types=None, row_type=None, table_type=None):
+        
+        if table_type is None:
+            table_type = BaseTable
+        elif not isinstance(table_type, type) or not issubclass(table_type, BaseTable):
+            raise TypeError("%s table type must be a subclass of BaseTable" % self.nom)
+        
+        # Keep an empty table to validate rows against.
+        self._table = table_type([], data_types=data_types, row_type=row_type)
+        self._clear()
+    
+    def __len__(self):
+        return len(self._lengths)
+    
+    def _add_row(self, row):
+        
+        columns = self._columns
+        
+        for c, value in enumerate(row):
+            
+            if c == len(columns):
+                columns.append( _column_buffer(value) )
+            
+            column = columns[c]
+            
+            # Numbers are kept in arrays for as long as a column holds only
+            # numbers of one type that fit in 64 bits.
+            if not isinstance(column, list):
+                try:
+                    if type(value) is not _buffer_types[column.typecode]:
+                        raise TypeError
+                    column.append(value)
+                    continue
+                except (TypeError, OverflowError):
+                    column = columns[c] = list(column)
+            
+            column.append(value)
+        
+        self._lengths.append( len(row) )
+    
+    def _clear(self):
+        self._columns = list()
+        self._lengths = array( str('l') )
+        self._labels = None
+    
+    def _add_labels(self, labels):
+        
+        # Labels are only kept once a row with a label has been added.
+        if labels is None and self._labels is None:
+            return
+        
+        if self._labels is None:
+            self._labels = list()
+        
+        padding = len(self) - len(self._labels) - len(labels or () )
+        self._labels.extend( [''] * padding )
+        
+        if labels is not None:
+            self._labels.extend(labels)
+    
+    def append(self, row, label=''):
+        
+        if not isinstance(label, str_types):
+            raise TypeError("%s label must be a string" % self.nom)
+        
+        self._table.validate_table([ row ])
+        
+        self._add_row(row)
+        self._add_labels([ label ] if label != '' else None)
+    
+    def build(self):
+        
+        rows = _rows_from_columns(self._lengths, self._columns)
+        
+        table = self._table.__class__([], data_types=self._table._dtypes, 
+          row_type=self._table._rtype)
+        table._set_rows(rows)
+        
+        if self._labels is not None:
+            table.row_labels = TableLabels(self._labels)
+        
+        self._clear()
+        
+        return table
+    
+    def extend(self, rows):
+        
+        self._table.validate_table(rows)
+        
+        if isinstance(rows, BaseTable):
+            labels = rows.__dict__.get("row_labels")
+            if labels is not None and not labels.count_labels():
+                labels = None
+            rows = rows._list
+        else:
+            labels = None
+        
+        for row in rows:
+            self._add_row(row)
+        
+        self._add_labels(labels)
+
+class ColumnIndex(object):
+    """Class for a sorted index of the values in one column of a table."""
+    
+    # Number of changed rows above which an index is rebuilt, not updated.
+    max_updates = 64
+    
+    @property
+    def column(self):
+        return self._column
+    
+    @property
+    def nom(self):
+        return self.__class__.__name__
+    
+    @property
+    def table(self):
+        return self._table
+    
+    def __init__(self, table, column):
+        
+        if not isinstance(table, BaseTable):
+            raise TypeError("%s() takes a BaseTable object" % self.nom)
+        if not isinstance(column, int_types) or column < 0:
+            raise TypeError("%s column (%s) must be a non-negative integer" % 
+              (self.nom, repr(column) ) )
+        
+        self._table = table
+        self._column = column
+        self._build()
+    
+    def __len__(self):
+        self._refresh()
+        return len(self._keys)
+    
+    def _build(self):
+        
+        self._values = [ self._get_value(r) for r in range( len(self._table) ) ]
+        
+        # Sort by value, then by row, so that each entry has one place.
+        pairs = sorted( (x, r) for r, x in enumerate(self._values) 
+          if x is not _missing )
+        
+        self._keys = [ x for x, _ in pairs ]
+        self._rows = array( str('l'), [ r for _, r in pairs ] )
+        self._stale = False
+    
+    def _get_value(self, r):
+        
+        row = self._table._list[r]
+        
+        if len(row) > self._column and row[self._column] is not None:
+            return row[self._column]
+        
+        return _missing
+    
+    def _insert(self, r):
+        
+        value = self._get_value(r)
+        self._values[r] = value
+        
+        if value is not _missing:
+            lo = bisect_left(self._keys, value)
+            i = bisect_left(self._rows, r, lo, bisect_right(self._keys, value, lo) )
+            self._keys.insert(i, value)
+            self._rows.insert(i, r)
+    
+    def _refresh(self):
+        if self._stale:
+            self._build()
+    
+    def _remove(self, r):
+        
+        value = self._values[r]
+        
+        if value is not _missing:
+            lo = bisect_left(self._keys, value)
+            i = bisect_left(self._rows, r, lo, bisect_right(self._keys, value, lo) )
+            del self._keys[i]
+            del self._rows[i]
+    
+    def _splice(self, key, size=None):
+        
+        if self._stale:
+            return
+        
+        length = len(self._values)
+        
+        # Rows added or removed at the end leave other row indices as they are.
+        if size is None:
+            if isinstance(key, int_types) and key in (-1, length - 1):
+                self._remove(length - 1)
+                del self._values[-1]
+                return
+        else:
+            rows = range( *key.indices(length) )
+            if len(rows) == size:
+                self._update(rows)
+                return
+            elif key.step == 1 and key.start == length and size <= self.max_updates:
+                self._values.extend( [_missing] * size )
+                for r in range(length, length + size):
+                    self._insert(r)
+                return
+        
+        self._stale = True
+    
+    def _update(self, rows=None):
+        
+        if self._stale:
+            return
+        
+        if rows is not None:
+            rows = list(rows)
+        
+        if rows is None or len(rows) > self.max_updates:
+            self._stale = True
+            return
+        
+        for r in rows:
+            self._remove(r)
+            self._insert(r)
+    
+    def equal(self, value):
+        return self.range(value, value)
+    
+    def range(self, low=None, high=None, low_inclusive=True, high_inclusive=True):
+        
+        self._refresh()
+        
+        if low is None:
+            lo = 0
+        elif low_inclusive:
+            lo = bisect_left(self._keys, low)
+        else:
+            lo = bisect_right(self._keys, low)
+        
+        if high is None:
+            hi = len(self._keys)
+        elif high_inclusive:
+            hi = bisect_right(self._keys, high, lo)
+        else:
+            hi = bisect_left(self._keys, high, lo)
+        
+        return tuple( sorted(self._rows[lo:hi]) ) if lo < hi else ()
+
+class ListSlicer(object):
+
+    __slots__ = ('_start', '_stop', '_step', '_last', '_max', '_min', '_size', 
+      '_span', '_rng')
+
+    @property
+    def last(self):
+        return self._last 
+
+    @property
+    def max(self):
+        return self._max
+ 
+    @property
+    def min(self):
+        return self._min
+    
+    @property
+    def nom(self):
+        return self.__class__.__name__
+      
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def slice(self):
+        return slice(self._start, self._stop, self._step)
+
+    @property
+    def span(self):
+        return self._span
+
+    @property
+    def start(self):
+        return self._start
+
+    @property
+    def step(self):
+        return self._step
+
+    @property
+    def stop(self):
+        return self._stop
+
+    def __init__(self, obj, key):
+        
+        if not isinstance(obj, BaseList):
+            raise TypeError("%s() takes a BaseList object" % self.nom)
+ 
+        if isinstance(key, int_types):
+            
+            index = obj._adapt_index(key)
+            
+            self._start = self._last = self._max = self._min = index
+            self._stop = index + 1
+            self._step = self._size = self._span = 1
+            
+            self._rng = dict()
+            
+        elif isinstance(key, slice):
+            
+            slc_info = dict()
+            
+            slc = obj._adapt_slice(key, slc_info)
+            
+            self._start = slc.start
+            self._stop = slc.stop
+            self._step = slc.step
+            
+            self._last = slc_info['last']
+            self._max = slc_info['max'] 
+            self._min = slc_info['min']
+            self._size = slc_info['size']
+            self._span = slc_info['span']
+            
+            self._rng = dict()
+            
+        else:
+            raise TypeError("invalid %s index/key (%s)" % (obj.nom, repr(key) ) )
+
+    def iter_decreasing(self):
+        self._rng.setdefault('decreasing', tuple( 
+          x for x in range(self._max, self._min - 1, -abs(self._step) ) ) )
+        return self._rng['decreasing']
+
+    def iter_increasing(self):
+        self._rng.setdefault('increasing', tuple( 
+          x for x in range(self._min, self._max + 1, abs(self._step) ) ) )
+        return self._rng['increasing']
+
+    def iter_indices(self):
+        self._rng.setdefault('iter', tuple( 
+          x for x in range(self._start, self._stop, self._step) ) )
+        return self._rng['iter']
+
+class TableSlicer(ListSlicer):
+
+    __slots__ = ('_row_lengths',)
+
+    @property
+    def col_slice(self):
+        return slice(self._start[1], self._stop[1], self._step[1])
+        
+    @property
+    def row_slice(self):
+        return slice(self._start[0], self._stop[0], self._step[0])
+
+    @property
+    def slice(self):
+        raise NotImplementedError("%s has no property 'slice'" % self.nom)
+
+    def __init__(self, table, row_key, col_key):
+        
+        if not isinstance(table, BaseTable):
+            raise TypeError("%s() takes a BaseTable object" % self.nom)
+        
+        adapt_index = (table._adapt_index, table._adapt_index2)
+        adapt_slice = (table._adapt_slice, table._adapt_slice2)
+        
+        start, step, stop, last, xmax, xmin, size, span,  = ( 
+          [None] * 2 for _ in range(8) )
+        
+        for i, key in enumerate([row_key, col_key]):
+            
+            if isinstance(key, int_types):
+                
+                index = adapt_index[i](key)
+                
+                start[i] = last[i] = xmax[i] = xmin[i] = index
+                stop[i] = index + 1
+                step[i] = size[i] = span[i] = 1
+                
+            elif isinstance(key, slice):
+            
+                slc_info = dict()
+                
+                slc = adapt_slice[i](key, slc_info)
+                    
+                start[i] = slc.start
+                stop[i] = slc.stop
+                step[i] = slc.step
+            
+                last[i] = slc_info['last']
+                xmax[i] = slc_info['max'] 
+                xmin[i] = slc_info['min']
+                size[i] = slc_info['size']
+                span[i] = slc_info['span']
+                
+            else:
+                raise TypeError("invalid %s index/key (%s)" % (table.nom, repr(key) ) )
+        
+        self._last = tuple(last)
+        self._min = tuple(xmin)
+        self._max = tuple(xmax)
+        self._size = tuple(size)
+        self._span = tuple(span)
+        self._start = tuple(start)
+        self._step = tuple(step)
+        self._stop = tuple(stop)
+        
+        self._rng = ({}, {})
+        
+        self._row_lengths = dict()
+        
+        row_lengths = table._row_lengths
+        
+        if xmax[1] > table.min_row_length:
+            for r in range(self._start[0], self._stop[0], self._step[0]):
+                if row_lengths[r] <= self._max[1]:
+                    self._row_lengths[r] = row_lengths[r]
+    
+    def iter_cols(self):
+        self._rng[1].setdefault('iter', tuple( x for x in 
+          range(self._start[1], self._stop[1], self._step[1]) ) )
+        return self._rng[1]['iter']
+
+    def iter_cols_decreasing(self):
+        self._rng[1].setdefault('decreasing', tuple( x for x in 
+          range(self._max[1], self._min[1] - 1, -abs(self._step[1]) ) ) )
+        return self._rng[1]['decreasing']
+
+    def iter_cols_increasing(self):
+        self._rng[1].setdefault('increasing', tuple( x for x in 
+          range(self._min[1], self._max[1] + 1, abs(self._step[1]) ) ) )
+        return self._rng[1]['increasing']
+
+    def iter_decreasing(self):
+        for r in self.iter_rows_decreasing():
+        
+            for c in self.iter_cols_decreasing():
+            
+                if r in self._row_lengths and c >= self._row_lengths[r]:
+                    yield None
+                else:
+                    yield (r, c)        
+
+    def iter_increasing(self):
+        for r in self.iter_rows_increasing():
+        
+            for c in self.iter_cols_increasing():
+            
+                if r in self._row_lengths and c >= self._row_lengths[r]:
+                    yield None
+                else:
+                    yield (r, c)  
+
+    def iter_indices(self):
+        for r in self.iter_rows():
+        
+            for c in self.iter_cols():
+            
+                if r in self._row_lengths and c >= self._row_lengths[r]:
+                    yield None
+                else:
+                    yield (r, c)
+
+    def iter_rows(self):
+        self._rng[0].setdefault('iter', tuple( x for x in 
+          range(self._start[0], self._stop[0], self._step[0]) ) )
+        return self._rng[0]['iter']
+
+    def iter_rows_decreasing(self):
+        self._rng[0].setdefault('decreasing', tuple( x for x in 
+          range(self._max[0], self._min[0] - 1, -abs(self._step[0]) ) ) )
+        return self._rng[0]['decreasing']
+
+    def iter_rows_increasing(self):
+        self._rng[0].setdefault('increasing', tuple( x for x in 
+          range(self._min[0], self._max[0] + 1, abs(self._step[0]) ) ) )
+        return self._rng[0]['increasing']
+
+class RowView(object):
+    """Class for viewing a row of a table, reading and writing through to it."""
+    
+    __slots__ = ('_table', '_index', '_moves')
+    
+    @property
+    def nom(self):
+        return self.__class__.__name__
+    
+    def __init__(self, table, index):
+        self._table = table
+        self._index = index
+        self._moves = table.__dict__.get("_row_moves", 0)
+    
+    def __add__(self, other):
+        return self.tolist() + list(other)
+    
+    def __delitem__(self, key):
+        del self._get_writable_row()[key]
+        self._update_table(resized=True)
+    
+    def __eq__(self, other):
+        try:
+            return self.tolist() == list(other)
+        except TypeError:
+            return False
+    
+    def __getitem__(self, key):
+        return self._get_row()[key]
+    
+    def __iter__(self):
+        return iter( self._get_row() )
+    
+    def __len__(self):
+        return len( self._get_row() )
+    
+    def __ne__(self, other):
+        return not self == other
+    
+    def __radd__(self, other):
+        return list(other) + self.tolist()
+    
+    def __reversed__(self):
+        return reversed( self.tolist() )
+    
+    def __setitem__(self, key, value):
+        self._get_writable_row()[key] = value
+        self._update_table( resized=isinstance(key, slice) )
+    
+    def _get_row(self):
+        
+        # A view is bound to its row by index, so it is only valid as long as 
+        # no row has been inserted, deleted, replaced or moved.
+        if self._table.__dict__.get("_row_moves", 0) != self._moves:
+            raise RuntimeError("%s row %d is stale, since the rows of its "
+              "table have changed" % (self.nom, self._index) )
+        
+        return self._table._list[self._index]
+    
+    def _get_writable_row(self):
+        self._get_row()
+        return self._table._get_writable_row(self._index)
+    
+    def _update_table(self, resized):
+        
+        if resized:
+            self._table._clear_row_lengths()
+        
+        self._table._clear_row_digests([ self._index ])
+    
+    def pop(self):
+        value = self[-1]
+        del self[-1]
+        return value
+    
+    def reverse(self):
+        self[:] = self.tolist()[::-1]
+    
+    def sort(self, key=None, reverse=False):
+        row = self.tolist()
+        row.sort(key=key, reverse=reverse)
+        self[:] = row
+    
+    def tolist(self):
+        return list( self._get_row() )
+
+class RaggedRows(object):
+    """Class for storing jagged rows in a flat value buffer with row offsets."""
+    
+    __slots__ = ('_values', '_offsets', '_length_counts', '_shared')
+    
+    @classmethod
+    def _from_buffers(this, values, offsets):
+        obj = this.__new__(this)
+        obj._values = values
+        obj._offsets = offsets
+        obj._length_counts = dict()
+        obj._shared = False
+        obj._count_lengths(0, len(offsets) - 1, 1)
+        return obj
+    
+    @property
+    def nom(self):
+        return self.__class__.__name__
+    
+    @property
+    def offsets(self):
+        return self._offsets
+    
+    @property
+    def values(self):
+        return self._values
+    
+    def __init__(self, rows=()):
+        
+        self._values = list()
+        self._offsets = array( str('l'), [0] )
+        self._length_counts = dict()
+        self._shared = False
+        
+        self._splice(0, 0, rows)
+    
+    def __copy__(self):
+        
+        # Both buffers are shared with the copy until either side edits them.
+        obj = self.__class__.__new__(self.__class__)
+        obj._values = self._values
+        obj._offsets = self._offsets
+        obj._length_counts = dict(self._length_counts)
+        obj._shared = self._shared = True
+        return obj
+    
+    def __delitem__(self, key):
+        
+        if isinstance(key, int_types):
+            
+            r = self._adapt_index(key)
+            self._splice(r, r + 1, [])
+            
+        elif isinstance(key, slice):
+            
+            start, stop, step = key.indices( len(self) )
+            
+            if step == 1:
+                self._splice(start, max(start, stop), [])
+            else:
+                for r in sorted(range(start, stop, step), reverse=True):
+                    self._splice(r, r + 1, [])
+        else:
+            raise TypeError("invalid %s key (%s)" % (self.nom, repr(key) ) )
+    
+    def __eq__(self, other):
+        try:
+            return len(self) == len(other) and all( list(x) == list(y) 
+              for x, y in zip(self, other) )
+        except TypeError:
+            return False
+    
+    def __getitem__(self, key):
+        
+        if isinstance(key, int_types):
+            
+            return RaggedRow( self, self._adapt_index(key) )
+            
+        elif isinstance(key, slice):
+            
+            values, offsets = self._values, self._offsets
+            return [ values[ offsets[r]:offsets[r+1] ] 
+              for r in range( *key.indices( len(self) ) ) ]
+            
+        else:
+            raise TypeError("invalid %s key (%s)" % (self.nom, repr(key) ) )
+    
+    def __iter__(self):
+        values, offsets = self._values, self._offsets
+        for r in range( len(offsets) - 1 ):
+            yield values[ offsets[r]:offsets[r+1] ]
+    
+    def __len__(self):
+        return len(self._offsets) - 1
+    
+    def __ne__(self, other):
+        return not self == other
+    
+    def __reversed__(self):
+        values, offsets = self._values, self._offsets
+        for r in reversed( range( len(offsets) - 1 ) ):
+            yield values[ offsets[r]:offsets[r+1] ]
+    
+    def __setitem__(self, key, value):
+        
+        if isinstance(key, int_types):
+            
+            r = self._adapt_index(key)
+            self._splice(r, r + 1, [ value ])
+            
+        elif isinstance(key, slice):
+            
+            start, stop, step = key.indices( len(self) )
+            
+            if step == 1:
+                self._splice(start, max(start, stop), value)
+            else:
+                indices = range(start, stop, step)
+                if len(value) != len(indices):
+                    raise ValueError("cannot assign %d rows to extended slice "
+                      "of size %d" % ( len(value), len(indices) ) )
+                for r, row in zip(indices, value):
+                    self._splice(r, r + 1, [ row ])
+        else:
+            raise TypeError("invalid %s key (%s)" % (self.nom, repr(key) ) )
+    
+    def _adapt_index(self, index):
+        
+        length = len(self)
+        
+        if index < -length or index >= length:
+            raise IndexError("%s index (%d) out of range" % (self.nom, index) )
+        if index < 0:
+            index += length
+        return index
+    
+    def _count_lengths(self, start, stop, change):
+        
+        offsets, counts = self._offsets, self._length_counts
+        
+        for r in range(start, stop):
+            length = offsets[r+1] - offsets[r]
+            count = counts.get(length, 0) + change
+            if count:
+                counts[length] = count
+            else:
+                del counts[length]
+    
+    def _splice(self, start, stop, rows):
+        
+        self._unshare()
+        offsets, values = self._offsets, self._values
+        
+        self._count_lengths(start, stop, -1)
+        
+        # Rows added at the end are appended to both buffers in place.
+        if start == stop == len(offsets) - 1:
+            for row in rows:
+                values.extend(row)
+                offsets.append( len(values) )
+            self._count_lengths(start, len(offsets) - 1, 1)
+            return
+        
+        rows = [ list(x) for x in rows ]
+        
+        first, last = offsets[start], offsets[stop]
+        values[first:last] = [ x for row in rows for x in row ]
+        
+        # Only the offsets past the edit point change.
+        head = array( str('l') )
+        position = first
+        
+        for row in rows:
+            position += len(row)
+            head.append(position)
+        
+        offsets[start+1:stop+1] = head
+        
+        shift = position - last
+        tail = start + 1 + len(rows)
+        
+        if shift and tail < len(offsets):
+            offsets[tail:] = array( str('l'), [ x + shift for x in offsets[tail:] ] )
+        
+        self._count_lengths(start, start + len(rows), 1)
+    
+    def _unshare(self):
+        
+        if self._shared:
+            self._values = list(self._values)
+            self._offsets = array( str('l'), self._offsets )
+            self._shared = False
+    
+    def pop(self):
+        row = self[-1].tolist()
+        self._splice(len(self) - 1, len(self), [])
+        return row
+    
+    def reverse(self):
+        rows = [ x for x in reversed(self) ]
+        self._splice(0, len(self), rows)
+    
+    def length_range(self):
+        
+        if not self._length_counts:
+            return (None, None)
+        
+        return ( min(self._length_counts), max(self._length_counts) )
+    
+    def row_lengths(self):
+        return RaggedLengths(self)
+
+class RaggedLengths(object):
+    """Class for viewing the row lengths of RaggedRows."""
+    
+    __slots__ = ('_rows',)
+    
+    def __init__(self, rows):
+        self._rows = rows
+    
+    def __eq__(self, other):
+        try:
+            return tuple(self) == tuple(other)
+        except TypeError:
+            return False
+    
+    def __getitem__(self, key):
+        
+        offsets = self._rows._offsets
+        
+        if isinstance(key, slice):
+            return tuple( offsets[r+1] - offsets[r] for r in 
+              range( *key.indices( len(self) ) ) )
+        
+        r = self._rows._adapt_index(key)
+        return offsets[r+1] - offsets[r]
+    
+    def __iter__(self):
+        offsets = self._rows._offsets
+        for r in range( len(offsets) - 1 ):
+            yield offsets[r+1] - offsets[r]
+    
+    def __len__(self):
+        return len(self._rows)
+    
+    def __ne__(self, other):
+        return not self == other
+
+class RaggedRow(object):
+    """Class for viewing a row of RaggedRows."""
+    
+    __slots__ = ('_rows', '_index')
+    
+    @property
+    def nom(self):
+        return self.__class__.__name__
+    
+    def __init__(self, rows, index):
+        self._rows = rows
+        self._index = index
+    
+    def __delitem__(self, key):
+        row = self.tolist()
+        del row[key]
+        self._rows._splice(self._index, self._index + 1, [ row ])
+    
+    def __eq__(self, other):
+        try:
+            return self.tolist() == list(other)
+        except TypeError:
+            return False
+    
+    def __getitem__(self, key):
+        
+        offsets = self._rows._offsets
+        first, last = offsets[self._index], offsets[self._index + 1]
+        
+        if isinstance(key, int_types):
+            
+            if key < first - last or key >= last - first:
+                raise IndexError("%s index (%d) out of range" % (self.nom, key) )
+            if key < 0:
+                key += last - first
+            return self._rows._values[first + key]
+            
+        else:
+            return self._rows._values[first:last][key]
+    
+    def __iter__(self):
+        return iter( self.tolist() )
+    
+    def __len__(self):
+        offsets = self._rows._offsets
+        return offsets[self._index + 1] - offsets[self._index]
+    
+    def __ne__(self, other):
+        return not self == other
+    
+    def __setitem__(self, key, value):
+        
+        if isinstance(key, int_types):
+            
+            offsets = self._rows._offsets
+            first, last = offsets[self._index], offsets[self._index + 1]
+            
+            if key < first - last or key >= last - first:
+                raise IndexError("%s index (%d) out of range" % (self.nom, key) )
+            if key < 0:
+                key += last - first
+            self._rows._unshare()
+            self._rows._values[first + key] = value
+            
+        else:
+            row = self.tolist()
+            row[key] = list(value)
+            self._rows._splice(self._index, self._index + 1, [ row ])
+    
+    def extend(self, values):
+        row = self.tolist()
+        row.extend(values)
+        self._rows._splice(self._index, self._index + 1, [ row ])
+    
+    def tolist(self):
+        offsets = self._rows._offsets
+        return self._rows._values[ offsets[self._index]:offsets[self._index + 1] ]
+
+class ColumnRows(object):
+    """Class for storing rows as one typed buffer per column of a schema."""
+    
+    __slots__ = ('_schema', '_columns', '_length', '_shared')
+    
+    # Number of rows assembled at a time when iterating.
+    block_size = 1024
+    
+    @classmethod
+    def _from_buffers(this, schema, columns, length):
+        obj = this.__new__(this)
+        obj._schema = schema
+        obj._columns = columns
+        obj._length = length
+        obj._shared = set()
+        return obj
+    
+    @classmethod
+    def _new_column(this, spec, values):
+        
+        if spec.data_type == 'category':
+            return CategoricalColumn(values)
+        
+        # Fall back to a list for integers too large for a typed buffer.
+        if spec.typecode is not None:
+            try:
+                if spec.nullable:
+                    return MaskedColumn(spec.typecode, values)
+                return array(spec.typecode, values)
+            except OverflowError:
+                pass
+        
+        return list(values)
+    
+    @property
+    def columns(self):
+        return tuple(self._columns)
+    
+    @property
+    def nom(self):
+        return self.__class__.__name__
+    
+    @property
+    def schema(self):
+        return self._schema
+    
+    def __init__(self, schema, rows=()):
+        
+        self._schema = schema
+        self._columns = [ self._new_column(spec, []) for spec in schema ]
+        self._length = 0
+        self._shared = set()
+        
+        self._splice(0, 0, rows)
+    
+    def __copy__(self):
+        
+        # Column buffers are shared with the copy until either side edits 
+        # them, one column at a time.
+        obj = self.__class__._from_buffers(self._schema, list(self._columns), 
+          self._length)
+        obj._shared = set( range( len(self._columns) ) )
+        self._shared = set(obj._shared)
+        return obj
+    
+    def __delitem__(self, key):
+        
+        if isinstance(key, int_types):
+            
+            r = self._adapt_index(key)
+            self._splice(r, r + 1, [])
+            
+        elif isinstance(key, slice):
+            
+            start, stop, step = key.indices( len(self) )
+            
+            if step == 1:
+                self._splice(start, max(start, stop), [])
+            else:
+                for r in sorted(range(start, stop, step), reverse=True):
+                    self._splice(r, r + 1, [])
+        else:
+            raise TypeError("invalid %s key (%s)" % (self.nom, repr(key) ) )
+    
+    def __eq__(self, other):
+        try:
+            return len(self) == len(other) and all( list(x) == list(y) 
+              for x, y in zip(self, other) )
+        except TypeError:
+            return False
+    
+    def __getitem__(self, key):
+        
+        if isinstance(key, int_types):
+            
+            return ColumnRow( self, self._adapt_index(key) )
+            
+        elif isinstance(key, slice):
+            
+            start, stop, step = key.indices( len(self) )
+            
+            if step == 1:
+                return self._get_rows(start, max(start, stop) )
+            
+            return [ self._get_rows(r, r + 1)[0] for r in range(start, stop, step) ]
+            
+        else:
+            raise TypeError("invalid %s key (%s)" % (self.nom, repr(key) ) )
+    
+    def __iter__(self):
+        for start in range(0, self._length, self.block_size):
+            for row in self._get_rows(start, min(start + self.block_size, 
+              self._length) ):
+                yield row
+    
+    def __len__(self):
+        return self._length
+    
+    def __ne__(self, other):
+        return not self == other
+    
+    def __reversed__(self):
+        for start in reversed( range(0, self._length, self.block_size) ):
+            for row in reversed( self._get_rows(start, min(start + 
+              self.block_size, self._length) ) ):
+                yield row
+    
+    def __setitem__(self, key, value):
+        
+        if isinstance(key, int_types):
+            
+            r = self._adapt_index(key)
+            self._splice(r, r + 1, [ value ])
+            
+        elif isinstance(key, slice):
+            
+            start, stop, step = key.indices( len(self) )
+            
+            if step == 1:
+                self._splice(start, max(start, stop), value)
+            else:
+                indices = range(start, stop, step)
+                if len(value) != len(indices):
+                    raise ValueError("cannot assign %d rows to extended slice "
+                      "of size %d" % ( len(value), len(indices) ) )
+                for r, row in zip(indices, value):
+                    self._splice(r, r + 1, [ row ])
+        else:
+            raise TypeError("invalid %s key (%s)" % (self.nom, repr(key) ) )
+    
+    def _adapt_index(self, index):
+        
+        length = len(self)
+        
+        if index < -length or index >= length:
+            raise IndexError("%s index (%d) out of range" % (self.nom, index) )
+        if index < 0:
+            index += length
+        return index
+    
+    def _get_column(self, c, start, stop):
+        
+        values = self._columns[c][start:stop]
+        
+        if isinstance(values, array):
+            values = values.tolist()
+        
+        # Booleans are kept as bytes in a typed buffer.
+        if self._schema[c].data_type == 'bool':
+            values = [ bool(x) if x is not None else None for x in values ]
+        
+        return values
+    
+    def _get_writable_column(self, c):
+        
+        if c in self._shared:
+            self._columns[c] = copy(self._columns[c])
+            self._shared.discard(c)
+        
+        return self._columns[c]
+    
+    def _get_rows(self, start, stop):
+        
+        if not self._columns:
+            return [ list() for _ in range(start, stop) ]
+        
+        return [ list(x) for x in zip( *[ self._get_column(c, start, stop) 
+          for c in range( len(self._columns) ) ] ) ]
+    
+    def _splice(self, start, stop, rows):
+        
+        width = len(self._schema)
+        
+        if any( isinstance(x, str_types) for x in rows ):
+            raise TypeError("%s row must be a sized non-string iterable" % self.nom)
+        
+        rows = [ list(x) for x in rows ]
+        
+        if any( len(x) != width for x in rows ):
+            raise ValueError("%s rows must have %d values" % (self.nom, width) )
+        
+        # Check every column before changing any of them.
+        columns = [ spec.adapt_values([ row[c] for row in rows ]) 
+          for c, spec in enumerate(self._schema) ]
+        
+        for c, values in enumerate(columns):
+            self._splice_column(c, start, stop, values)
+        
+        self._length += len(rows) - (stop - start)
+    
+    def _splice_column(self, c, start, stop, values):
+        
+        column = self._get_writable_column(c)
+        
+        if isinstance(column, (array, MaskedColumn) ):
+            try:
+                if isinstance(column, array):
+                    column[start:stop] = array(column.typecode, values)
+                else:
+                    column[start:stop] = values
+                return
+            except OverflowError:
+                column = self._columns[c] = list(column)
+        
+        column[start:stop] = values
+    
+    def count(self, col_index, value):
+        
+        column = self._columns[col_index]
+        
+        if isinstance(column, array) and not isinstance(value, (int_types, float) ):
+            return 0
+        
+        return column.count(value)
+    
+    def find(self, col_index, value):
+        
+        column = self._columns[col_index]
+        
+        if isinstance(column, (CategoricalColumn, MaskedColumn) ):
+            return column.find(value)
+        elif isinstance(column, array) and not isinstance(value, (int_types, float) ):
+            return list()
+        
+        return [ r for r, x in enumerate(column) if x == value ]
+    
+    def fill_nulls(self, col_index, value):
+        
+        column = self._columns[col_index]
+        value = self._schema[col_index].adapt_values([ value ])[0]
+        
+        if isinstance(column, (CategoricalColumn, MaskedColumn) ):
+            self._get_writable_column(col_index).fill(value)
+        elif not isinstance(column, array):
+            self._columns[col_index] = [ value if x is None else x for x in column ]
+            self._shared.discard(col_index)
+    
+    def get_valid(self, col_index):
+        
+        column = self._columns[col_index]
+        
+        if isinstance(column, (CategoricalColumn, MaskedColumn) ):
+            return column.get_valid()
+        elif isinstance(column, array):
+            return bytearray(b'\x01') * len(column)
+        
+        return bytearray( x is not None for x in column )
+    
+    def get_valid_values(self, col_index):
+        
+        column = self._columns[col_index]
+        
+        if isinstance(column, (CategoricalColumn, MaskedColumn) ):
+            values = column.get_valid_values()
+        elif isinstance(column, array):
+            values = column.tolist()
+        else:
+            values = [ x for x in column if x is not None ]
+        
+        if self._schema[col_index].data_type == 'bool':
+            values = [ bool(x) for x in values ]
+        
+        return values
+    
+    def get_value(self, row_index, col_index):
+        
+        value = self._columns[col_index][row_index]
+        
+        if self._schema[col_index].data_type == 'bool' and value is not None:
+            value = bool(value)
+        
+        return value
+    
+    def pop(self):
+        row = self._get_rows(self._length - 1, self._length)[0]
+        self._splice(self._length - 1, self._length, [])
+        return row
+    
+    def reverse(self):
+        for c in range( len(self._columns) ):
+            self._get_writable_column(c).reverse()
+    
+    def row_lengths(self):
+        return ( len(self._columns), ) * self._length
+    
+    def set_value(self, row_index, col_index, value):
+        
+        value = self._schema[col_index].adapt_values([ value ])
+        self._splice_column(col_index, row_index, row_index + 1, value)
+    
+    def take(self, indices):
+        
+        columns = list()
+        
+        for column in self._columns:
+            if isinstance(column, (CategoricalColumn, MaskedColumn) ):
+                columns.append( column.take(indices) )
+            elif isinstance(column, array):
+                columns.append( array(column.typecode, [ column[i] for i in indices ]) )
+            else:
+                columns.append([ column[i] for i in indices ])
+        
+        return self.__class__._from_buffers(self._schema, columns, len(indices) )
+    
+    def tolist(self):
+        return self._get_rows(0, self._length)
+
+class ColumnRow(object):
+    """Class for viewing a row of ColumnRows."""
+    
+    __slots__ = ('_rows', '_index')
+    
+    @property
+    def nom(self):
+        return self.__class__.__name__
+    
+    def __init__(self, rows, index):
+        self._rows = rows
+        self._index = index
+    
+    def __delitem__(self, key):
+        raise ValueError("%s cannot be resized" % self.nom)
+    
+    def __eq__(self, other):
+        try:
+            return self.tolist() == list(other)
+        except TypeError:
+            return False
+    
+    def __getitem__(self, key):
+        
+        if isinstance(key, int_types):
+            
+            width = len(self)
+            
+            if key < -width or key >= width:
+                raise IndexError("%s index (%d) out of range" % (self.nom, key) )
+            if key < 0:
+                key += width
+            return self._rows.get_value(self._index, key)
+            
+        else:
+            return self.tolist()[key]
+    
+    def __iter__(self):
+        return iter( self.tolist() )
+    
+    def __len__(self):
+        return len(self._rows._columns)
+    
+    def __ne__(self, other):
+        return not self == other
+    
+    def __setitem__(self, key, value):
+        
+        if isinstance(key, int_types):
+            
+            width = len(self)
+            
+            if key < -width or key >= width:
+                raise IndexError("%s index (%d) out of range" % (self.nom, key) )
+            if key < 0:
+                key += width
+            self._rows.set_value(self._index, key, value)
+            
+        else:
+            row = self.tolist()
+            row[key] = list(value)
+            if len(row) != len(self):
+                raise ValueError("%s cannot be resized" % self.nom)
+            self._rows._splice(self._index, self._index + 1, [ row ])
+    
+    def extend(self, values):
+        if len(values):
+            raise ValueError("%s cannot be resized" % self.nom)
+    
+    def tolist(self):
+        return self._rows._get_rows(self._index, self._index + 1)[0]
+
+class CategoricalColumn(object):
+    """Class for storing strings as integer codes into a list of categories."""
+    
+    __slots__ = ('_categories', '_codes', '_lookup')
+    
+    @classmethod
+    def _from_buffers(this, categories, codes):
+        obj = this.__new__(this)
+        obj._categories = categories
+        obj._codes = codes
+        obj._lookup = dict( (x, i) for i, x in enumerate(categories) )
+        return obj
+    
+    @property
+    def categories(self):
+        return tuple(self._categories)
+    
+    @property
+    def codes(self):
+        return self._codes
+    
+    @property
+    def nom(self):
+        return self.__class__.__name__
+    
+    def __init__(self, values=()):
+        
+        self._categories = list()
+        self._codes = array( str('l') )
+        self._lookup = dict()
+        
+        self[0:0] = values
+    
+    def __copy__(self):
+        return self.__class__._from_buffers(list(self._categories), 
+          self._codes[:])
+    
+    def __getitem__(self, key):
+        
+        categories = self._categories
+        
+        # Missing values have the code -1.
+        if isinstance(key, slice):
+            return [ categories[x] if x >= 0 else None for x in self._codes[key] ]
+        
+        code = self._codes[key]
+        return categories[code] if code >= 0 else None
+    
+    def __iter__(self):
+        return iter( self[:] )
+    
+    def __len__(self):
+        return len(self._codes)
+    
+    def __reduce_ex__(self, protocol):
+        return (_restore_categorical, (self._categories, 
+          _pack_values(self._codes, protocol) ) )
+    
+    def __setitem__(self, key, value):
+        
+        if isinstance(key, slice):
+            self._codes[key] = array( str('l'), [ self._encode(x) for x in value ] )
+        else:
+            self._codes[key] = self._encode(value)
+    
+    def _encode(self, value):
+        
+        if value is None:
+            return -1
+        
+        code = self._lookup.get(value)
+        
+        if code is None:
+            code = self._lookup[value] = len(self._categories)
+            self._categories.append(value)
+        
+        return code
+    
+    def _get_code(self, value):
+        return -1 if value is None else self._lookup.get(value)
+    
+    def count(self, value):
+        code = self._get_code(value)
+        return self._codes.count(code) if code is not None else 0
+    
+    def fill(self, value):
+        
+        code = self._encode(value)
+        codes = self._codes
+        
+        for r in [ r for r, x in enumerate(codes) if x < 0 ]:
+            codes[r] = code
+    
+    def find(self, value):
+        
+        code = self._get_code(value)
+        
+        if code is None:
+            return list()
+        
+        return [ r for r, x in enumerate(self._codes) if x == code ]
+    
+    def get_valid(self):
+        return bytearray( x >= 0 for x in self._codes )
+    
+    def get_valid_values(self):
+        categories = self._categories
+        return [ categories[x] for x in self._codes if x >= 0 ]
+    
+    def group(self):
+        
+        groups = dict()
+        
+        for r, code in enumerate(self._codes):
+            groups.setdefault(code, list()).append(r)
+        
+        categories = self._categories
+        
+        return [ (categories[code] if code >= 0 else None, rows) 
+          for code, rows in sorted( groups.items(), key=lambda x: x[1][0] ) ]
+    
+    def reverse(self):
+        self._codes.reverse()
+    
+    def take(self, indices):
+        codes = self._codes
+        return self.__class__._from_buffers(list(self._categories), 
+          array( str('l'), [ codes[i] for i in indices ] ) )
+
+class MaskedColumn(object):
+    """Class for storing numbers in a typed buffer with a validity map."""
+    
+    __slots__ = ('_values', '_valid')
+    
+    @classmethod
+    def _from_buffers(this, values, valid):
+        obj = this.__new__(this)
+        obj._values = values
+        obj._valid = valid
+        return obj
+    
+    @property
+    def nom(self):
+        return self.__class__.__name__
+    
+    @property
+    def null_count(self):
+        return self._valid.count(b'\x00')
+    
+    @property
+    def typecode(self):
+        return self._values.typecode
+    
+    @property
+    def values(self):
+        return self._values
+    
+    def __init__(self, typecode, values=()):
+        
+        # Missing values are zero in the buffer and zero in the validity map.
+        self._values = array(typecode)
+        self._valid = bytearray()
+        
+        self[0:0] = values
+    
+    def __copy__(self):
+        return self.__class__._from_buffers(self._values[:], 
+          bytearray(self._valid) )
+    
+    def __getitem__(self, key):
+        
+        if isinstance(key, slice):
+            return [ x if v else None for x, v in 
+              zip(self._values[key], self._valid[key]) ]
+        
+        return self._values[key] if self._valid[key] else None
+    
+    def __iter__(self):
+        return iter( self[:] )
+    
+    def __len__(self):
+        return len(self._values)
+    
+    def __reduce_ex__(self, protocol):
+        return (_restore_masked, (self._values.typecode, 
+          _pack_values(self._values, protocol), bytes(self._valid) ) )
+    
+    def __setitem__(self, key, value):
+        
+        if isinstance(key, slice):
+            values = array(self._values.typecode, [ 0 if x is None else x 
+              for x in value ])
+            valid = bytearray( x is not None for x in value )
+            self._values[key] = values
+            self._valid[key] = valid
+        else:
+            self._values[key] = 0 if value is None else value
+            self._valid[key] = value is not None
+    
+    def count(self, value):
+        
+        if value is None:
+            return self.null_count
+        elif not isinstance(value, (int_types, float) ):
+            return 0
+        elif not self.null_count:
+            return self._values.count(value)
+        
+        return self.get_valid_values().count(value)
+    
+    def fill(self, value):
+        
+        values = self._values
+        
+        for r in [ r for r, v in enumerate(self._valid) if not v ]:
+            values[r] = value
+        
+        self._valid = bytearray(b'\x01') * len(values)
+    
+    def find(self, value):
+        
+        if value is None:
+            return [ r for r, v in enumerate(self._valid) if not v ]
+        elif not isinstance(value, (int_types, float) ):
+            return list()
+        
+        return [ r for r, (x, v) in enumerate( zip(self._values, self._valid) ) 
+          if v and x == value ]
+    
+    def get_valid(self):
+        return bytearray(self._valid)
+    
+    def get_valid_values(self):
+        
+        if not self.null_count:
+            return self._values.tolist()
+        
+        return list( compress(self._values, self._valid) )
+    
+    def reverse(self):
+        self._values.reverse()
+        self._valid.reverse()
+    
+    def take(self, indices):
+        values, valid = self._values, self._valid
+        return self.__class__._from_buffers( array(values.typecode, 
+          [ values[i] for i in indices ]), bytearray( valid[i] for i in indices ) )
+
+class SparseLabels(object):
+    """Class for a fixed-length sequence of labels, storing only those set."""
+    
+    __slots__ = ('_length', '_labels')
+    
+    def __init__(self, length, labels=None):
+        self._length = length
+        self._labels = dict(labels) if labels is not None else dict()
+    
+    def __copy__(self):
+        return SparseLabels(self._length, self._labels)
+    
+    def __getitem__(self, key):
+        
+        if isinstance(key, slice):
+            return [ self._labels.get(i, '') for i in 
+              range( *key.indices(self._length) ) ]
+        
+        if key < 0:
+            key += self._length
+        if key < 0 or key >= self._length:
+            raise IndexError("label index out of range")
+        
+        return self._labels.get(key, '')
+    
+    def __iter__(self):
+        for i in range(self._length):
+            yield self._labels.get(i, '')
+    
+    def __len__(self):
+        return self._length
+    
+    def __reduce__(self):
+        return (SparseLabels, (self._length, self._labels) )
+    
+    def __reversed__(self):
+        for i in reversed( range(self._length) ):
+            yield self._labels.get(i, '')
+    
+    def __setitem__(self, index, label):
+        
+        if index < 0:
+            index += self._length
+        if index < 0 or index >= self._length:
+            raise IndexError("label index out of range")
+        
+        if label != '':
+            self._labels[index] = label
+        else:
+            self._labels.pop(index, None)
+    
+    def items(self):
+        return self._labels.items()
+
+class PackedLabels(object):
+    """Class for storing labels in one encoded buffer with an open hash index."""
+    
+    __slots__ = ('_data', '_offsets', '_slots', '_count')
+    
+    @classmethod
+    def _from_buffers(this, data, offsets):
+        obj = this.__new__(this)
+        obj._build_index(data, offsets)
+        return obj
+    
+    @property
+    def index(self):
+        return PackedLabelIndex(self)
+    
+    def __init__(self, labels=()):
+        
+        encoded = [ x.encode('utf-8') for x in labels ]
+        offsets = array( str('l'), [0] )
+        position = 0
+        
+        for x in encoded:
+            position += len(x)
+            offsets.append(position)
+        
+        self._build_index(b"".join(encoded), offsets)
+    
+    def __copy__(self):
+        return self
+    
+    def __getitem__(self, key):
+        
+        if isinstance(key, slice):
+            return [ self[i] for i in range( *key.indices( len(self) ) ) ]
+        
+        length = len(self._offsets) - 1
+        if key < 0:
+            key += length
+        if key < 0 or key >= length:
+            raise IndexError("label index out of range")
+        
+        return self._data[ self._offsets[key]:self._offsets[key + 1] ].decode('utf-8')
+    
+    def __iter__(self):
+        for i in range( len(self) ):
+            yield self[i]
+    
+    def __len__(self):
+        return len(self._offsets) - 1
+    
+    def __reduce__(self):
+        return (_restore_packed_labels, (self._data, 
+          _pack_values(self._offsets) ) )
+    
+    def __reversed__(self):
+        for i in reversed( range( len(self) ) ):
+            yield self[i]
+    
+    def _build_index(self, data, offsets):
+        
+        nlabels = len(offsets) - 1
+        capacity = 8
+        while capacity < 2 * nlabels:
+            capacity *= 2
+        mask = capacity - 1
+        
+        # Index each label by the hash of its encoding, probing linearly.
+        slots = array( str('l'), [-1] ) * capacity
+        count = 0
+        
+        for i in range(nlabels):
+            
+            key = data[ offsets[i]:offsets[i + 1] ]
+            
+            if not key:
+                continue
+            
+            h = hash(key) & mask
+            
+            while slots[h] != -1:
+                j = slots[h]
+                if data[ offsets[j]:offsets[j + 1] ] == key:
+                    raise ValueError("TableLabels cannot contain duplicate labels")
+                h = (h + 1) & mask
+            
+            slots[h] = i
+            count += 1
+        
+        self._data = data
+        self._offsets = offsets
+        self._slots = slots
+        self._count = count
+    
+    def find(self, label):
+        
+        key = label.encode('utf-8')
+        
+        if not key:
+            return None
+        
+        data, offsets, slots = self._data, self._offsets, self._slots
+        mask = len(slots) - 1
+        h = hash(key) & mask
+        
+        while slots[h] != -1:
+            j = slots[h]
+            if data[ offsets[j]:offsets[j + 1] ] == key:
+                return j
+            h = (h + 1) & mask
+        
+        return None
+
+class PackedLabelIndex(object):
+    """Class for looking up the index of packed labels by label."""
+    
+    __slots__ = ('_labels',)
+    
+    def __init__(self, labels):
+        self._labels = labels
+    
+    def __contains__(self, label):
+        return isinstance(label, str_types) and self._labels.find(label) is not None
+    
+    def __getitem__(self, label):
+        
+        index = self._labels.find(label) if isinstance(label, str_types) else None
+        
+        if index is None:
+            raise KeyError(label)
+        
+        return index
+    
+    def __len__(self):
+        return self._labels._count
+    
+    def get(self, label, default=None):
+        try:
+            return self[label]
+        except KeyError:
+            return default
 
 ################################################################################
\ No newline at end of file
@@ -0,0 +1,151 @@
+#!/usr/bin/python -tt
+# -*- coding: utf-8 -*-
+"""Stand-in for codeml, with helpers for setting up jobs that run it.
+
+Run as a script, it reads the control file given as its only argument and
+acts on these settings besides those of codeml itself: sleep (seconds to
+wait before writing the output), fail (exit with an error), burn (use CPU
+time forever), oom (report that memory ran out), progress (write the
+optimization to the rub file, and stall or diverge), screen (also or only
+write the optimization to the screen, as 'also' or 'only'), lnL (the
+log-likelihood to report) and output (leave the output file missing or
+truncated). Multiple starts get an lnL and a run time that
+depend on the initial omega.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from io import open
+import os
+import stat
+import sys
+import time
+
+# Run time and lnL of multiple starts, by initial omega.
+start_results = { '0.2': (0.1, -1000.0004), '1.0': (0.2, -1000.0001),
+  '3.0': (0.3, -1010.0), '10.0': (5.0, -999.0) }
+
+def make_executable(dirpath):
+    """Write a codeml executable that runs this stub in a directory."""
+
+    filepath = os.path.join(dirpath, "codeml")
+    script = os.path.splitext( os.path.abspath(__file__) )[0] + ".py"
+
+    with open(filepath, mode='w', encoding='utf-8') as handle:
+        handle.write("#!/bin/sh\nexec '%s' '%s' \"$@\"\n" % (sys.executable,
+          script) )
+
+    os.chmod(filepath, os.stat(filepath).st_mode | stat.S_IXUSR)
+
+    return filepath
+
+def make_job(dirpath, name, executable, settings=None, ntaxa=4, ncodons=100):
+    """Set up a codeml job with an alignment and tree in its own directory."""
+
+    from pyselection.codeml import CodemlJob
+    from pyselection.codeml import write_control_file
+
+    workdir = os.path.join(dirpath, name)
+    os.makedirs(workdir)
+
+    with open(os.path.join(workdir, "aln.phy"), mode='w', encoding='utf-8') as handle:
+        handle.write("  %d  %d\n" % (ntaxa, ncodons * 3) )
+        for i in range(ntaxa):
+            handle.write("seq%d  %s\n" % (i + 1, "ATG" * ncodons) )
+
+    with open(os.path.join(dirpath, "tree.nwk"), mode='w', encoding='utf-8') as handle:
+        handle.write("(%s);\n" % ",".join( "seq%d" % (i + 1) for i in range(ntaxa) ))
+
+    control = { 'seqfile': "aln.phy", 'treefile': "../tree.nwk",
+      'outfile': "mlc", 'model': "0", 'NSsites': "0" }
+    if settings is not None:
+        control.update( (key, "%s" % value) for key, value in settings.items() )
+
+    control_file = os.path.join(workdir, "codeml.ctl")
+    write_control_file(control_file, control)
+
+    return CodemlJob(name, control_file, executable=executable)
+
+def _write_progress(settings):
+
+    screen = settings.get('screen')
+
+    def write(line, mode='a'):
+        if screen != 'only':
+            with open("rub", mode=mode, encoding='utf-8') as handle:
+                handle.write(line)
+        if screen is not None:
+            sys.stdout.write(line)
+            sys.stdout.flush()
+
+    write("Initial: fx=  1884.523891\n", mode='w')
+
+    if settings.get('progress') == 'stall':
+        time.sleep(30)
+
+    value = 1880
+    for i in range(5):
+        value += 100 if settings.get('progress') == 'diverge' else -10
+        write("   %d h-m-p  0.0000 0.0002 256.0123 ++     %d.5  m "
+          "0.0002    13 | 0/11\n" % (i + 1, value) )
+        time.sleep(0.1)
+
+def main(control_file):
+
+    settings = dict()
+
+    with open(control_file, mode='r', encoding='utf-8') as handle:
+        for line in handle:
+            line = line.split('*', 1)[0].strip()
+            if '=' in line:
+                key, value = [ x.strip() for x in line.split('=', 1) ]
+                settings[key] = value
+
+    if settings.get('burn') == '1':
+        while True:
+            pass
+
+    if settings.get('oom') == '1':
+        print("Error: out of memory")
+        return 1
+
+    lnl = float( settings.get('lnL', -1234.5) )
+    delay = float( settings.get('sleep', 0) )
+
+    if 'omega' in settings and settings.get('starts') == '1':
+        delay, lnl = start_results[ settings['omega'] ]
+
+    if 'progress' in settings:
+        _write_progress(settings)
+
+    time.sleep(delay)
+
+    if settings.get('fail') == '1':
+        return 3
+
+    ndata = int( settings.get('ndata', 1) )
+    lines = [ "CODONML (in paml version 4.9)\n" ]
+
+    for i in range(ndata):
+        if ndata > 1:
+            lines.append("\n\nData set %d\n" % (i + 1) )
+        lines.append("lnL(ntime:  7  np:  9):  %.6f      +0.000000\n" % (lnl - i) )
+        lines.append("kappa (ts/tv) =  2.50000\n\nomega (dN/dS) =  0.%d0000\n" %
+          (i + 1) )
+
+    if settings.get('output') == 'truncated':
+        lines = lines[:1]
+
+    if settings.get('output') != 'missing':
+        with open(settings.get('outfile', 'mlc'), mode='w', encoding='utf-8') as handle:
+            handle.writelines(lines)
+
+    print("done")
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit( main(sys.argv[1]) )
@@ -0,0 +1,462 @@
+#!/usr/bin/python -tt
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import os
+import shutil
+import signal
+import tempfile
+import unittest
+
+from pyselection.batch import _pack_name
+from pyselection.batch import BatchJournal
+from pyselection.batch import BatchRunner
+from pyselection.batch import ProgressMonitor
+from pyselection.batch import ResourceLimits
+from pyselection.batch import RuntimeHistory
+from pyselection.batch import estimate_cost
+from pyselection.batch import pack_jobs
+from pyselection.batch import telemetry_schema
+from pyselection.codeml import CodemlJob
+from pyselection.codeml import PackedJob
+from pyselection.codeml import read_results
+from pyselection.codeml import write_control_file
+from pyselection.pio import TextPIO
+from pyselection.test.stub import make_executable
+from pyselection.test.stub import make_job
+
+class BatchTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.executable = make_executable(self.tmpdir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def make_job(self, name, settings=None, **kwargs):
+        return make_job(self.tmpdir, name, self.executable, settings=settings,
+          **kwargs)
+
+class TestBatchJournal(BatchTestCase):
+
+    def test_resume_skips_completed_jobs(self):
+
+        jobs = [ self.make_job('g1'), self.make_job('g2', {'fail': 1}),
+          self.make_job('g3') ]
+        journal = os.path.join(self.tmpdir, "journal.log")
+
+        results = BatchRunner(jobs, workers=2, journal=journal,
+          poll_interval=0.01).run()
+
+        self.assertEqual(results.row_labels.tolist(), ['g1', 'g2', 'g3'])
+        self.assertEqual([ x[0] for x in results.tolist() ],
+          ['success', 'crash', 'success'])
+        self.assertEqual(sorted( BatchJournal(journal).completed() ), ['g1', 'g3'])
+
+        # Once fixed, only the failed job runs again.
+        jobs[1].settings['fail'] = '0'
+        write_control_file(jobs[1].control_file, jobs[1].settings)
+
+        results = BatchRunner(jobs, workers=2, journal=journal,
+          poll_interval=0.01).run()
+
+        self.assertEqual([ x[0] for x in results.tolist() ],
+          ['skipped', 'success', 'skipped'])
+        self.assertEqual(results[0, 2], jobs[0].output_file)
+
+    def test_missing_output_is_not_completed(self):
+
+        job = self.make_job('g1')
+        journal = BatchJournal( os.path.join(self.tmpdir, "journal.log") )
+
+        BatchRunner([job], journal=journal, poll_interval=0.01).run()
+        os.remove(job.output_file)
+
+        self.assertEqual(journal.completed(), dict() )
+        results = BatchRunner([job], journal=journal, poll_interval=0.01).run()
+        self.assertEqual(results[0, 0], 'success')
+
+    def test_incomplete_records_are_skipped(self):
+
+        journal = BatchJournal( os.path.join(self.tmpdir, "journal.log") )
+        journal.record('completed', 'g1', journal.file)
+        with open(journal.file, 'a') as handle:
+            handle.write("1.000\tcompleted\tg2")
+
+        self.assertEqual(journal.load(), { 'g1': ('completed', journal.file) })
+        with self.assertRaises(ValueError):
+            journal.record('started', 'g1')
+
+class TestScheduling(BatchTestCase):
+
+    def submitted(self, journal):
+        records = [ x.split('\t') for x in TextPIO(journal).load() ]
+        return [ x[2] for x in records if x[1] == 'submitted' ]
+
+    def test_longest_jobs_first(self):
+
+        jobs = [ self.make_job('small', ncodons=100),
+          self.make_job('large', {'model': 2, 'NSsites': 2}, ncodons=300),
+          self.make_job('medium', {'NSsites': 8}, ncodons=200) ]
+        journal = os.path.join(self.tmpdir, "journal.log")
+
+        self.assertEqual(estimate_cost(jobs[0]), 4 * 100 * 1.0)
+        self.assertEqual(estimate_cost(jobs[1]), 4 * 300 * 12.0)
+
+        BatchRunner(jobs, journal=journal, poll_interval=0.01).run()
+
+        self.assertEqual(self.submitted(journal), ['large', 'medium', 'small'])
+
+    def test_history_orders_by_recorded_times(self):
+
+        jobs = [ self.make_job('m0', ncodons=100),
+          self.make_job('m8', {'NSsites': 8}, ncodons=100) ]
+        history = RuntimeHistory( os.path.join(self.tmpdir, "history.tsv") )
+        history.add(jobs[0], 50.0)
+        history.add(jobs[1], 1.0)
+        history.save()
+
+        # The recorded times of each model outweigh the rough costs.
+        history = RuntimeHistory(history.file)
+        self.assertEqual(history.estimate(jobs[0]), 50.0)
+        self.assertEqual(history.estimate(jobs[1]), 1.0)
+
+        journal = os.path.join(self.tmpdir, "journal.log")
+        BatchRunner(jobs, journal=journal, history=history.file,
+          poll_interval=0.01).run()
+
+        self.assertEqual(self.submitted(journal), ['m0', 'm8'])
+        self.assertEqual(len( RuntimeHistory(history.file).table ), 4)
+
+class TestPacking(BatchTestCase):
+
+    def make_jobs(self):
+        jobs = [ self.make_job('g%d' % i, ncodons=10) for i in range(3) ]
+        return jobs + [ self.make_job('large', ncodons=1000) ]
+
+    def test_pack_names_follow_members(self):
+
+        jobs = self.make_jobs()
+        packed = pack_jobs(jobs, budget=200, workdir=self.tmpdir)
+
+        self.assertEqual([ x.name for x in packed ][0], 'large')
+        self.assertIsInstance(packed[1], PackedJob)
+        self.assertEqual([ x.name for x in packed[1].members ], ['g0', 'g1', 'g2'])
+
+        again = pack_jobs(reversed(jobs), budget=200,
+          workdir=os.path.join(self.tmpdir, "again") )
+        self.assertEqual(again[1].name, packed[1].name)
+
+        other = pack_jobs(jobs[:2], budget=200, workdir=self.tmpdir)
+        self.assertNotEqual(other[0].name, packed[1].name)
+
+    def test_members_get_results(self):
+
+        jobs = self.make_jobs()
+        packed = pack_jobs(jobs, budget=200, workdir=self.tmpdir)
+        journal = BatchJournal( os.path.join(self.tmpdir, "journal.log") )
+
+        results = BatchRunner(packed, journal=journal, poll_interval=0.01).run()
+
+        self.assertEqual(results.row_labels.tolist(), ['large', packed[1].name,
+          'g0', 'g1', 'g2'])
+        self.assertEqual(results[3].tolist(), ['success', 0, jobs[1].output_file])
+        self.assertEqual(sorted( journal.completed() ), sorted( results.row_labels ))
+        self.assertEqual([ x[0] for x in read_results(jobs).tolist() ],
+          [-1234.5, -1235.5, -1236.5, -1234.5])
+
+    def test_resume_by_member(self):
+
+        jobs = self.make_jobs()
+        packed = pack_jobs(jobs, budget=200, workdir=self.tmpdir)
+        journal = BatchJournal( os.path.join(self.tmpdir, "journal.log") )
+        BatchRunner(packed, journal=journal, poll_interval=0.01).run()
+
+        # A data set whose output went missing runs again on its own.
+        os.remove(jobs[1].output_file)
+        results = BatchRunner(packed, journal=journal, poll_interval=0.01).run()
+
+        self.assertEqual([ x[0] for x in results.tolist() ],
+          ['skipped', 'success', 'skipped', 'success', 'skipped'])
+        self.assertEqual(results[1, 2], jobs[1].output_file)
+        self.assertTrue( os.path.isfile(jobs[1].output_file) )
+
+        # Several run again as a new packed job.
+        os.remove(jobs[0].output_file)
+        os.remove(jobs[2].output_file)
+        results = BatchRunner(packed, journal=journal, poll_interval=0.01).run()
+
+        repacked = _pack_name([ jobs[0], jobs[2] ])
+        self.assertEqual([ x[0] for x in results.tolist() ],
+          ['skipped', 'success', 'success', 'skipped', 'success'])
+        self.assertEqual(results[1, 2], os.path.join(self.tmpdir, repacked, "mlc"))
+        self.assertEqual(sorted( journal.completed() ), sorted([ repacked ] +
+          results.row_labels.tolist() ) )
+
+        results = BatchRunner(packed, journal=journal, poll_interval=0.01).run()
+        self.assertEqual([ x[0] for x in results.tolist() ], ['skipped'] * 5)
+
+class TestMultistart(BatchTestCase):
+
+    def test_stops_once_starts_agree(self):
+
+        job = self.make_job('g1', {'model': 2, 'NSsites': 2, 'omega': 0.5,
+          'starts': 1})
+        runner = BatchRunner([], workers=4, poll_interval=0.01)
+
+        results = runner.run_multistart(job, agreement=2)
+
+        self.assertEqual(results.row_labels.tolist(), [ 'g1-start%d' % i
+          for i in range(1, 5) ])
+        self.assertEqual([ x[0] for x in results.tolist() ],
+          ['success', 'success', 'cancelled', 'cancelled'])
+        self.assertEqual(results[1, 1], -1000.0001)
+        self.assertEqual([ x[-1] for x in results.tolist() ],
+          [False, True, False, False])
+        self.assertEqual(read_results([ job ])[0, 0], -1000.0001)
+
+        # Each start begins from its own initial values.
+        start = CodemlJob('start', os.path.join(job.workdir, "starts",
+          "start3", "codeml.ctl") )
+        self.assertEqual( (start.settings['omega'], start.settings['kappa']),
+          ('3.0', '4.0') )
+
+    def test_runs_all_starts_without_agreement(self):
+
+        job = self.make_job('g1', {'omega': 0.5, 'starts': 1})
+        runner = BatchRunner([], workers=2, poll_interval=0.01)
+
+        results = runner.run_multistart(job, starts=[ {'omega': 0.2},
+          {'omega': 3.0} ], agreement=2)
+
+        self.assertEqual([ x[0] for x in results.tolist() ], ['success'] * 2)
+        self.assertEqual([ x[-1] for x in results.tolist() ], [True, False])
+
+    def test_incomplete_output_fails_start(self):
+
+        job = self.make_job('g1', {'omega': 0.5, 'starts': 1})
+        runner = BatchRunner([], workers=3, poll_interval=0.01)
+
+        results = runner.run_multistart(job, starts=[ {'omega': 0.2,
+          'output': 'missing'}, {'omega': 1.0, 'output': 'truncated'},
+          {'omega': 3.0} ], agreement=2)
+
+        self.assertEqual([ x[0] for x in results.tolist() ],
+          ['failed', 'failed', 'success'])
+        self.assertEqual([ x[-1] for x in results.tolist() ], [False, False, True])
+        self.assertEqual(results[2, 1], -1010.0)
+
+class TestResourceLimits(BatchTestCase):
+
+    def run_job(self, name, settings, limits):
+
+        job = self.make_job(name, settings)
+        runner = BatchRunner([ job ], limits=limits, poll_interval=0.01)
+
+        return runner.run()[0].tolist()
+
+    def test_cpu_time_limit(self):
+
+        status, returncode, _ = self.run_job('g1', {'burn': 1},
+          ResourceLimits(cpu_time=1) )
+
+        self.assertEqual( (status, returncode), ('timeout', -signal.SIGXCPU) )
+
+    def test_wall_time_limit(self):
+
+        status, returncode, _ = self.run_job('g1', {'sleep': 30},
+          ResourceLimits(wall_time=0.2) )
+
+        self.assertEqual( (status, returncode), ('timeout', -signal.SIGTERM) )
+
+    def test_memory_limit(self):
+
+        limits = ResourceLimits(memory=2 * 1024 ** 3)
+
+        self.assertEqual(self.run_job('g1', {'oom': 1}, limits)[:2], ['memory', 1])
+        self.assertEqual(self.run_job('g2', {'fail': 1}, limits)[:2], ['crash', 3])
+
+    def test_classify(self):
+
+        log_file = os.path.join(self.tmpdir, "codeml.log")
+        with open(log_file, 'w') as handle:
+            handle.write("Segmentation fault\n")
+
+        class Usage(object):
+            ru_maxrss = 1024 ** 2
+
+        limits = ResourceLimits(cpu_time=10, memory=1024 ** 3)
+
+        # Signals that other causes can send are crashes.
+        for returncode in (-signal.SIGKILL, -signal.SIGSEGV, -signal.SIGABRT):
+            self.assertEqual(limits.classify(returncode, log_file), 'crash')
+
+        self.assertEqual(limits.classify(-signal.SIGKILL, log_file, Usage() ),
+          'memory')
+        self.assertEqual(ResourceLimits(cpu_time=10).classify(-signal.SIGXCPU,
+          log_file), 'timeout')
+
+    def test_multistart_wall_time_limit(self):
+
+        job = self.make_job('g1', {'omega': 0.5, 'starts': 1})
+        runner = BatchRunner([], workers=2, limits=ResourceLimits(wall_time=1),
+          poll_interval=0.01)
+
+        results = runner.run_multistart(job, starts=[ {'omega': 0.2},
+          {'omega': 10.0} ], agreement=2)
+
+        self.assertEqual([ x[0] for x in results.tolist() ], ['success', 'timeout'])
+        self.assertEqual(sorted( x[2:4] for x in runner.telemetry.tolist() ),
+          [ ['success', 0], ['timeout', -signal.SIGTERM] ])
+
+class TestProgressMonitor(BatchTestCase):
+
+    def test_stops_stalled_and_diverged_runs(self):
+
+        jobs = [ self.make_job('ok', {'progress': 'converge'}),
+          self.make_job('stall', {'progress': 'stall'}),
+          self.make_job('div', {'progress': 'diverge'}) ]
+        seen = list()
+        monitor = ProgressMonitor(callback=lambda job, i, value:
+          seen.append( (job.name, i, value) ), stall_time=1.0, divergence=150)
+
+        # Anything left by an earlier run is not read.
+        with open(jobs[0].rub_file, 'w') as handle:
+            handle.write("Initial: fx=  5.0\n")
+
+        results = BatchRunner(jobs, workers=3, monitor=monitor,
+          poll_interval=0.05).run()
+
+        self.assertEqual([ x[0] for x in results.tolist() ],
+          ['success', 'stalled', 'diverged'])
+        self.assertEqual([ x[1:] for x in seen if x[0] == 'ok' ], [ (0, 1884.523891),
+          (1, 1870.5), (2, 1860.5), (3, 1850.5), (4, 1840.5), (5, 1830.5) ])
+        self.assertEqual(seen.count( ('stall', 0, 1884.523891) ), 1)
+        self.assertEqual(monitor.jobs, [])
+
+    def test_rub_files_are_not_shared(self):
+
+        job = self.make_job('g1')
+        other = job.derive('g2', job.workdir)
+        monitor = ProgressMonitor()
+
+        with self.assertRaises(ValueError):
+            BatchRunner([ job, other ], workers=2, monitor=monitor)
+
+        monitor.add(job)
+        with self.assertRaises(ValueError):
+            monitor.add(other)
+
+    def test_multistart_is_monitored(self):
+
+        job = self.make_job('g1', {'omega': 0.5, 'starts': 1})
+        monitor = ProgressMonitor(stall_time=0.5)
+        runner = BatchRunner([], workers=2, monitor=monitor, poll_interval=0.05)
+
+        results = runner.run_multistart(job, starts=[ {'omega': 0.2,
+          'progress': 'stall'}, {'omega': 1.0} ], agreement=2)
+
+        self.assertEqual(results.tolist(), [
+          ['stalled', None, None, None, None, False],
+          ['success', -1000.0001, 9, 2.5, 0.1, True] ])
+        self.assertEqual(sorted( x[2] for x in runner.telemetry.tolist() ),
+          ['stalled', 'success'])
+
+    def test_screen_output(self):
+
+        jobs = [ self.make_job('both', {'progress': 'converge', 'screen': 'also'}),
+          self.make_job('screen', {'progress': 'converge', 'screen': 'only'}) ]
+        seen = list()
+        monitor = ProgressMonitor(callback=lambda job, i, value:
+          seen.append( (job.name, i) ) )
+
+        results = BatchRunner(jobs, workers=2, monitor=monitor,
+          poll_interval=0.05).run()
+
+        self.assertEqual([ x[0] for x in results.tolist() ], ['success'] * 2)
+        self.assertFalse( os.path.isfile(jobs[1].rub_file) )
+
+        # Iterations written to both the rub file and the screen count once.
+        for name in ('both', 'screen'):
+            self.assertEqual([ i for x, i in seen if x == name ], list(range(6)) )
+
+class TestTelemetry(BatchTestCase):
+
+    def test_rows_per_run(self):
+
+        jobs = [ self.make_job('g1', {'fail': 1}), self.make_job('g2') ]
+        runner = BatchRunner(jobs, retries=1, retry_settings={'fail': 0},
+          poll_interval=0.01)
+
+        runner.run()
+        runner.run()
+
+        telemetry = runner.telemetry
+        rows = sorted( x[:4] for x in telemetry.tolist() )
+
+        self.assertEqual(rows, [ ['g1', 0, 'crash', 3], ['g1', 0, 'crash', 3],
+          ['g1-retry1', 1, 'success', 0], ['g1-retry1', 1, 'success', 0],
+          ['g2', 0, 'success', 0], ['g2', 0, 'success', 0] ])
+        self.assertEqual(telemetry.schema, telemetry_schema)
+        self.assertEqual(telemetry.schema.names[-1], 'max_rss_bytes')
+        self.assertEqual(len( telemetry[0] ), len(telemetry_schema) )
+        self.assertEqual(telemetry[0].tolist()[4:8], [ self.executable,
+          'M0', 4, 100 ])
+
+        # A Python process holds at least a megabyte, whatever the platform.
+        self.assertTrue( all( x[-1] > 1024 * 1024 for x in telemetry.tolist() ) )
+        self.assertTrue( all( isinstance(x[-3], float) for x in telemetry.tolist() ) )
+
+class TestInterruption(BatchTestCase):
+
+    class Runner(BatchRunner):
+
+        def _start(self, job):
+            process = super(TestInterruption.Runner, self)._start(job)
+            self.processes.append(process)
+            return process
+
+    def interrupt(self, job, iteration, value):
+        raise KeyboardInterrupt()
+
+    def make_runner(self, jobs, **kwargs):
+        runner = self.Runner(jobs, poll_interval=0.01, **kwargs)
+        runner.processes = list()
+        return runner
+
+    def test_run(self):
+
+        jobs = [ self.make_job('g1', {'sleep': 30}), self.make_job('g2',
+          {'progress': 'converge', 'sleep': 30}) ]
+        history = os.path.join(self.tmpdir, "history.tsv")
+        runner = self.make_runner(jobs, workers=2, history=history,
+          monitor=ProgressMonitor(callback=self.interrupt) )
+
+        with self.assertRaises(KeyboardInterrupt):
+            runner.run()
+
+        self.assertEqual(len(runner.processes), 2)
+        self.assertTrue( all( x.returncode is not None for x in runner.processes ) )
+        self.assertEqual(runner.monitor.jobs, [])
+        self.assertTrue( os.path.isfile(history) )
+
+    def test_run_multistart(self):
+
+        job = self.make_job('g1', {'omega': 0.5, 'starts': 1})
+        runner = self.make_runner([], workers=2,
+          monitor=ProgressMonitor(callback=self.interrupt) )
+
+        with self.assertRaises(KeyboardInterrupt):
+            runner.run_multistart(job, starts=[ {'omega': 10.0},
+              {'omega': 10.0, 'progress': 'converge'} ])
+
+        self.assertEqual(len(runner.processes), 2)
+        self.assertTrue( all( x.returncode is not None for x in runner.processes ) )
+
+if __name__ == '__main__':
+    unittest.main()
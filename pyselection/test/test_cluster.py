@@ -0,0 +1,139 @@
+#!/usr/bin/python -tt
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import hashlib
+import hmac
+import multiprocessing
+import pickle
+import shutil
+import socket
+import tempfile
+import unittest
+
+from pyselection.cluster import _decode
+from pyselection.cluster import _decode_table
+from pyselection.cluster import _encode
+from pyselection.cluster import _encode_table
+from pyselection.cluster import _recv_message
+from pyselection.cluster import header
+from pyselection.cluster import Coordinator
+from pyselection.cluster import ProtocolError
+from pyselection.cluster import Worker
+from pyselection.codeml import read_results
+from pyselection.table import BaseTable
+from pyselection.table import TableLabels
+from pyselection.test.stub import make_executable
+from pyselection.test.stub import make_job
+
+authkey = b"secret"
+
+def _run_worker(address, key):
+    Worker(address, key, heartbeat=0.2, poll_interval=0.02).run()
+
+def _lose_job(address, key):
+    """Take a job and go away without running it."""
+    sock = socket.create_connection(address)
+    sock.sendall( _encode({ 'type': 'request' }, key) )
+    _recv_message(sock, key)
+    sock.close()
+
+class TestMessages(unittest.TestCase):
+
+    def test_round_trip(self):
+
+        message = { 'type': 'job', 'name': 'g1', 'control_file': '/a/codeml.ctl' }
+        data = _encode(message, authkey)
+
+        self.assertEqual(header.unpack( data[:header.size] )[0],
+          len(data) - header.size)
+        self.assertEqual(_decode(data[header.size:], authkey), message)
+
+    def test_messages_are_authenticated(self):
+
+        payload = _encode({ 'type': 'request' }, authkey)[header.size:]
+
+        with self.assertRaisesRegexp(ProtocolError, "authentication"):
+            _decode(payload, b"wrong")
+        with self.assertRaisesRegexp(ProtocolError, "authentication"):
+            _decode(payload[:-2] + b"0}", authkey)
+
+        with self.assertRaises(ValueError):
+            Coordinator([], None)
+        with self.assertRaises(ValueError):
+            Worker(('127.0.0.1', 1), b"")
+
+    def test_pickles_are_not_loaded(self):
+
+        payload = pickle.dumps({ 'type': 'request' }, 2)
+        payload = hmac.new(authkey, payload, hashlib.sha256).digest() + payload
+
+        with self.assertRaisesRegexp(ProtocolError, "could not be decoded"):
+            _decode(payload, authkey)
+
+    def test_table_round_trip(self):
+
+        table = BaseTable([ [-1234.5, 9, 2.5, None], [-1.0, 2**40, 0.5, 0.1] ])
+        table.row_labels = TableLabels(['g1', 'g2'])
+        data = _decode(_encode({ 'type': 'result', 'table':
+          _encode_table(table) }, authkey)[header.size:], authkey)
+
+        other = _decode_table(data['table'])
+        self.assertEqual(other.tolist(), table.tolist() )
+        self.assertEqual(other.row_labels.tolist(), ['g1', 'g2'])
+        self.assertEqual(other.data_types, table.data_types)
+        self.assertIs(type(other[1, 1]), type(2**40) )
+        self.assertEqual(data['table']['columns'][1][:3], ['int', 8, 'little'])
+
+        data['table']['row_lengths'][0] = 5
+        with self.assertRaises(ProtocolError):
+            _decode_table(data['table'])
+
+class TestCluster(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.executable = make_executable(self.tmpdir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_workers_run_all_jobs(self):
+
+        jobs = [ make_job(self.tmpdir, 'g%d' % i, self.executable,
+          {'sleep': 0.1, 'lnL': -1000.0 - i, 'fail': int(i == 5)})
+          for i in range(8) ]
+        coordinator = Coordinator(jobs, authkey, lease_time=5.0, max_leases=3)
+        address = coordinator.address
+
+        # One peer takes a job and is lost, another has the wrong key.
+        processes = [ multiprocessing.Process(target=_lose_job,
+          args=(address, authkey) ), multiprocessing.Process(target=_run_worker,
+          args=(address, b"wrong") ) ] + [ multiprocessing.Process(
+          target=_run_worker, args=(address, authkey) ) for _ in range(3) ]
+
+        for process in processes:
+            process.start()
+
+        try:
+            results = coordinator.serve(timeout=30, poll_interval=0.05)
+        finally:
+            coordinator.close()
+            for process in processes:
+                process.join(10)
+
+        self.assertEqual(results.row_labels.tolist(), [ x.name for x in jobs ])
+        self.assertEqual([ x[0] for x in results.tolist() ],
+          ['success'] * 5 + ['failed'] + ['success'] * 2)
+        self.assertEqual(results[0].tolist(), ['success', 0, -1000.0, 9, 2.5, 0.1])
+        self.assertEqual(results[5, 1], 3)
+        self.assertEqual(sum( coordinator._attempts.values() ), len(jobs) + 1)
+        self.assertEqual([ x.exitcode for x in processes ], [0] * 5)
+        self.assertEqual(read_results(jobs[7:])[0, 0], -1007.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+#!/usr/bin/python -tt
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from io import open
+import os
+import shutil
+import tempfile
+import unittest
+
+from pyselection.codeml import iter_rst
+
+rst_text = """Supplemental results for CODEML (seqf: seq.txt  treef: tree.txt)
+
+Model 2: PositiveSelection
+
+Naive Empirical Bayes (NEB) probabilities for 3 classes & postmean_w
+(amino acids refer to 1st sequence: human)
+
+   1 M   0.99997 0.00003 0.00000 ( 1)  0.096
+   2 A   0.1 0.2 0.7 ( 3)  2.5
+   3 K   0.1 0.8 0.1 ( 2)  0.9
+
+Positively selected sites
+
+Bayes Empirical Bayes (BEB) probabilities for 3 classes (class) & postmean_w
+(amino acids refer to 1st sequence: human)
+
+   1 M   0.95370 0.04571 0.00059 ( 1)  0.149 +-  0.213
+   2 A   0.1 0.2 0.7 ( 3)  2.1 +-  0.5
+   3 K   0.1 0.8 0.1 ( 2)  0.9 +-  0.1
+
+Prob of best state at each node, listed by site
+
+ site   Freq   Data:
+
+    1      1   ATG ATG ATG (M M M): ATG 1.000 (M 1.000) ATG 0.998 (M 0.999)
+    2      1   GCA GCC GCA (A A A): GCA 0.900 (A 1.000) GCC 0.700 (A 1.000)
+    3      1   AAA AAG AAA (K K K): AAA 0.600 (K 1.000) AAA 0.500 (K 1.000)
+
+Summary of changes along branches.
+"""
+
+class TestRst(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.file = os.path.join(self.tmpdir, "rst")
+        with open(self.file, mode='w', encoding='utf-8') as handle:
+            handle.write(rst_text)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_posteriors(self):
+
+        tables = [ x for x in iter_rst(self.file) if x[0] != 'ancestral' ]
+
+        self.assertEqual([ x[:2] for x in tables ], [ ('NEB',
+          'Model 2: PositiveSelection'), ('BEB', 'Model 2: PositiveSelection') ])
+        self.assertEqual(tables[0][2].row_labels.tolist(), ['1', '2', '3'])
+        self.assertEqual(tables[0][2][1].tolist(), ['A', 0.1, 0.2, 0.7, 3, 2.5])
+        self.assertEqual(tables[1][2][0].tolist(), ['M', 0.9537, 0.04571,
+          0.00059, 1, 0.149, 0.213])
+
+    def test_ancestral_nodes(self):
+
+        tables = [ x for x in iter_rst(self.file) if x[0] == 'ancestral' ]
+
+        # Nodes are numbered after the taxa, whose amino acids are not taxa.
+        self.assertEqual([ x[1] for x in tables ], ['node #4', 'node #5'])
+        self.assertEqual(tables[1][2].tolist(), [ ['ATG', 0.998, 'M', 0.999],
+          ['GCC', 0.7, 'A', 1.0], ['AAA', 0.5, 'K', 1.0] ])
+        self.assertEqual(tables[1][2].row_labels.tolist(), ['1', '2', '3'])
+
+    def test_chunks(self):
+
+        tables = [ x for x in iter_rst(self.file, chunk_size=2)
+          if x[0] == 'NEB' ]
+
+        self.assertEqual([ len(x[2]) for x in tables ], [2, 1])
+        self.assertEqual(tables[1][2].row_labels.tolist(), ['3'])
+        with self.assertRaises(ValueError):
+            next( iter_rst(self.file, chunk_size=0) )
+
+if __name__ == '__main__':
+    unittest.main()
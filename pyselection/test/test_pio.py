@@ -0,0 +1,81 @@
+#!/usr/bin/python -tt
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from io import open
+import os
+import shutil
+import tempfile
+import unittest
+
+from pyselection.pio import TextPIO
+from pyselection.pio import TextTail
+
+class TestTextTail(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.file = os.path.join(self.tmpdir, "rub")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, text, mode='a'):
+        with open(self.file, mode=mode, encoding='utf-8') as handle:
+            handle.write(text)
+
+    def test_reads_complete_lines(self):
+
+        tail = TextTail(self.file)
+        self.assertEqual(tail.read(), [])
+
+        self.write("a\nb\npart")
+        self.assertEqual(tail.read(), ['a', 'b'])
+        self.write("ial\nc\n")
+        self.assertEqual(list(tail), ['partial', 'c'])
+        self.assertEqual(tail.read(), [])
+
+    def test_truncated_file(self):
+
+        tail = TextTail(self.file)
+        self.write("a\nb\n")
+        tail.read()
+
+        self.write("c\n", mode='w')
+        self.assertEqual(tail.read(), ['c'])
+
+    def test_replaced_file(self):
+
+        tail = TextTail(self.file)
+        self.write("a\nb\n")
+        tail.read()
+
+        # A new file as long as the old one is read from its start.
+        os.remove(self.file)
+        self.write("c\nd\ne\n")
+        self.assertEqual(tail.read(), ['c', 'd', 'e'])
+
+class TestTextPIO(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.pio = TextPIO( os.path.join(self.tmpdir, "lines.txt") )
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_lines_are_written_as_text(self):
+
+        # Byte strings are taken as UTF-8, as are the native strings of
+        # Python 2.
+        self.pio.save([ "α\n", "β".encode('utf-8'), str("c") ])
+        self.pio.append([ b"d\n", "e" ])
+
+        self.assertEqual(self.pio.load(), ["α", "β", "c", "d", "e"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+#!/usr/bin/python -tt
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from io import open
+import os
+import shutil
+import tempfile
+import unittest
+
+from pyselection.query import LazyTable
+from pyselection.store import ResultStore
+from pyselection.table import BaseTable
+from pyselection.table import TableLabels
+
+class RangeTable(BaseTable):
+    """Table recording the ranges searched in it."""
+
+    searches = list()
+
+    def find_range(self, column, *args, **kwargs):
+        self.searches.append(column)
+        return super(RangeTable, self).find_range(column, *args, **kwargs)
+
+class TestTableSource(unittest.TestCase):
+
+    def setUp(self):
+        RangeTable.searches[:] = []
+        self.table = RangeTable([ [1, 'a', 2.0], [2, 'b', 3.0], [3, 'a', 4.0],
+          [4, 'c', None] ], row_labels=TableLabels(['w', 'x', 'y', 'z']) )
+
+    def test_filter_and_select(self):
+
+        query = self.table.lazy().filter(0, '>', 1).select(1, 2)
+        result = query.collect()
+
+        self.assertEqual(result.tolist(), [ ['b', 3.0], ['a', 4.0], ['c', None] ])
+        self.assertEqual(result.row_labels.tolist(), ['x', 'y', 'z'])
+        self.assertEqual(query.explain(), [ "scan table of 4 rows",
+          "  filter at source: 0 > 1", "  select at source: 1, 2" ])
+
+        # Missing values match no comparison.
+        self.assertEqual(self.table.lazy().filter(2, '!=', 3.0).collect().tolist(),
+          [ [1, 'a', 2.0], [3, 'a', 4.0] ])
+
+    def test_equality_without_index(self):
+
+        result = self.table.lazy().filter(1, '==', 'a').filter(0, '>', 1).collect()
+
+        self.assertEqual(result.tolist(), [ [3, 'a', 4.0] ])
+        self.assertEqual(RangeTable.searches, [])
+
+    def test_equality_with_index(self):
+
+        self.table.create_index(1)
+        result = self.table.lazy().filter(0, '>=', 2).filter(1, '==', 'a').collect()
+
+        self.assertEqual(result.tolist(), [ [3, 'a', 4.0] ])
+        self.assertEqual(result.row_labels.tolist(), ['y'])
+
+    def test_steps(self):
+
+        table = self.table
+
+        self.assertEqual(table.lazy().groupby(1, [ (2, 'sum'), (None, 'count') ]
+          ).collect().tolist(), [ ['a', 6.0, 2], ['b', 3.0, 1], ['c', 0, 1] ])
+        self.assertEqual(list( table.lazy().map(lambda x: [ x[0] * 10 ]).head(2) ),
+          [ [10], [20] ])
+        self.assertEqual(table.lazy().filter(lambda x: x[1] != 'a').head(1).collect(
+          ).tolist(), [ [2, 'b', 3.0] ])
+
+        with self.assertRaises(ValueError):
+            table.lazy().filter(0, '=', 1)
+        with self.assertRaises(ValueError):
+            table.lazy().filter('gene', '==', 1)
+        with self.assertRaises(ValueError):
+            table.lazy().groupby(0, [ (1, 'median') ])
+
+class TestOtherSources(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_text_source(self):
+
+        filepath = os.path.join(self.tmpdir, "results.tsv")
+        with open(filepath, mode='w', encoding='utf-8') as handle:
+            handle.write("gene\tmodel\tlnL\ng1\tM0\t-10.5\ng2\tM0\t-3\ng1\tM7\t\n")
+
+        query = LazyTable.from_text(filepath).filter('lnL', '<', -5).select('gene',
+          'lnL')
+
+        self.assertEqual(query.columns, ['gene', 'lnL'])
+        self.assertEqual(query.collect().tolist(), [ ['g1', -10.5] ])
+        self.assertEqual(LazyTable.from_text(filepath).groupby('gene',
+          [ ('lnL', 'min', 'best') ]).columns, ['gene', 'best'])
+
+    def test_store_source(self):
+
+        store = ResultStore( os.path.join(self.tmpdir, "results.db") )
+        store.ingest('results', BaseTable([ ['g1', 'M0', -10.5],
+          ['g2', 'M0', -3.0], ['g1', 'M7', -9.0] ]), ['gene', 'model', 'lnL'])
+
+        query = LazyTable.from_store(store, 'results').filter('model', '==',
+          'M0').select('gene', 'lnL').filter('lnL', '<', -5)
+
+        self.assertEqual(query.collect().tolist(), [ ['g1', -10.5] ])
+        self.assertRegexpMatches(query.explain()[1],
+          r"^  filter at source: 1 == u?'M0', 2 < -5$")
+        store.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+#!/usr/bin/python -tt
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from io import open
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from pyselection.schema import ColumnSpec
+from pyselection.schema import TableSchema
+
+class TestColumnSpec(unittest.TestCase):
+
+    def test_adapt_values(self):
+
+        spec = ColumnSpec('omega', 'float', nullable=True)
+        values = spec.adapt_values([1, 0.5, None])
+        self.assertEqual(values, [1.0, 0.5, None])
+        self.assertIsInstance(values[0], float)
+
+        with self.assertRaises(TypeError):
+            spec.adapt_values(['x'])
+        with self.assertRaises(TypeError):
+            ColumnSpec('flag', 'bool').adapt_values([1])
+        with self.assertRaises(TypeError):
+            ColumnSpec('np', 'int').adapt_values([None])
+        with self.assertRaises(ValueError):
+            ColumnSpec('np', 'long')
+
+    def test_parse(self):
+
+        self.assertIs(ColumnSpec('flag', 'bool').parse('false'), False)
+        self.assertEqual(ColumnSpec('np', 'int').parse('3'), 3)
+        self.assertIsNone(ColumnSpec('lnL', 'float', nullable=True).parse('NA') )
+
+        with self.assertRaises(ValueError):
+            ColumnSpec('lnL', 'float').parse('')
+        with self.assertRaises(ValueError):
+            ColumnSpec('flag', 'bool').parse('1')
+
+    def test_pickle(self):
+        spec = ColumnSpec('gene', 'category', nullable=True)
+        self.assertEqual(pickle.loads( pickle.dumps(spec, 2) ), spec)
+
+class TestTableSchema(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_infer(self):
+
+        rows = [ ['g1', -10.5, 3, True], ['g2', -3, 4, False], ['g3', None, 5, True] ]
+        schema = TableSchema.infer(rows, names=['gene', 'lnL', 'np', 'flag'])
+
+        self.assertEqual([ (x.name, x.data_type, x.nullable) for x in schema ],
+          [ ('gene', 'str', False), ('lnL', 'float', True), ('np', 'int', False),
+          ('flag', 'bool', False) ])
+        self.assertEqual(schema.index('np'), 2)
+
+        schema = TableSchema.infer([ [True, 'a'], [2, 'a'] ], max_categories=1)
+        self.assertEqual([ x.data_type for x in schema ], ['int', 'category'])
+        self.assertEqual(schema.names, ('column0', 'column1') )
+
+        with self.assertRaises(TypeError):
+            TableSchema.infer([ [1], ['x'] ])
+        with self.assertRaises(ValueError):
+            TableSchema.infer([ [1, 2], [3] ])
+
+    def test_infer_fields(self):
+
+        schema = TableSchema.infer_fields([ ['True', '1', '1', '', 'x'],
+          ['3', '2.5', 'false', '4', '5'] ])
+
+        self.assertEqual([ x.data_type for x in schema ],
+          ['str', 'float', 'str', 'int', 'str'])
+        self.assertEqual([ x.nullable for x in schema ],
+          [False, False, False, True, False])
+
+        # Every inferred column parses the fields it was inferred from.
+        self.assertEqual(schema.parse(['True', '1', '1', '', 'x']),
+          ['True', 1.0, '1', None, 'x'])
+
+    def test_from_text(self):
+
+        filepath = os.path.join(self.tmpdir, "results.tsv")
+
+        with open(filepath, mode='w', encoding='utf-8') as handle:
+            handle.write("gene\tlnL\tnp\tomega\tflag\n"
+              "g1\t-10.5\t3\t0.1\tTrue\n7\t-3\t4\tNA\tFalse\n")
+
+        schema = TableSchema.from_text(filepath)
+        self.assertEqual([ (x.name, x.data_type, x.nullable) for x in schema ],
+          [ ('gene', 'str', False), ('lnL', 'float', False), ('np', 'int', False),
+          ('omega', 'float', True), ('flag', 'bool', False) ])
+
+        schema = TableSchema.from_text(filepath, sample_size=1)
+        self.assertFalse(schema['omega'].nullable)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/python -tt
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from pyselection.store import ResultStore
+from pyselection.table import BaseTable
+from pyselection.table import TableLabels
+
+class TestResultStore(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = ResultStore( os.path.join(self.tmpdir, "results.db") )
+
+        rows = [ [ 'g%d' % (i // 2), ['M0', 'M8'][i % 2], -1000.0 - i, i % 3 ]
+          for i in range(10) ]
+        self.store.ingest('results', BaseTable(rows), ['gene', 'model', 'lnL', 'np'])
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_ingest_and_select(self):
+
+        self.assertEqual(self.store.get_tables(), ['results'])
+        self.assertEqual(self.store.get_columns('results'), ['gene', 'model',
+          'lnL', 'np'])
+
+        chunks = list( self.store.select('results', "model = ? AND np > ?",
+          ('M8', 0), columns=['gene', 'lnL'], chunk_size=2) )
+
+        self.assertEqual([ len(x) for x in chunks ], [2, 1])
+        self.assertEqual(chunks[0].tolist(), [ ['g0', -1001.0], ['g2', -1005.0] ])
+
+        # Loading more rows appends them, and keeps the indexes.
+        self.store.ingest('results', BaseTable([ ['g9', 'M0', -1.0, 1] ]),
+          ['gene', 'model', 'lnL', 'np'])
+        indexes = next( self.store.query("SELECT name FROM sqlite_master "
+          "WHERE type = 'index' ORDER BY name") ).tolist()
+        self.assertEqual(indexes, [ ['idx_results_gene'], ['idx_results_model'] ])
+        self.assertEqual(next( self.store.query("SELECT COUNT(*) FROM results") ).tolist(),
+          [ [11] ])
+
+    def test_ingest_errors(self):
+
+        table = BaseTable([ [1.5, 2] ])
+
+        with self.assertRaises(ValueError):
+            self.store.ingest('bad; DROP TABLE results', table, ['lnL', 'np'])
+        with self.assertRaises(ValueError):
+            self.store.ingest('results', table, ['lnL', 'np'])
+        with self.assertRaises(ValueError):
+            self.store.ingest('other', table, ['lnL'])
+        self.assertEqual(self.store.get_tables(), ['results'])
+
+    def test_labels(self):
+
+        table = BaseTable([ [1.5, 2], [2.5, 3] ], row_labels=TableLabels(['a', 'b']) )
+        self.store.ingest('labelled', table, ['lnL', 'np'], label_column='gene')
+
+        result = next( self.store.select('labelled', label_column='gene') )
+        self.assertEqual(result.row_labels.tolist(), ['a', 'b'])
+        self.assertEqual(result.tolist(), [ [1.5, 2], [2.5, 3] ])
+
+    def test_query_is_checked_when_called(self):
+
+        # Labels are checked across all the results, not chunk by chunk.
+        with self.assertRaisesRegexp(ValueError, "'g0'"):
+            self.store.query("SELECT gene, lnL FROM results;", chunk_size=1,
+              label_column='gene')
+        with self.assertRaisesRegexp(ValueError, "no column"):
+            self.store.select('results', columns=['lnL'], label_column='gene')
+        with self.assertRaises(ValueError):
+            self.store.query("SELECT * FROM results", chunk_size=0)
+
+        chunks = self.store.select('results', "model = ?", ('M0',),
+          label_column='gene')
+        self.assertEqual(next(chunks).row_labels.tolist(), [ 'g%d' % i
+          for i in range(5) ])
+
+if __name__ == '__main__':
+    unittest.main()
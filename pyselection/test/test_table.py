@@ -0,0 +1,1088 @@
+#!/usr/bin/python -tt
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from array import array
+from copy import copy
+from copy import deepcopy
+import os
+import pickle
+import random
+import shutil
+import tempfile
+import unittest
+
+from pyselection.core import int_types
+from pyselection.core import str_types
+from pyselection.table import _pack_values
+from pyselection.table import _unpack_values
+from pyselection.table import BaseList
+from pyselection.table import BaseTable
+from pyselection.table import CategoricalColumn
+from pyselection.table import ColumnTable
+from pyselection.table import ListSlicer
+from pyselection.table import MaskedColumn
+from pyselection.table import RaggedTable
+from pyselection.table import RowView
+from pyselection.table import SparseLabels
+from pyselection.table import TableBuilder
+from pyselection.table import TableLabels
+
+def _double_and_sum(row):
+    return [ row[0] * 2, sum(row) ]
+
+def _add_half(row):
+    return row[0] + 0.5
+
+class TestPickle(unittest.TestCase):
+
+    def test_table_round_trip(self):
+
+        table = BaseTable([ [1, 2, 3], [4, 5], [6.0, 'a', None] ])
+        table.row_labels = TableLabels(['g1', '', 'g3'])
+
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            other = pickle.loads( pickle.dumps(table, protocol) )
+            self.assertEqual(other, table)
+            self.assertEqual(other.tolist(), table.tolist() )
+            self.assertEqual(other.row_labels.tolist(), ['g1', '', 'g3'])
+
+    def test_typed_columns(self):
+
+        table = BaseTable([ [1, 2.5, 'x'], [3, 4.5, 'y'] ],
+          data_types=(int, float, str_types[-1]) )
+        other = pickle.loads( pickle.dumps(table, 2) )
+
+        self.assertEqual(other.data_types, table.data_types)
+        self.assertEqual(other.tolist(), [ [1, 2.5, 'x'], [3, 4.5, 'y'] ])
+
+    def test_integers_packed_as_64_bits(self):
+
+        type_name, width, byteorder, data = _pack_values([1, -2, 2**40])
+
+        self.assertEqual( (type_name, width, byteorder), ('int', 8, 'little') )
+        self.assertEqual(len(data), 24)
+        self.assertEqual(_unpack_values( (type_name, width, byteorder, data) ),
+          [1, -2, 2**40])
+
+    def test_longs_stay_longs(self):
+
+        values = [ int_types[-1](x) for x in (1, 2, 3) ]
+
+        for x in _unpack_values( _pack_values(values) ):
+            self.assertIs(type(x), int_types[-1])
+
+        # Mixed integer types, and integers too large for 64 bits, are kept
+        # as they are.
+        mixed = [1, int_types[-1](2), 10**30]
+        self.assertEqual(_pack_values(mixed)[0], None)
+        self.assertEqual(pickle.loads( pickle.dumps( BaseList(mixed), 2) ),
+          BaseList(mixed) )
+
+class TestBaseList(unittest.TestCase):
+
+    def test_data_types_in_fixed_order(self):
+
+        self.assertEqual(BaseList.validate_data_types( (float, int) ),
+          BaseList.validate_data_types( (int, float) ) )
+        self.assertEqual(BaseList([1], data_types=(float, int) ),
+          BaseList([1], data_types=(int, float) ) )
+
+    def test_append_at_end(self):
+
+        values = BaseList([1, 2])
+        values.append(3)
+        values.insert(3, 4)
+        values[4:4] = [5]
+
+        self.assertEqual(values.tolist(), [1, 2, 3, 4, 5])
+        with self.assertRaises(IndexError):
+            values[6:6] = [7]
+
+    def test_set_element(self):
+
+        values = BaseList([1, 2, 3], data_types=(int,) )
+        values[-1] = 4
+
+        self.assertEqual(values.tolist(), [1, 2, 4])
+        with self.assertRaises(IndexError):
+            values[3] = 5
+        with self.assertRaises(TypeError):
+            values[0] = 'a'
+
+    def test_search(self):
+
+        rng = random.Random(42)
+        values = [ rng.randint(0, 20) for _ in range(300) ]
+        unsorted, ordered = BaseList(values), BaseList( sorted(values) )
+        ordered.mark_sorted()
+
+        for items, expected in ( (unsorted, values), (ordered, sorted(values) ) ):
+            for value in range(-1, 22):
+                for start, stop in ( (None, None), (5, 200), (-50, None),
+                  (None, -3) ):
+                    indices = range( len(expected) )[start:stop]
+                    found = tuple( i for i in indices if expected[i] == value )
+                    self.assertEqual(items.findall(value, start, stop), found)
+                    self.assertEqual(items.count(value, start, stop), len(found))
+                    if found:
+                        self.assertEqual(items.index(value, start, stop), found[0])
+                        self.assertEqual(items.rindex(value, start, stop), found[-1])
+                    else:
+                        with self.assertRaises(ValueError):
+                            items.index(value, start, stop)
+                        with self.assertRaises(ValueError):
+                            items.rindex(value, start, stop)
+
+    def test_sorted_flag(self):
+
+        values = BaseList([1, 2, 2, 3])
+        self.assertFalse(values.is_sorted)
+
+        values.mark_sorted()
+        self.assertTrue(values.is_sorted)
+        self.assertEqual(values.findall(2), (1, 2) )
+
+        values.append(0)
+        self.assertFalse(values.is_sorted)
+        self.assertEqual(values.findall(0), (4,) )
+        with self.assertRaises(ValueError):
+            values.mark_sorted()
+
+        values.sort()
+        self.assertTrue(values.is_sorted)
+
+class TestBaseTable(unittest.TestCase):
+
+    def test_insert_adds_one_row(self):
+
+        table = BaseTable([ [1, 2], [3, 4] ])
+        table.insert(1, [5, 6, 7])
+
+        self.assertEqual(table.tolist(), [ [1, 2], [5, 6, 7], [3, 4] ])
+
+    def test_get_slice(self):
+
+        table = BaseTable([ [1, 2], [3, 4], [5, 6] ])
+        table.row_labels = TableLabels(['a', 'b', 'c'])
+        part = table[1:]
+
+        self.assertIsInstance(part, BaseTable)
+        self.assertEqual(part.tolist(), [ [3, 4], [5, 6] ])
+        self.assertEqual(part.row_labels.tolist(), ['b', 'c'])
+
+    def test_rindex(self):
+
+        table = BaseTable([ [1, 2], [2, 3, 1], [4] ])
+
+        self.assertEqual(table.rindex(1), (1, 2) )
+        self.assertEqual(table.rindex(2), (1, 0) )
+        self.assertEqual(table.index(2), (0, 1) )
+        with self.assertRaises(ValueError):
+            table.rindex(5)
+
+    def test_pop(self):
+
+        table = BaseTable([ [1, 2], [3, 4], [5] ])
+        table.row_labels = TableLabels(['a', 'b', 'c'])
+        row = table.pop()
+
+        self.assertEqual(row.tolist(), [5])
+        self.assertEqual(table.tolist(), [ [1, 2], [3, 4] ])
+        self.assertEqual(table.row_labels.tolist(), ['a', 'b'])
+        self.assertEqual(table.row_lengths, (2, 2) )
+
+    def test_jagged_table_slice(self):
+
+        table = BaseTable([ [1, 2, 3], [4], [5, 6] ])
+
+        self.assertEqual(table[0:3, 1:3].tolist(),
+          [ [2, 3], [None, None], [6, None] ])
+        self.assertEqual(table[0:2, 0].tolist(), [ [1], [4] ])
+        self.assertEqual(table[1, 0], 4)
+        self.assertEqual(ListSlicer(BaseList([1, 2]), 1).iter_indices(), (1,) )
+
+    def test_search(self):
+
+        for cls in (BaseTable, RaggedTable):
+            table = cls([ [1, 2, 1], [3, 1], [1, 5, 6] ])
+            self.assertEqual(table.findall(1), ( (0, 0), (0, 2), (1, 1), (2, 0) ))
+            self.assertEqual(table.count(1, start=(0, 1) ), 3)
+            self.assertEqual(table.index(1, start=(0, 1) ), (0, 2) )
+            # A stop gives a row count and a column in the last of the rows.
+            self.assertEqual(table.rindex(1, stop=(2, 0) ), (0, 2) )
+            self.assertEqual(table.rindex(1, stop=(2, 2) ), (1, 1) )
+            self.assertEqual(table.findall(1, start=(1, 1), stop=(3, 1) ),
+              ( (1, 1), (2, 0) ))
+
+class TestTableLabels(unittest.TestCase):
+
+    def test_item_access(self):
+
+        labels = TableLabels(['a', '', 'c'])
+
+        self.assertEqual(labels[0], 'a')
+        self.assertEqual(labels['c'], 2)
+        self.assertEqual(labels[0:3], ('a', '', 'c') )
+        with self.assertRaisesRegexp(TypeError, "cannot be resized"):
+            del labels[0]
+
+    def test_implicit_labels_follow_edits(self):
+
+        table = BaseTable([ [i] for i in range(5) ])
+        self.assertIsInstance(table.row_labels._labels, SparseLabels)
+        self.assertEqual(table.row_labels.count_labels(), 0)
+
+        table.row_labels[2] = 'two'
+        table.append([5])
+        table.insert(0, [-1])
+        del table[1]
+        table.reverse()
+
+        self.assertEqual(table.row_labels.tolist(), ['', '', '', 'two', '', ''])
+        self.assertEqual(table.row_labels['two'], 3)
+        self.assertEqual(table[3].tolist(), [2])
+        self.assertIsInstance(table.row_labels._labels, SparseLabels)
+
+    def test_duplicate_labels_leave_table_unchanged(self):
+
+        table = BaseTable([ [1], [2] ], row_labels=TableLabels(['a', 'b']) )
+
+        with self.assertRaisesRegexp(ValueError, "duplicate"):
+            table[0:0] = BaseTable([ [3] ], row_labels=TableLabels(['a']) )
+
+        self.assertEqual(table.tolist(), [ [1], [2] ])
+        self.assertEqual(table.row_labels.tolist(), ['a', 'b'])
+
+    def test_compact_labels(self):
+
+        labels = TableLabels([ 'x%d' % i for i in range(5) ] + [''], compact=True)
+
+        self.assertTrue(labels.compact)
+        self.assertEqual( (labels['x3'], labels[3], labels[1:3]),
+          (3, 'x3', ('x1', 'x2') ) )
+        self.assertEqual( ('x4' in labels, 'zz' in labels), (True, False) )
+        self.assertEqual( (labels.count_labels(), len(labels) ), (5, 6) )
+
+        other = pickle.loads( pickle.dumps(labels, 2) )
+        self.assertTrue(other.compact)
+        self.assertEqual(other, labels)
+
+        # Labels are unpacked once they are changed.
+        labels.set_label(5, 'y')
+        self.assertFalse(labels.compact)
+        self.assertEqual(labels['y'], 5)
+        with self.assertRaises(ValueError):
+            TableLabels(['a', 'a'], compact=True)
+
+    def test_from_length(self):
+
+        labels = TableLabels.from_length(3)
+
+        self.assertEqual(labels, TableLabels(['', '', '']) )
+        self.assertEqual(pickle.loads( pickle.dumps(labels, 2) ).tolist(),
+          ['', '', ''])
+        with self.assertRaises(TypeError):
+            TableLabels.from_length('a')
+
+class TestRowView(unittest.TestCase):
+
+    def test_rows_read_through(self):
+
+        for cls in (BaseTable, RaggedTable):
+            table = cls([ [1, 2, 3], [4, 5] ])
+            row = table[0]
+            self.assertIsInstance(row._list, RowView)
+            table[0, 1] = 7
+            self.assertEqual(row.tolist(), [1, 7, 3])
+            self.assertEqual([ x.tolist() for x in table ], [ [1, 7, 3], [4, 5] ])
+
+    def test_rows_write_through(self):
+
+        for cls in (BaseTable, RaggedTable):
+            table = cls([ [1, 2, 3], [4, 5] ])
+            table.create_index(0)
+            row = table[1]
+            row[0] = 6
+            row.append(8)
+            self.assertEqual(table.tolist(), [ [1, 2, 3], [6, 5, 8] ])
+            self.assertEqual(table.row_lengths, (3, 3) )
+            self.assertEqual(table.find_range(0, 6, 6), (1,) )
+            self.assertEqual(row.pop(), 8)
+            self.assertEqual(table.row_lengths, (3, 2) )
+
+    def test_detached_rows(self):
+
+        table = BaseTable([ [1, 2], [3, 4] ])
+        row = copy(table[0])
+        popped = table.pop()
+        table[0, 0] = 5
+
+        self.assertEqual(row.tolist(), [1, 2])
+        self.assertEqual(popped.tolist(), [3, 4])
+        self.assertEqual(pickle.loads( pickle.dumps(table[0], 2) ).tolist(), [5, 2])
+
+    def test_stale_rows(self):
+
+        for cls in (BaseTable, RaggedTable, ColumnTable):
+
+            table = cls([ [1, 'a'], [2, 'b'] ])
+            row = table[0]
+            table.insert(0, [9, 'z'])
+
+            with self.assertRaises(RuntimeError):
+                row.tolist()
+            with self.assertRaises(RuntimeError):
+                row[0] = 7
+
+            row = table[1]
+            del table[0]
+
+            with self.assertRaises(RuntimeError):
+                row[0]
+            with self.assertRaises(RuntimeError):
+                row[0] = 7
+
+            self.assertEqual(table.tolist(), [ [1, 'a'], [2, 'b'] ])
+
+            for move in (table.reverse, table.pop, lambda: table.__setitem__(0, [5, 'e']) ):
+                row = table[0]
+                move()
+                with self.assertRaises(RuntimeError):
+                    len(row)
+
+    def test_rows_after_append(self):
+
+        for cls in (BaseTable, RaggedTable):
+            table = cls([ [1, 'a'], [2, 'b'] ])
+            row = table[1]
+            table.append([3, 'c'])
+            table.extend([ [4, 'd'] ])
+            row[0] = 7
+            self.assertEqual(row.tolist(), [7, 'b'])
+            self.assertEqual(table.tolist(), [ [1, 'a'], [7, 'b'], [3, 'c'], [4, 'd'] ])
+
+class TestRaggedTable(unittest.TestCase):
+
+    def test_matches_base_table(self):
+
+        rows = [ [1, 2, 3], [4, 5], [6.0, 'a', None], [], [7] ]
+        ragged, base = RaggedTable(rows), BaseTable(rows)
+
+        for table in (ragged, base):
+            table[0, 0] = 9
+            table.append([7, 8])
+            table.insert(1, [0])
+            table[2] = [5, 5, 5]
+            table[0:2, 1:3] = [ [1, 1], [2, 2] ]
+            del table[0:2, 0]
+            table.reverse()
+            table.pop()
+            del table[1]
+            del table[0:4:2]
+
+        self.assertEqual(ragged.tolist(), base.tolist() )
+        self.assertEqual(ragged.row_lengths, base.row_lengths)
+        self.assertEqual( (ragged.min_row_length, ragged.max_row_length),
+          (base.min_row_length, base.max_row_length) )
+        self.assertEqual(list(ragged.iter_indices() ), list(base.iter_indices() ))
+
+    def test_appends_in_place(self):
+
+        table = RaggedTable([ [1, 2] ])
+        offsets = table._list.offsets
+
+        for i in range(100):
+            table.append([i] * (i % 3) )
+
+        self.assertIs(table._list.offsets, offsets)
+        self.assertEqual(len(table), 101)
+        self.assertEqual( (table.min_row_length, table.max_row_length), (0, 2) )
+
+    def test_lengths_follow_edits(self):
+
+        table = RaggedTable([ [1, 2, 3], [4], [5, 6] ])
+        self.assertEqual( (table.min_row_length, table.max_row_length), (1, 3) )
+
+        del table[0]
+        self.assertEqual( (table.min_row_length, table.max_row_length), (1, 2) )
+
+        table[1] = [1, 2, 3, 4]
+        self.assertEqual(table.row_lengths, (1, 4) )
+        self.assertEqual(table._list.offsets.tolist(), [0, 1, 5])
+
+        del table[0:2]
+        self.assertEqual( (table.min_row_length, table.max_row_length),
+          (None, None) )
+
+    def test_delete_keeps_labels_sparse(self):
+
+        table = RaggedTable([ [1], [2], [3], [4] ])
+        table.row_labels[2] = 'c'
+        del table[0]
+        del table[0:1]
+
+        self.assertIsInstance(table.row_labels._labels, SparseLabels)
+        self.assertEqual(table.row_labels.tolist(), ['c', ''])
+        self.assertEqual(table.row_labels['c'], 0)
+
+    def test_init_without_row_lists(self):
+
+        class CheckedTable(RaggedTable):
+            def _adapt_rows(self, rows):
+                if rows:
+                    raise AssertionError("rows were copied into lists")
+                return list()
+
+        rows = ( (1, 2, 3), array(str('l'), [4, 5]), BaseList([6.0, 'a']), () )
+        table = CheckedTable(rows, row_labels=TableLabels(['a', 'b', 'c', 'd']))
+
+        self.assertEqual(table.tolist(), [ [1, 2, 3], [4, 5], [6.0, 'a'], [] ])
+        self.assertEqual(table._list.offsets.tolist(), [0, 3, 5, 7, 7])
+        self.assertEqual(table.row_lengths, (3, 2, 2, 0) )
+        self.assertEqual(CheckedTable(table).tolist(), table.tolist() )
+        self.assertEqual(CheckedTable(BaseTable([ [1], [2, 3] ])).tolist(), [ [1], [2, 3] ])
+
+        with self.assertRaises(TypeError):
+            RaggedTable([ [1], [object()] ])
+        with self.assertRaises(TypeError):
+            RaggedTable([ "abc" ])
+        with self.assertRaises(TypeError):
+            RaggedTable([ [1.5] ], data_types=(int,) )
+        with self.assertRaises(ValueError):
+            RaggedTable([ [1] ], row_labels=TableLabels(['a', 'b']))
+
+class TestFingerprint(unittest.TestCase):
+
+    def test_table_fingerprint(self):
+
+        rows = [ [1, 2, 3], [4, 5], [6.0, 'a', None] ]
+        table = BaseTable(rows)
+        first = table.fingerprint()
+
+        self.assertEqual(RaggedTable(rows).fingerprint(), first)
+        self.assertEqual(copy(table).fingerprint(), first)
+        self.assertEqual(pickle.loads( pickle.dumps(table, 2) ).fingerprint(), first)
+
+        table[0, 0] = 7
+        self.assertNotEqual(table.fingerprint(), first)
+        table[0, 0] = 1
+        self.assertEqual(table.fingerprint(), first)
+
+        table.append([1])
+        self.assertNotEqual(table.fingerprint(), first)
+        del table[3]
+        self.assertEqual(table.fingerprint(), first)
+
+    def test_labels_change_fingerprint(self):
+
+        table = BaseTable([ [1], [2] ])
+        first = table.fingerprint()
+
+        table.row_labels[0] = 'g1'
+        self.assertNotEqual(table.fingerprint(), first)
+        table.row_labels.clear(0)
+        self.assertEqual(table.fingerprint(), first)
+
+    def test_list_fingerprint(self):
+
+        values = BaseList([1, 2, 3])
+        first = values.fingerprint()
+
+        values[0] = 5
+        self.assertNotEqual(values.fingerprint(), first)
+        values[0] = 1
+        self.assertEqual(values.fingerprint(), first)
+        self.assertNotEqual(BaseList([1, 2.0]).fingerprint(),
+          BaseList([1, 2]).fingerprint() )
+        self.assertEqual(TableLabels(['a', 'b']).fingerprint(),
+          TableLabels(['a', 'b']).fingerprint() )
+
+class TestArrow(unittest.TestCase):
+
+    def setUp(self):
+        try:
+            import pyarrow
+        except ImportError:
+            self.skipTest("pyarrow is not installed")
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_round_trip(self):
+
+        table = BaseTable([ [1, 2.5, 'a'], [2, None, 'b'] ])
+        table.row_labels = TableLabels(['g1', 'g2'])
+        arrow_table = table.to_arrow(column_names=['np', 'lnL', 'model'])
+
+        self.assertEqual(arrow_table.schema.names, ['label', 'np', 'lnL', 'model'])
+
+        other = BaseTable.from_arrow(arrow_table)
+        self.assertEqual(other.tolist(), table.tolist() )
+        self.assertEqual(other.row_labels.tolist(), ['g1', 'g2'])
+
+        with self.assertRaises(ValueError):
+            table.to_arrow(column_names=['label', 'lnL', 'model'])
+        with self.assertRaises(ValueError):
+            BaseTable([ [1, 2], [3] ]).to_arrow()
+
+    def test_empty_labels_are_not_written(self):
+
+        table = BaseTable([ [1, 2.5], [2, 3.5] ])
+        table.row_labels[0] = 'g1'
+        table.row_labels.clear(0)
+
+        self.assertEqual(table.to_arrow().schema.names, ['c0', 'c1'])
+        self.assertEqual(table.to_arrow(column_names=['label', 'x']).num_columns, 2)
+
+    def test_parquet(self):
+
+        filepath = os.path.join(self.tmpdir, "table.parquet")
+        table = BaseTable([ [i, i / 2, 'g%d' % i] for i in range(10) ])
+        table.row_labels = TableLabels([ 's%d' % i for i in range(10) ])
+        table.write_parquet(filepath, column_names=['np', 'lnL', 'gene'],
+          row_group_size=4)
+
+        chunks = list( BaseTable.iter_parquet(filepath, columns=['lnL']) )
+        self.assertEqual([ len(x) for x in chunks ], [4, 4, 2])
+        self.assertEqual(chunks[2].tolist(), [ [4.0], [4.5] ])
+        self.assertEqual(chunks[2].row_labels.tolist(), ['s8', 's9'])
+
+        other = BaseTable.read_parquet(filepath, row_groups=[1])
+        self.assertEqual(other.tolist(), table[4:8].tolist() )
+
+class TestColumnIndex(unittest.TestCase):
+
+    ranges = ( (None, None, True, True), (0.2, 0.5, True, False),
+      (0.5, None, False, True), (None, 0.3, True, True), (0.4, 0.4, True, True) )
+
+    def check(self, table, column):
+
+        for low, high, low_inclusive, high_inclusive in self.ranges:
+            expected = tuple( r for r, row in enumerate( table.tolist() )
+              if len(row) > column and row[column] is not None and
+              (low is None or row[column] > low or (low_inclusive and
+              row[column] == low) ) and (high is None or row[column] < high or
+              (high_inclusive and row[column] == high) ) )
+            self.assertEqual(table.find_range(column, low, high, low_inclusive,
+              high_inclusive), expected)
+
+    def test_index_follows_edits(self):
+
+        rng = random.Random(1)
+
+        for cls in (BaseTable, RaggedTable):
+
+            table = cls([ [ 'g%d' % i, round(rng.random(), 1) ] for i in range(50) ])
+            table.create_index(1)
+            self.check(table, 1)
+
+            edits = [ lambda t: t.__setitem__(5, ['x', 0.35]),
+              lambda t: t.append(['y', 0.25]), lambda t: t.pop(),
+              lambda t: t.__setitem__(slice(10, 12), [ ['a', 0.9], ['b', None] ]),
+              lambda t: t.insert(0, ['z', 0.5]), lambda t: t.__delitem__(3),
+              lambda t: t.__setitem__( (slice(0, 10), slice(1, 2) ),
+                [ [0.0] ] * 10), lambda t: t.__setitem__( (20, 1), 0.45),
+              lambda t: t.reverse(), lambda t: t.__delitem__( (4, 1) ) ]
+
+            for edit in edits:
+                edit(table)
+                self.check(table, 1)
+
+            self.assertEqual(table.get_index(1).equal(0.45), table.find_range(1,
+              0.45, 0.45) )
+
+    def test_drop_index(self):
+
+        table = BaseTable([ [3], [1], [2] ])
+        index = table.create_index(0)
+
+        self.assertIs(table.get_index(0), index)
+        self.assertEqual(index.range(1, 2), (1, 2) )
+
+        table.drop_index(0)
+        with self.assertRaises(KeyError):
+            table.get_index(0)
+        with self.assertRaises(KeyError):
+            table.drop_index(0)
+        self.assertEqual(table.find_range(0, 1, 2), (1, 2) )
+
+class TestApply(unittest.TestCase):
+
+    def setUp(self):
+        self.table = BaseTable([ [i, i + 1] for i in range(10) ],
+          row_labels=TableLabels([ 'r%d' % i for i in range(10) ]) )
+
+    def test_processes(self):
+
+        result = self.table.apply(_double_and_sum, workers=3, chunk_size=2)
+
+        self.assertEqual(result.tolist(), [ [i * 2, i * 2 + 1] for i in range(10) ])
+        self.assertEqual(result.row_labels.tolist(), self.table.row_labels.tolist() )
+        self.assertEqual(self.table.apply(_double_and_sum).tolist(), result.tolist() )
+
+    def test_threads(self):
+
+        result = self.table.apply(_add_half, workers=2, threads=True)
+
+        self.assertEqual(result.tolist(), [ [i + 0.5] for i in range(10) ])
+
+    def test_edge_cases(self):
+
+        self.assertEqual(BaseTable([]).apply(_double_and_sum, workers=4).tolist(), [])
+
+        ragged = RaggedTable([ [1], [2, 3] ]).apply(_double_and_sum, workers=2)
+        self.assertIsInstance(ragged, RaggedTable)
+        self.assertEqual(ragged.tolist(), [ [2, 1], [4, 5] ])
+
+        with self.assertRaises(TypeError):
+            self.table.apply(None)
+        with self.assertRaises(ValueError):
+            self.table.apply(_add_half, workers=0)
+        with self.assertRaises(ValueError):
+            self.table.apply(_add_half, chunk_size=0)
+
+class TestConcat(unittest.TestCase):
+
+    def setUp(self):
+        self.first = BaseTable([ [1, 2], [3, 4] ], row_labels=TableLabels(['a', 'b']) )
+        self.second = BaseTable([ [5, 6], [7, 8] ], row_labels=TableLabels(['', 'a']) )
+
+    def test_concat(self):
+
+        table = BaseTable.concat([ self.first, BaseTable([ [5, 6] ]), [ [7, 8] ] ])
+
+        self.assertEqual(table.tolist(), [ [1, 2], [3, 4], [5, 6], [7, 8] ])
+        self.assertEqual(table.row_labels.tolist(), ['a', 'b', '', ''])
+
+        ragged = RaggedTable.concat([ RaggedTable([ [1], [2, 3] ]), [ [4, 5, 6] ] ])
+        self.assertIsInstance(ragged, RaggedTable)
+        self.assertEqual(ragged.tolist(), [ [1], [2, 3], [4, 5, 6] ])
+        self.assertEqual(BaseTable.concat([]).tolist(), [])
+
+    def test_label_policies(self):
+
+        tables = [ self.first, self.second ]
+
+        with self.assertRaisesRegexp(ValueError, "sharing label u?'a'"):
+            BaseTable.concat(tables)
+
+        table = BaseTable.concat(tables, labels='drop')
+        self.assertEqual(table.row_labels.count_labels(), 0)
+        self.assertEqual(len(table), 4)
+
+        table = BaseTable.concat(tables, labels='prefix')
+        self.assertEqual(table.row_labels.tolist(), ['0:a', '0:b', '', '1:a'])
+
+        table = BaseTable.concat(tables, labels='prefix', prefixes=['M0.', 'M8.'])
+        self.assertEqual(table.row_labels['M8.a'], 3)
+
+        with self.assertRaises(ValueError):
+            BaseTable.concat(tables, labels='keep')
+        with self.assertRaises(ValueError):
+            BaseTable.concat(tables, labels='prefix', prefixes=['M0.'])
+        with self.assertRaises(ValueError):
+            BaseTable.concat(tables, prefixes=['M0.', 'M8.'])
+
+class TestTableBuilder(unittest.TestCase):
+
+    def test_build(self):
+
+        builder = TableBuilder()
+        builder.append([1, 2.5, 'x'])
+        builder.extend( BaseTable([ [2, 3.5, 'y'] ], row_labels=TableLabels(['c']) ))
+        builder.append([3, 4.5, 'z'], label='d')
+
+        self.assertEqual(len(builder), 3)
+        self.assertIsInstance(builder._columns[1], array)
+
+        table = builder.build()
+        self.assertEqual(table.tolist(), [ [1, 2.5, 'x'], [2, 3.5, 'y'], [3, 4.5, 'z'] ])
+        self.assertEqual(table.row_labels.tolist(), ['', 'c', 'd'])
+        self.assertEqual(len(builder), 0)
+
+        with self.assertRaises(TypeError):
+            builder.append([ object() ])
+
+    def test_mixed_columns(self):
+
+        builder = TableBuilder(table_type=RaggedTable)
+        long_type = int_types[-1]
+        rows = [ [1, 2.0], [2**70, 3.0, 'a'], [True], [], [long_type(4), None] ]
+        builder.extend(rows)
+
+        table = builder.build()
+        self.assertIsInstance(table, RaggedTable)
+        self.assertEqual(table.tolist(), rows)
+        self.assertEqual([ type(x[0]) for x in table.tolist() if x ],
+          [ int, type(2**70), bool, long_type ])
+
+class TestCopyOnWrite(unittest.TestCase):
+
+    def test_base_table(self):
+
+        table = BaseTable([ [1, 2], [3, 4], [5, 6] ], row_labels=TableLabels(['a', 'b', 'c']))
+        item = copy(table)
+        other = deepcopy(item)
+
+        self.assertTrue( all( x is y for x, y in zip(table._list, item._list) ) )
+        self.assertIs(other._list[1], table._list[1])
+
+        item[0, 0] = 10
+        table[1, 1] = 40
+        other[2, 0:2] = [7, 8]
+        del other[1, 0]
+
+        self.assertEqual(table.tolist(), [ [1, 2], [3, 40], [5, 6] ])
+        self.assertEqual(item.tolist(), [ [10, 2], [3, 4], [5, 6] ])
+        self.assertEqual(other.tolist(), [ [1, 2], [4], [7, 8] ])
+        self.assertIs(item._list[2], table._list[2])
+
+        # A row is copied once, then written in place.
+        row = item._list[0]
+        item[0, 1] = 20
+        self.assertIs(item._list[0], row)
+
+        # Rows owned by a table are shared again by its next copy.
+        again = copy(item)
+        again[0, 0] = 100
+        item[0, 1] = 200
+        self.assertEqual(again.tolist()[0], [100, 20])
+        self.assertEqual(item.tolist()[0], [10, 200])
+
+        row = item.pop()
+        row[0] = 0
+        self.assertEqual(table.tolist()[2], [5, 6])
+        self.assertEqual(item.row_labels.tolist(), ['a', 'b'])
+        self.assertEqual(table.row_labels.tolist(), ['a', 'b', 'c'])
+
+    def test_owned_rows(self):
+
+        table = BaseTable([ [1, 2], [3, 4] ])
+        item = copy(table)
+        item[0, 0] = 10
+
+        # Ownership is marked on the rows themselves, so a row that the table
+        # did not copy is copied on write, whatever rows it has dropped.
+        del item[0]
+        table.append( (5, 6) )
+        item._list.append(table._list[-1])
+        item[-1, 0] = 50
+
+        self.assertEqual(table.tolist(), [ [1, 2], [3, 4], [5, 6] ])
+        self.assertEqual(item.tolist(), [ [3, 4], [50, 6] ])
+
+    def test_index(self):
+
+        table = BaseTable([ [3, 'a'], [1, 'b'], [2, 'c'] ])
+        table.create_index(0)
+        item = copy(table)
+        item[0, 0] = -1
+
+        self.assertEqual(table.find_range(0, 0, 10), (0, 1, 2) )
+        self.assertEqual(item.find_range(0, -5, 0), (0,) )
+
+    def test_ragged_table(self):
+
+        table = RaggedTable([ [1], [2, 3] ])
+        item = copy(table)
+        self.assertIs(item._list.values, table._list.values)
+
+        item[1, 0] = 9
+        item.append([4, 5, 6])
+        self.assertEqual(table.tolist(), [ [1], [2, 3] ])
+        self.assertEqual(item.tolist(), [ [1], [9, 3], [4, 5, 6] ])
+
+        other = copy(table)
+        table.reverse()
+        self.assertEqual(table.tolist(), [ [2, 3], [1] ])
+        self.assertEqual(other.tolist(), [ [1], [2, 3] ])
+
+    def test_column_table(self):
+
+        table = ColumnTable([ [1, 'a', 0.5], [2, None, 1.5] ],
+          schema=[ ('n', 'int'), ('s', 'str', True), ('x', 'float') ])
+        item = copy(table)
+        self.assertTrue( all( x is y for x, y in
+          zip(item._list.columns, table._list.columns) ) )
+
+        # Only the columns written to are copied.
+        item[0, 0] = 10
+        self.assertIsNot(item._list.columns[0], table._list.columns[0])
+        self.assertIs(item._list.columns[2], table._list.columns[2])
+
+        filled = item.fillna('b')
+        table.reverse()
+        self.assertEqual(filled.tolist(), [ [10, 'a', 0.5], [2, 'b', 1.5] ])
+        self.assertEqual(item.tolist(), [ [10, 'a', 0.5], [2, None, 1.5] ])
+        self.assertEqual(table.tolist(), [ [2, None, 1.5], [1, 'a', 0.5] ])
+
+class TestColumnTable(unittest.TestCase):
+
+    def setUp(self):
+        self.table = ColumnTable([ ['g1', -10.5, 3, True], ['g2', -3, 4, False],
+          ['g3', None, 5, True] ], row_labels=TableLabels(['a', 'b', 'c']))
+
+    def test_storage(self):
+
+        table = self.table
+        self.assertEqual([ (x.data_type, x.nullable) for x in table.schema ],
+          [ ('str', False), ('float', True), ('int', False), ('bool', False) ])
+        self.assertEqual([ type(x).__name__ for x in table._list.columns ],
+          ['list', 'MaskedColumn', 'array', 'array'])
+        self.assertEqual(table.tolist(), [ ['g1', -10.5, 3, True],
+          ['g2', -3.0, 4, False], ['g3', None, 5, True] ])
+        self.assertIs(table[1, 3], False)
+
+        # Integers too large for a typed buffer are kept in a list.
+        table = ColumnTable([ [1 << 70, 1] ])
+        self.assertEqual(table.tolist(), [ [1 << 70, 1] ])
+        self.assertIsInstance(table._list.columns[0], list)
+
+    def test_validation(self):
+
+        table = self.table
+
+        for r, c, value in [ (0, 2, 'x'), (0, 3, 1), (0, 0, None) ]:
+            with self.assertRaises(TypeError):
+                table[r, c] = value
+
+        with self.assertRaises(ValueError):
+            table.append(['g4', 1.0, 2])
+        with self.assertRaises(TypeError):
+            table[0:1] = [ ['g0', 'bad', 1, True] ]
+
+        self.assertEqual(table.tolist()[0], ['g1', -10.5, 3, True])
+        self.assertEqual(table.row_labels.tolist(), ['a', 'b', 'c'])
+
+    def test_rows(self):
+
+        table = self.table
+        table[0, 2] = 7
+        table.append(['g4', 1, 2, False])
+
+        self.assertEqual(table[-1].tolist(), ['g4', 1.0, 2, False])
+        self.assertEqual(table.row_labels.tolist(), ['a', 'b', 'c', ''])
+
+        part = table[1:3]
+        self.assertIsInstance(part, ColumnTable)
+        self.assertEqual(part.schema, table.schema)
+        self.assertEqual(part.tolist(), [ ['g2', -3.0, 4, False], ['g3', None, 5, True] ])
+
+        item = pickle.loads( pickle.dumps(table, 2) )
+        self.assertEqual(item, table)
+        self.assertEqual(item.schema, table.schema)
+
+        del table[0]
+        table.reverse()
+        self.assertEqual(table.pop().tolist(), ['g2', -3.0, 4, False])
+        self.assertEqual(table.tolist(), [ ['g4', 1.0, 2, False], ['g3', None, 5, True] ])
+
+    def test_read_text(self):
+
+        tmpdir = tempfile.mkdtemp()
+        filepath = os.path.join(tmpdir, "results.tsv")
+
+        try:
+            with open(filepath, 'w') as handle:
+                handle.write("gene\tlnL\tnp\nx\t-10.5\t3\ny\tNA\t4\n")
+            table = ColumnTable.read_text(filepath)
+        finally:
+            shutil.rmtree(tmpdir)
+
+        self.assertEqual(table.schema.names, ('gene', 'lnL', 'np') )
+        self.assertEqual(table.tolist(), [ ['x', -10.5, 3], ['y', None, 4] ])
+        self.assertEqual(table.find_range(2, 4, 4), (1,) )
+
+class TestCategoricalColumn(unittest.TestCase):
+
+    def setUp(self):
+        self.table = ColumnTable([ ['g1', 'M0', -1.0], ['g1', 'M7', -2.0],
+          ['g2', 'M0', -3.0], ['g2', None, -4.0] ], schema=[ ('gene', 'category'),
+          ('model', 'category', True), ('lnL', 'float') ],
+          row_labels=TableLabels(['a', 'b', 'c', 'd']))
+
+    def test_codes(self):
+
+        table = self.table
+        column = table._list.columns[1]
+
+        self.assertIsInstance(column, CategoricalColumn)
+        self.assertEqual(column.categories, ('M0', 'M7') )
+        self.assertEqual(column.codes.tolist(), [0, 1, 0, -1])
+        self.assertEqual(table.tolist()[3], ['g2', None, -4.0])
+
+        table[3, 1] = 'M8'
+        self.assertEqual(column.categories, ('M0', 'M7', 'M8') )
+        self.assertEqual(table[3].tolist(), ['g2', 'M8', -4.0])
+
+        with self.assertRaises(TypeError):
+            table[0, 0] = 5
+
+    def test_search(self):
+
+        table = self.table
+
+        self.assertEqual(table.count('M0'), 2)
+        self.assertEqual(table.count(None), 1)
+        self.assertEqual(table.count('M9'), 0)
+        self.assertEqual(table.findall('g2'), ( (2, 0), (3, 0) ) )
+        self.assertEqual(table.find_range(1, 'M0', 'M0'), (0, 2) )
+        self.assertEqual(table.group_rows(1), [ ('M0', (0, 2)), ('M7', (1,)),
+          (None, (3,)) ])
+        self.assertEqual(table.lazy().filter(0, '==', 'g2').select(2).collect().tolist(),
+          [ [-3.0], [-4.0] ])
+
+    def test_rows(self):
+
+        table = self.table
+
+        item = pickle.loads( pickle.dumps(table, 2) )
+        self.assertEqual(item, table)
+        self.assertIsInstance(item._list.columns[0], CategoricalColumn)
+
+        item = copy(table)
+        item[0, 0] = 'g9'
+        self.assertEqual(table[0, 0], 'g1')
+        self.assertEqual(item._list.columns[0].categories, ('g1', 'g2', 'g9') )
+        self.assertEqual(table._list.columns[0].categories, ('g1', 'g2') )
+
+        del table[0]
+        table.reverse()
+        self.assertEqual(table.tolist(), [ ['g2', None, -4.0], ['g2', 'M0', -3.0],
+          ['g1', 'M7', -2.0] ])
+        self.assertEqual(table.fillna('M0').tolist()[0], ['g2', 'M0', -4.0])
+
+    def test_read_text(self):
+
+        tmpdir = tempfile.mkdtemp()
+        filepath = os.path.join(tmpdir, "results.tsv")
+
+        try:
+            with open(filepath, 'w') as handle:
+                handle.write("gene\tmodel\tlnL\ng1\tM0\t-1.5\ng1\tM7\t-2\ng2\tM0\t-3\n")
+            table = ColumnTable.read_text(filepath, max_categories=2)
+        finally:
+            shutil.rmtree(tmpdir)
+
+        self.assertEqual([ x.data_type for x in table.schema ],
+          ['category', 'category', 'float'])
+        self.assertEqual(table._list.columns[1].codes.tolist(), [0, 1, 0])
+
+    def test_arrow(self):
+
+        try:
+            import pyarrow
+        except ImportError:
+            self.skipTest("pyarrow is not installed")
+
+        tmpdir = tempfile.mkdtemp()
+        filepath = os.path.join(tmpdir, "results.parquet")
+
+        try:
+            arrow_table = self.table.to_arrow()
+            self.table.write_parquet(filepath)
+            item = ColumnTable.read_parquet(filepath)
+        finally:
+            shutil.rmtree(tmpdir)
+
+        self.assertTrue( pyarrow.types.is_dictionary(arrow_table.schema.field('gene').type) )
+        self.assertEqual(item.tolist(), self.table.tolist() )
+        self.assertEqual([ x.data_type for x in item.schema ],
+          ['category', 'category', 'float'])
+        self.assertEqual(item.row_labels.tolist(), ['a', 'b', 'c', 'd'])
+        self.assertEqual(ColumnTable.from_arrow(arrow_table), self.table)
+
+class TestMaskedColumn(unittest.TestCase):
+
+    def setUp(self):
+        self.table = ColumnTable([ ['g1', -1.5, 3, True, 'a'], ['g2', None, 4, None, None],
+          ['g3', -3.0, None, False, 'c'], ['g4', -4.0, 6, True, 'd'] ],
+          schema=[ ('gene', 'category'), ('lnL', 'float', True), ('np', 'int', True),
+          ('sig', 'bool', True), ('note', 'str', True) ],
+          row_labels=TableLabels(['a', 'b', 'c', 'd']))
+
+    def test_storage(self):
+
+        table = self.table
+        column = table._list.columns[2]
+
+        self.assertIsInstance(column, MaskedColumn)
+        self.assertEqual(column.null_count, 1)
+        self.assertEqual(table.tolist()[1], ['g2', None, 4, None, None])
+
+        table[0, 2] = None
+        table[2, 2] = 5
+        self.assertEqual(column.null_count, 1)
+        self.assertEqual(table.tolist()[0][2], None)
+        self.assertEqual(table.tolist()[2][2], 5)
+
+        item = pickle.loads( pickle.dumps(table, 2) )
+        self.assertEqual(item, table)
+        self.assertIsInstance(item._list.columns[2], MaskedColumn)
+
+        table.reverse()
+        del table[0]
+        self.assertEqual(table.isnull(2), (False, False, True) )
+
+        table = ColumnTable([ [1, None], [1 << 70, 2] ], schema=[ ('a', 'int', True),
+          ('b', 'int', True) ])
+        self.assertEqual(table.tolist(), [ [1, None], [1 << 70, 2] ])
+
+    def test_isnull(self):
+
+        table = self.table
+
+        self.assertEqual(table.isnull(1), (False, True, False, False) )
+        self.assertEqual(table.isnull(2), (False, False, True, False) )
+        self.assertEqual(table.isnull(4), (False, True, False, False) )
+        self.assertEqual(table.isnull(0), (False, False, False, False) )
+        self.assertEqual(table.count(None), 4)
+        self.assertEqual(table.findall(None), ( (1, 1), (1, 3), (1, 4), (2, 2) ) )
+        self.assertEqual(table.find_range(2, 6, 6), (3,) )
+
+    def test_dropna(self):
+
+        table = self.table
+
+        item = table.dropna()
+        self.assertEqual(item.tolist(), [ ['g1', -1.5, 3, True, 'a'],
+          ['g4', -4.0, 6, True, 'd'] ])
+        self.assertEqual(item.row_labels.tolist(), ['a', 'd'])
+        self.assertEqual(table.dropna([1]).row_labels.tolist(), ['a', 'c', 'd'])
+        self.assertEqual(len(table), 4)
+
+    def test_fillna(self):
+
+        table = self.table
+
+        with self.assertRaises(TypeError):
+            table.fillna(0)
+
+        item = table.fillna(0, columns=[1, 2])
+        self.assertEqual(item.tolist()[1:3], [ ['g2', 0.0, 4, None, None],
+          ['g3', -3.0, 0, False, 'c'] ])
+        self.assertEqual(table.tolist()[1], ['g2', None, 4, None, None])
+        self.assertEqual(table.fillna('x', columns=[4]).isnull(4),
+          (False, False, False, False) )
+
+    def test_aggregate(self):
+
+        table = self.table
+
+        self.assertEqual(table.aggregate(1), -8.5)
+        self.assertAlmostEqual(table.aggregate(1, 'mean'), -8.5 / 3)
+        self.assertEqual(table.aggregate(2, 'count'), 3)
+        self.assertEqual(table.aggregate(2, 'max'), 6)
+        self.assertEqual(table.aggregate(3, 'sum'), 2)
+        self.assertEqual(table.aggregate(0, 'count'), 4)
+        self.assertEqual(table.group_rows(3), [ (True, (0, 3)), (None, (1,)),
+          (False, (2,)) ])
+
+if __name__ == '__main__':
+    unittest.main()